@@ -0,0 +1,3 @@
+"""
+Benchmarks and the synthetic MIDI corpus they run on.
+"""
@@ -0,0 +1,138 @@
+"""
+Seeded synthetic MIDI corpus for the benchmarks.
+
+generate_midi builds a type 1 file whose length, polyphony, track count and
+density of tempo and time signature changes are set independently, so each
+can be scaled on its own. The same seed always gives the same file.
+"""
+###############################################################################
+# Standard Imports
+import os
+# Third Party Imports
+import numpy
+from mido import Message, MetaMessage, MidiFile, MidiTrack, bpm2tempo
+###############################################################################
+# Constants
+__all__ = ['generate_midi', 'generate_corpus']
+TIME_SIGNATURES = [(4, 4), (3, 4), (2, 4), (6, 8), (5, 4), (7, 8)]
+DURATIONS = [0.25, 0.5, 0.5, 1, 1, 1, 1.5, 2]
+###############################################################################
+def _bar_ticks(bars: int, time_signature_changes: float, ticks_per_beat, rng):
+    """
+    Start tick and signature of every bar, changing signature at a bar
+    line with probability time_signature_changes.
+    """
+    starts, signatures = [], []
+    tick = 0
+    signature = (4, 4)
+    for bar in range(bars):
+        if bar and rng.random() < time_signature_changes:
+            signature = TIME_SIGNATURES[rng.integers(len(TIME_SIGNATURES))]
+        starts.append(tick)
+        signatures.append(signature)
+        tick += ticks_per_beat * 4 * signature[0] // signature[1]
+    return starts, signatures, tick
+
+###############################################################################
+def _to_track(events):
+    """MidiTrack from (tick, order, message) tuples, with delta times."""
+    track = MidiTrack()
+    last = 0
+    for tick, _, msg in sorted(events, key = lambda event: event[:2]):
+        track.append(msg.copy(time = tick - last))
+        last = tick
+    track.append(MetaMessage('end_of_track', time = 0))
+    return track
+
+###############################################################################
+def generate_midi(
+    bars: int = 32,
+    polyphony: int = 3,
+    tracks: int = 2,
+    tempo_changes: float = 0.1,
+    time_signature_changes: float = 0.05,
+    ticks_per_beat: int = 480,
+    seed: int = 0
+):
+    """
+    Generate a synthetic MIDI file.
+
+    Keyword arguments:
+    bars -- Length in bars.
+    polyphony -- Independent voices per track.
+    tracks -- Note tracks, after a conductor track holding the tempo and
+              time signature changes.
+    tempo_changes -- Probability of a tempo change at each bar line.
+    time_signature_changes -- Probability of a new time signature at each
+                              bar line.
+    ticks_per_beat -- Resolution of the file.
+    seed -- Seed of the random generator.
+
+    Returns:
+        Mido MidiFile.
+    """
+    rng = numpy.random.default_rng(seed)
+    starts, signatures, end = _bar_ticks(
+        bars, time_signature_changes, ticks_per_beat, rng
+    )
+    midi = MidiFile(type = 1, ticks_per_beat = ticks_per_beat)
+    conductor = [
+        (0, 0, MetaMessage('set_tempo', tempo = bpm2tempo(120)))
+    ]
+    previous = None
+    for start, signature in zip(starts, signatures):
+        if signature != previous:
+            conductor.append((start, 1, MetaMessage(
+                'time_signature',
+                numerator = signature[0],
+                denominator = signature[1]
+            )))
+            previous = signature
+        if start and rng.random() < tempo_changes:
+            conductor.append((start, 0, MetaMessage(
+                'set_tempo', tempo = bpm2tempo(float(rng.uniform(60, 180)))
+            )))
+    midi.tracks.append(_to_track(conductor))
+    for index in range(tracks):
+        channel = index % 16
+        events = [(0, 0, Message('program_change', channel = channel, program = 0))]
+        for voice in range(polyphony):
+            low = 36 + 12 * (voice % 4)
+            tick = 0
+            while tick < end:
+                length = int(ticks_per_beat * DURATIONS[rng.integers(len(DURATIONS))])
+                length = min(length, end - tick)
+                if rng.random() < 0.9:
+                    pitch = int(low + rng.integers(24))
+                    events.append((tick, 2, Message(
+                        'note_on',
+                        channel = channel,
+                        note = pitch,
+                        velocity = int(rng.integers(40, 110))
+                    )))
+                    # Offs sort before ons at the same tick.
+                    events.append((tick + length, 1, Message(
+                        'note_off', channel = channel, note = pitch, velocity = 0
+                    )))
+                tick += length
+        midi.tracks.append(_to_track(events))
+    return midi
+
+###############################################################################
+def generate_corpus(directory: str, files: int = 4, seed: int = 0, **kwargs):
+    """
+    Write files synthetic '.mid' files to directory, seeded seed,
+    seed + 1, ...; other keyword arguments go to generate_midi.
+
+    Returns:
+        List of file paths.
+    """
+    os.makedirs(directory, exist_ok = True)
+    paths = []
+    for index in range(files):
+        path = os.path.join(directory, f"synthetic_{seed + index:04d}.mid")
+        generate_midi(seed = seed + index, **kwargs).save(path)
+        paths.append(path)
+    return paths
+
+###############################################################################
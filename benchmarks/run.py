@@ -0,0 +1,285 @@
+"""
+Benchmark suite for pyramidi.
+
+Every benchmark runs over synthetic corpora of growing length (see
+corpus.py) and reports its best time over a few repeats, throughput in
+events and files per second, and the peak memory traced during one extra
+run. Results are written as JSON so runs can be compared:
+
+    python -m benchmarks.run --output results.json
+    python -m benchmarks.run --only salami cut --compare results.json
+
+The result cache is disabled so every call does the full work.
+"""
+###############################################################################
+# Standard Imports
+import json
+import os
+import platform
+import sys
+import tempfile
+import tracemalloc
+from argparse import ArgumentParser
+from datetime import datetime, timezone
+from importlib.metadata import version
+from time import perf_counter
+# Third Party Imports
+import numpy
+# Local Imports
+from benchmarks.corpus import generate_corpus
+from pyramidi import cache
+from pyramidi.analysis import salami, swierckj_pcd
+from pyramidi.core import cut, pre_process
+from pyramidi.manipulate import Pipeline
+from pyramidi.models.Krumhansl_Schmuckler import keyfinding, mirmode
+from pyramidi.models.PitchSalience import PitchSalience, pitch_salience
+from pyramidi.models.roughness import roughness_batch
+from pyramidi.sdc import onset_rate, pitch_height
+from pyramidi.smf import read_smf
+###############################################################################
+# Constants
+__all__ = ['BENCHMARKS', 'run', 'compare']
+SIZES = [8, 32, 128, 512]
+###############################################################################
+def _chords(path):
+    """Non-empty salami slices of a file, as chords."""
+    return [chord for chord, _ in salami(path) if chord]
+
+###############################################################################
+def _pcd(path):
+    return list(swierckj_pcd(path).values())
+
+###############################################################################
+# name: (setup, function). setup turns a file path into the argument that
+# is timed, so only function counts.
+BENCHMARKS = {
+    'read_smf': (str, read_smf),
+    'pre_process': (str, pre_process),
+    'cut': (pre_process, cut),
+    'salami': (str, salami),
+    'swierckj_pcd': (str, swierckj_pcd),
+    'pitch_height': (str, pitch_height),
+    'onset_rate': (str, onset_rate),
+    'keyfinding': (_pcd, keyfinding),
+    'mirmode': (_pcd, mirmode),
+    'pitch_salience': (_chords, pitch_salience),
+    'PitchSalience': (
+        _chords, lambda chords: [PitchSalience(chord) for chord in chords]
+    ),
+    'roughness_rolloff': (_chords, roughness_batch),
+    'roughness_all': (
+        _chords, lambda chords: roughness_batch(chords, model = "all")
+    ),
+    'manipulate': (
+        str,
+        Pipeline().tempo(scale = 1.5).transpose(2).velocity(64)
+            .articulation(0.8).apply
+    ),
+}
+
+###############################################################################
+def _measure(function, arguments, repeat: int):
+    """
+    Best total time of function over arguments in repeat runs, and the peak
+    traced memory of one more run.
+    """
+    best = float('inf')
+    for _ in range(repeat):
+        start = perf_counter()
+        for argument in arguments:
+            function(argument)
+        best = min(best, perf_counter() - start)
+    tracemalloc.start()
+    for argument in arguments:
+        function(argument)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return best, peak
+
+###############################################################################
+def _slope(x, y):
+    """Log-log slope of y against x: 1 is linear scaling."""
+    x, y = numpy.log(x), numpy.log(numpy.maximum(y, 1e-9))
+    if len(x) < 2 or numpy.ptp(x) == 0:
+        return None
+    return float(numpy.polyfit(x, y, 1)[0])
+
+###############################################################################
+def run(
+    names = None,
+    sizes = SIZES,
+    files: int = 2,
+    repeat: int = 3,
+    seed: int = 0,
+    directory: str = None,
+    log = sys.stderr,
+    **corpus
+):
+    """
+    Run benchmarks over one synthetic corpus per size.
+
+    Keyword arguments:
+    names -- Benchmarks to run; all of BENCHMARKS by default.
+    sizes -- Corpus file lengths in bars.
+    files -- Files per corpus.
+    repeat -- Timed runs per measurement; the best is kept.
+    seed -- Seed of the first file of every corpus.
+    directory -- Where to write the corpora; a temporary directory by
+                 default.
+    log -- Stream for progress lines, or None.
+    corpus -- Other generate_midi arguments (polyphony, tracks, ...).
+
+    Caching is turned off (pyramidi.cache.disable) for the run.
+
+    Returns:
+        Dictionary with the run's settings and environment ("meta"), one
+        record per benchmark and size ("results") and the log-log slope of
+        time against events per benchmark ("scaling").
+    """
+    names = list(BENCHMARKS) if names is None else list(names)
+    unknown = set(names) - set(BENCHMARKS)
+    if unknown:
+        raise TypeError(
+            f"Unknown benchmarks: {sorted(unknown)}."
+        )
+    cache.disable()
+    temporary = tempfile.TemporaryDirectory() if directory is None else None
+    root = directory if directory is not None else temporary.name
+    results = []
+    try:
+        for bars in sizes:
+            paths = generate_corpus(
+                os.path.join(root, f"bars_{bars}"),
+                files = files,
+                seed = seed,
+                bars = bars,
+                **corpus
+            )
+            events = sum(len(read_smf(path, full = True)) for path in paths)
+            for name in names:
+                setup, function = BENCHMARKS[name]
+                arguments = [setup(path) for path in paths]
+                # Warm up lookup tables and lazy imports.
+                function(arguments[0])
+                seconds, peak = _measure(function, arguments, repeat)
+                results.append({
+                    'benchmark': name,
+                    'bars': bars,
+                    'files': files,
+                    'events': events,
+                    'seconds': seconds,
+                    'events_per_second': events / seconds if seconds else None,
+                    'files_per_second': files / seconds if seconds else None,
+                    'peak_memory_bytes': peak
+                })
+                if log is not None:
+                    print(
+                        f"{name:>18} {bars:>5} bars {events:>8} events "
+                        f"{seconds:9.4f}s {peak / 2**20:8.2f} MiB",
+                        file = log
+                    )
+    finally:
+        if temporary is not None:
+            temporary.cleanup()
+    scaling = {}
+    for name in names:
+        records = [record for record in results if record['benchmark'] == name]
+        scaling[name] = _slope(
+            [record['events'] for record in records],
+            [record['seconds'] for record in records]
+        )
+    return {
+        'meta': {
+            'date': datetime.now(timezone.utc).isoformat(timespec = 'seconds'),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'numpy': numpy.__version__,
+            'mido': version('mido'),
+            'sizes': list(sizes),
+            'files': files,
+            'repeat': repeat,
+            'seed': seed,
+            'corpus': corpus
+        },
+        'results': results,
+        'scaling': scaling
+    }
+
+###############################################################################
+def compare(previous: dict, current: dict):
+    """
+    Time ratios current / previous for every benchmark and size found in
+    both runs; below 1 is faster.
+    """
+    before = {
+        (record['benchmark'], record['bars']): record['seconds']
+        for record in previous['results']
+    }
+    return {
+        f"{record['benchmark']}@{record['bars']}":
+            record['seconds'] / before[record['benchmark'], record['bars']]
+        for record in current['results']
+        if before.get((record['benchmark'], record['bars']))
+    }
+
+###############################################################################
+def main():
+    """Command line entry point: python -m benchmarks.run."""
+    parser = ArgumentParser(description = "Run the pyramidi benchmarks.")
+    parser.add_argument(
+        "--only", nargs = "+", choices = list(BENCHMARKS),
+        help = "Benchmarks to run (default: all)."
+    )
+    parser.add_argument(
+        "--sizes", nargs = "+", type = int, default = SIZES,
+        help = "File lengths in bars, one corpus each."
+    )
+    parser.add_argument("--files", type = int, default = 2, help = "Files per corpus.")
+    parser.add_argument("--repeat", type = int, default = 3, help = "Timed runs per measurement.")
+    parser.add_argument("--seed", type = int, default = 0, help = "Corpus seed.")
+    parser.add_argument("--polyphony", type = int, default = 3, help = "Voices per track.")
+    parser.add_argument("--tracks", type = int, default = 2, help = "Note tracks per file.")
+    parser.add_argument(
+        "--tempo-changes", type = float, default = 0.1,
+        help = "Probability of a tempo change per bar."
+    )
+    parser.add_argument(
+        "--time-signature-changes", type = float, default = 0.05,
+        help = "Probability of a time signature change per bar."
+    )
+    parser.add_argument("--corpus", help = "Keep the generated corpora in this directory.")
+    parser.add_argument("--output", help = "Write the results to this JSON file.")
+    parser.add_argument("--compare", help = "Earlier JSON results to compare against.")
+    args = parser.parse_args()
+    report = run(
+        names = args.only,
+        sizes = args.sizes,
+        files = args.files,
+        repeat = args.repeat,
+        seed = args.seed,
+        directory = args.corpus,
+        polyphony = args.polyphony,
+        tracks = args.tracks,
+        tempo_changes = args.tempo_changes,
+        time_signature_changes = args.time_signature_changes
+    )
+    for name, slope in report['scaling'].items():
+        if slope is not None:
+            print(f"{name:>18} scales as events^{slope:.2f}", file = sys.stderr)
+    if args.compare:
+        with open(args.compare) as f:
+            report['comparison'] = compare(json.load(f), report)
+        for key, ratio in report['comparison'].items():
+            print(f"{key:>24} {ratio:6.2f}x", file = sys.stderr)
+    text = json.dumps(report, indent = 2)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(text + "\n")
+    else:
+        print(text)
+
+###############################################################################
+if __name__ == "__main__":
+    main()
+
+###############################################################################
@@ -1,6 +1,40 @@
-from . core import *
-from . import models
-from . import sdc
-from . import tools
-from . import manipulate
-from . import analysis
\ No newline at end of file
+"""
+Submodules, and the core functions re-exported here, are imported on
+first access, so `import pyramidi` stays cheap until a feature is used.
+"""
+###############################################################################
+# Standard Imports
+from importlib import import_module
+###############################################################################
+# Constants
+# Re-exported from core (keep in step with core.__all__).
+__all__ = ['AnalyzedMidi', 'pre_process', 'cut', 'read_excerpt']
+SUBMODULES = {
+    'analysis',
+    'batch',
+    'cache',
+    'cli',
+    'core',
+    'instrument',
+    'manipulate',
+    'models',
+    'notes',
+    'sdc',
+    'smf',
+    'store',
+    'tempo',
+    'tools'
+}
+###############################################################################
+def __getattr__(name: str):
+    if name in SUBMODULES:
+        return import_module(f"{__name__}.{name}")
+    if name in __all__:
+        return getattr(import_module(f"{__name__}.core"), name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+###############################################################################
+def __dir__():
+    return sorted(set(globals()) | SUBMODULES | set(__all__))
+
+###############################################################################
@@ -1,10 +1,25 @@
 """
 """
 ###############################################################################
+# Standard Imports
+from functools import lru_cache
+from heapq import merge
+from itertools import combinations, groupby
+from os import PathLike
+from typing import NamedTuple
 # Local Imports
+from pyramidi.cache import cached
+from pyramidi.core import AnalyzedMidi
+from pyramidi.instrument import count, timed
+from pyramidi.models.Krumhansl_Schmuckler import (
+    KEYS, keyfinding_batch, mode_from_coefficients
+)
+from pyramidi.models.PitchSalience import pc_mask
+from pyramidi.notes import NoteTable, note_table
+from pyramidi.smf import NOTE_OFF, NOTE_ON, SMFEvents, read_smf
 # Third Party Imports
-from mido import MidiFile, tempo2bpm, MidiTrack
-from itertools import combinations
+import numpy
+from mido import MidiFile
 ###############################################################################
 # Constants
 __all__ = []
@@ -50,6 +65,24 @@ CHORD_BASSINT = {(4,7):'maj', (3,8):'maj', (5,9):'maj',
                  (4,7,10):'7', (3,6,8):'7', (3,5,9):'7', (2,6,9):'7'
                 }
 
+# Chord qualities in label order; every value CHORD_IVS and CHORD_BASSINT
+# can resolve to.
+CHORD_QUALITIES = tuple(dict.fromkeys(
+    [quality for quality in CHORD_IVS.values() if isinstance(quality, str)] +
+    list(CHORD_BASSINT.values())
+))
+
+# Pitch classes above the root of each chord quality, used to find roots.
+CHORD_TEMPLATES = {
+    'maj': (0,4,7), 'min': (0,3,7), 'dim': (0,3,6), 'aug': (0,4,8),
+    'sus': (0,5,7), 'maj7': (0,4,7,11), 'min7': (0,3,7,10),
+    'minmaj7': (0,3,7,11), '7': (0,4,7,10), 'min7b5': (0,3,6,10),
+    'dim7': (0,3,6,9), '7b5': (0,4,6,10), 'majadd9': (0,2,4,7),
+    'minadd9': (0,2,3,7), 'maj6/9': (0,2,4,7,9), 'maj7#11': (0,4,6,7,11),
+    '7#9': (0,3,4,7,10), '9': (0,2,4,7,10), '7b9': (0,1,4,7,10),
+    '13': (0,2,4,5,7,9,10)
+}
+
 # Note spellings of 12-tone scale for every key. 
 NOTE_KEYS = {'Cmaj':{0:'C',1:'C#',2:'D',3:'D#',4:'E',5:'F',6:'F#',
                      7:'G',8:'G#',9:'A',10:'A#',11:'B'},
@@ -123,66 +156,163 @@ NOTE_KEYS = {'Cmaj':{0:'C',1:'C#',2:'D',3:'D#',4:'E',5:'F',6:'F#',
 
 ALLIC = list(range(0,12))
 ###############################################################################
+@cached(file = True)
 def swierckj_pcd(midiFile, timebase = "seconds", velocity = "False"):
     """
+    Returns the pitch-class distribution of a MIDI file, weighting every
+    pitch class by the summed duration of its notes.
+
+    Keyword arguments:
+    midiFile -- File path, Mido MidiFile, AnalyzedMidi or NoteTable.
+    timebase -- Measure durations in "seconds" or "ticks".
     """
     # TODO: Add vleocity weightings
-    midiFile = MidiFile(midiFile)
-    tpb = midiFile.ticks_per_beat
-    if "set_tempo" in [msg.type for msg in midiFile.tracks[0]]:
-        bpm = tempo2bpm([msg.tempo for msg in midiFile.tracks[0] if 
-                            msg.type == "set_tempo"][0])
-    else:
-        bpm = 120
+    table = note_table(midiFile)
     if timebase == "seconds":
-        temp = 0
-        new = MidiFile(type=0, ticks_per_beat = midiFile.ticks_per_beat)
-        track = MidiTrack()
-        new.tracks.append(track)
-        for i in range(len(midiFile.tracks)):
-                for msg in midiFile.tracks[i]:
-                    tick_time = ((msg.time / tpb) / bpm) * 60
-                    abs_time = tick_time + temp
-                    track.append(msg.copy(time = abs_time))
-                    temp = abs_time
+        durations = table.duration_seconds
     elif timebase == "ticks":
-        temp = 0
-        new = MidiFile(type=0, ticks_per_beat = midiFile.ticks_per_beat)
-        track = MidiTrack()
-        new.tracks.append(track)
-        for i in range(len(midiFile.tracks)):
-                for msg in midiFile.tracks[i]:
-                    tick_time = msg.time
-                    abs_time = tick_time + temp
-                    track.append(msg.copy(time = abs_time))
-                    temp = abs_time
-    out = []
-    for i, msg in enumerate(new.tracks[0]):
-        if msg.type == "note_on":
-            for next in range(i + 1, len(new.tracks[0])):
-                if new.tracks[0][next].type in ["note_off", "note_on"] and new.tracks[0][next].note == msg.note:
-                    out.append({"note": msg.note,
-                                "velocity": msg.velocity,
-                                "time_on": msg.time,
-                                "time_off": new.tracks[0][next].time,
-                                "length": (new.tracks[0][next].time - msg.time)})
-                    break
-    pcd = dict.fromkeys(range(0,12), 0)
-    for msg in out:
-        pc = msg["note"]%12
-        pcd[pc] = pcd[pc] + msg["length"]
-    return {pc: pcd[pc]/sum(pcd.values()) for pc in range(0,12)}
+        durations = table.duration_ticks
+    else:
+        raise TypeError(
+            "timebase must be 'seconds' or 'ticks'."
+        )
+    pcd = numpy.bincount(
+        table.pitch_class,
+        weights = durations,
+        minlength = 12
+    )
+    pcd = pcd / pcd.sum()
+    return {pc: float(pcd[pc]) for pc in range(0,12)}
+
+###############################################################################
+def _positions(table, ticks, unit: str):
+    """Convert absolute ticks of a NoteTable to seconds, beats or bars."""
+    if unit == "seconds":
+        return table.tempo_map.tick2second(ticks)
+    if unit == "beats":
+        return numpy.asarray(ticks) / table.ticks_per_beat
+    if unit == "bars":
+        return table.bar_index.tick2bar(ticks)
+    raise TypeError(
+        "unit must be 'seconds', 'beats' or 'bars'."
+    )
+
+###############################################################################
+def cumulative_pcd(midi_file, unit: str = "seconds"):
+    """
+    Prefix sums of pitch-class durations.
+
+    Keyword arguments:
+    midi_file -- File path, Mido MidiFile, AnalyzedMidi or NoteTable.
+    unit -- Time axis: "seconds", "beats" or "bars".
+
+    Returns:
+        (positions, slopes, totals, end): sorted breakpoints, the number of
+        sounding notes of each pitch class from each breakpoint on
+        (B x 12), the summed durations of each pitch class up to each
+        breakpoint (B x 12), and the end of the file in unit.
+    """
+    table = note_table(midi_file)
+    onsets = _positions(table, table.onset_ticks, unit)
+    offsets = _positions(table, table.offset_ticks, unit)
+    positions, index = numpy.unique(
+        numpy.concatenate((onsets, offsets)),
+        return_inverse = True
+    )
+    delta = numpy.zeros((len(positions), 12))
+    pc = numpy.concatenate((table.pitch_class, table.pitch_class))
+    sign = numpy.repeat([1.0, -1.0], len(table))
+    numpy.add.at(delta, (index, pc), sign)
+    slopes = numpy.cumsum(delta, axis = 0)
+    totals = numpy.zeros_like(slopes)
+    totals[1:] = numpy.cumsum(
+        slopes[:-1] * numpy.diff(positions)[:, None],
+        axis = 0
+    )
+    end = float(_positions(table, table.end_tick, unit))
+    return positions, slopes, totals, end
+
+###############################################################################
+def key_trajectory(
+    midi_file,
+    window: float,
+    hop: float = None,
+    unit: str = "seconds",
+    profile: str = "KrumhanslKessler",
+    similarity: str = "pearsonr",
+    method: str = "best"
+):
+    """
+    Keyfinding coefficients and mirmode for sliding windows over a file.
+
+    Window pitch-class distributions are differences of cumulative
+    pitch-class durations, so each window costs O(12) regardless of how
+    many notes it holds, and all windows go through batch keyfinding at
+    once.
+
+    Keyword arguments:
+    midi_file -- File path, Mido MidiFile, AnalyzedMidi or NoteTable.
+    window -- Window length in unit.
+    hop -- Distance between window starts in unit, defaults to window.
+    unit -- "seconds", "beats" or "bars" (bars are counted from 0).
+    profile, similarity -- See models.keyfinding.
+    method -- See models.mirmode.
+
+    Returns:
+        Dictionary of arrays with one entry per window: "start", "end",
+        "pcd" (W x 12, normalised; all zero for silent windows),
+        "coefficients" (W x 24, columns ordered as models.KEYS), "key"
+        (best matching key name) and "mode" (mirmode). Windows without
+        sounding notes have no key: their coefficients and mode are NaN
+        and their key is None.
+    """
+    if hop is None:
+        hop = window
+    if window <= 0 or hop <= 0:
+        raise TypeError(
+            "window and hop must be positive."
+        )
+    positions, slopes, totals, end = cumulative_pcd(midi_file, unit = unit)
+    starts = numpy.arange(0, end, hop) if end > 0 else numpy.zeros(0)
+    ends = starts + window
+    ###########################################################################
+    def at(points):
+        index = numpy.searchsorted(positions, points, side = 'right') - 1
+        inside = index >= 0
+        index = numpy.maximum(index, 0)
+        summed = totals[index] + slopes[index] * \
+            (points - positions[index])[:, None]
+        return summed * inside[:, None]
+    ###########################################################################
+    pcd = at(ends) - at(starts)
+    length = pcd.sum(axis = 1, keepdims = True)
+    pcd = numpy.divide(pcd, length, out = numpy.zeros_like(pcd), where = length > 0)
+    coefficients = keyfinding_batch(pcd, profile, similarity)
+    silent = length[:, 0] <= 0
+    coefficients[silent] = numpy.nan
+    best = numpy.argmax(
+        numpy.where(numpy.isnan(coefficients), -numpy.inf, coefficients),
+        axis = 1
+    )
+    key = numpy.array(KEYS, dtype = object)[best]
+    key[silent] = None
+    return {
+        "start": starts,
+        "end": ends,
+        "pcd": pcd,
+        "coefficients": coefficients,
+        "key": key,
+        "mode": mode_from_coefficients(coefficients, method)
+    }
 
 ###############################################################################
+@cached(file = True)
 def ambitus(file):
     """
+    Returns the lowest and highest MIDI note number in a file.
     """
-    number_list = []
-    for track in MidiFile(file).tracks:
-        for msg in track:
-            if msg.type == "note_on":
-                number_list.append(msg.note)
-    return min(number_list), max(number_list)
+    table = note_table(file)
+    return int(table.pitch.min()), int(table.pitch.max())
 
 ###############################################################################
 def unique_pc(chord):
@@ -228,9 +358,10 @@ def interval_vector(chord):
         return intervalvector
 
 ###############################################################################
-def chord_quality(chord):
-        """ Returns chord quality for chord symbols. See 'CHORD_IVS' for list. 
-            chord = list of MIDI or pitch class numbers representing a chord
+def _chord_quality(chord):
+        """
+        Chord quality from the interval vector, disambiguated by the
+        intervals above chord[0]; used to build chord_table.
         """
         try:
                 quality = CHORD_IVS[str(interval_vector(chord))]
@@ -241,6 +372,128 @@ def chord_quality(chord):
         except KeyError:
                 return None
 
+###############################################################################
+def _template_root(mask, quality, bass):
+        """
+        Root pitch class at which the template of quality spells mask; the
+        bass is preferred for symmetric chords, and returned when the
+        quality has no matching transposition.
+        """
+        roots = [
+                root for root in range(12)
+                if pc_mask([root + pc for pc in CHORD_TEMPLATES[quality]]) == mask
+        ]
+        if not roots or bass in roots:
+                return bass
+        return roots[0]
+
+###############################################################################
+@lru_cache(maxsize = None)
+def chord_table():
+        """
+        Chord recognition table indexed by [12-bit pitch-class mask, bass
+        pitch class]. Built once.
+
+        Returns:
+            (quality, root, label): read-only (4096 x 12) integer arrays of
+            the index into CHORD_QUALITIES, the root pitch class and the
+            index into chord_vocabulary(); -1 where there is no chord.
+        """
+        quality = numpy.full((4096, 12), -1, dtype = numpy.int64)
+        root = numpy.full((4096, 12), -1, dtype = numpy.int64)
+        for mask in range(1, 4096):
+                pcs = [pc for pc in range(12) if (mask >> pc) & 1]
+                for bass in pcs:
+                        # Close position above the bass.
+                        chord = sorted(bass + (pc - bass) % 12 for pc in pcs)
+                        name = _chord_quality(chord)
+                        if name is None:
+                                continue
+                        quality[mask, bass] = CHORD_QUALITIES.index(name)
+                        root[mask, bass] = _template_root(mask, name, bass)
+        label = numpy.where(
+                quality >= 0,
+                (quality * 12 + root) * 12 + numpy.arange(12),
+                -1
+        )
+        for array in (quality, root, label):
+                array.flags.writeable = False
+        return quality, root, label
+
+###############################################################################
+@lru_cache(maxsize = None)
+def chord_vocabulary(key = 'Cmaj'):
+        """
+        Chord symbols indexed by the labels of chord_table and label_chords,
+        spelled in key.
+        """
+        names = NOTE_KEYS[key]
+        return tuple(
+                f"{names[root]}{quality}" if root == bass
+                else f"{names[root]}{quality}/{names[bass]}"
+                for quality in CHORD_QUALITIES
+                for root in range(12)
+                for bass in range(12)
+        )
+
+###############################################################################
+def chord_quality(chord):
+        """ Returns chord quality for chord symbols. See 'CHORD_IVS' for list. 
+            chord = list of MIDI or pitch class numbers representing a chord
+        """
+        if not isinstance(chord, list):
+                raise TypeError(
+                        "Must be list of MIDI or pitch class numbers."
+                )
+        if not chord:
+                return None
+        quality, _, _ = chord_table()
+        index = quality[pc_mask(chord), chord[0] % 12]
+        return CHORD_QUALITIES[index] if index >= 0 else None
+
+###############################################################################
+def label_chords(slices, key = 'Cmaj'):
+        """
+        Label many chords at once, such as every salami slice of a file.
+
+        Arguments:
+            slices -- List of chords (lists of MIDI numbers), of salami
+                      slices ([MIDI numbers, duration]) or of Slice
+                      records, the dictionary of slice_arrays, or an
+                      AnalyzedMidi. The lowest note is the bass.
+            key -- Spelling of the vocabulary, see NOTE_KEYS.
+
+        Returns:
+            (labels, vocabulary): integer array of one label per slice, -1
+            where there is no chord, and the tuple of chord symbols the
+            labels index. Labels are the same for every file and key.
+        """
+        if isinstance(slices, AnalyzedMidi):
+                slices = slices.slices
+        if isinstance(slices, dict):
+                labels = chord_table()[2][slices['mask'], slices['bass'] % 12]
+                labels[slices['mask'] == 0] = -1
+                return labels, chord_vocabulary(key)
+        chords = [
+                _mask_pitches(chord.pitches) if isinstance(chord, Slice) and isinstance(chord.pitches, int)
+                else chord.pitches if isinstance(chord, Slice)
+                else chord[0] if chord and isinstance(chord[0], (list, tuple, numpy.ndarray))
+                else chord
+                for chord in slices
+        ]
+        labels = numpy.full(len(chords), -1, dtype = numpy.int64)
+        lengths = numpy.array([len(chord) for chord in chords], dtype = numpy.int64)
+        filled = numpy.flatnonzero(lengths)
+        if len(filled):
+                notes = numpy.concatenate(
+                        [numpy.asarray(chords[i], dtype = numpy.int64) for i in filled]
+                )
+                starts = numpy.concatenate(([0], numpy.cumsum(lengths[filled])[:-1]))
+                masks = numpy.bitwise_or.reduceat(1 << (notes % 12), starts)
+                bass = numpy.minimum.reduceat(notes, starts) % 12
+                labels[filled] = chord_table()[2][masks, bass]
+        return labels, chord_vocabulary(key)
+
 ###############################################################################
 class ChordDetect:
     def __init__ (self, chord, key = 'Cmaj'):
@@ -252,45 +505,37 @@ class ChordDetect:
         self.unique_pc = unique_pc(chord)
         # How many unique pitch classes are in the chord?
         self.cardinality = len(self.unique_pc)
+        self.root = None
+        self.root_pc = None
+        self.root_note = None
+        self.quality = None
+        self.bass = None
+        self.bass_pc = None
+        self.bass_note = None
+        self.chord_symbol = None
         # Less than 3 notes = no chord symbol
-        if self.cardinality <3:
-                self.root = None
-                self.root_pc = None
-                self.root_note = None
-                self.quality = None
-                self.bass = None
-                self.bass_pc = None
-                self.bass_note = None
-                self.chord_symbol = None
-        elif self.cardinality >2:
-                # Chord Quality
-                self.quality = chord_quality(chord)
-                # Triadic Root
-                if self.quality == None:
-                        self.root = None
-                        self.root_pc = None
-                        self.root_note = None
-                        self.bass = None
-                        self.bass_pc = None
-                        self.bass_note = None
-                        self.chord_symbol = None
-                else:
-                        self.root = min(chord) # TODO: Make this work.
-                        # Convert Chord Root to Pitch Class.
-                        self.root_pc = self.root%12
-                        # Convert Chord Root Pitch Class to Note Name.
-                        self.root_note = NOTE_KEYS[key][self.root_pc]
-                        # Chord Bass
-                        self.bass = min(chord)
-                        self.bass_pc = min(chord)%12
-                        self.bass_note = NOTE_KEYS[key][self.bass_pc]
-                # Render Chord Symbol
-                        if self.bass != self.root:
-                                self.chord_symbol = f"""{self.root_note}
-                                                        {self.quality}/
-                                                        {self.bass_note}
-                                                     """
-                        else: self.chord_symbol = f"{self.root_note}{self.quality}"
+        if self.cardinality < 3:
+                return
+        # Quality, root and label of the pitch-class set over its bass.
+        quality, root, label = chord_table()
+        # The module-level 'min' triads shadow the builtin.
+        lowest = int(numpy.min(chord))
+        mask, bass_pc = pc_mask(chord), lowest % 12
+        if quality[mask, bass_pc] < 0:
+                return
+        self.quality = CHORD_QUALITIES[quality[mask, bass_pc]]
+        # Chord Root, as the lowest note of the root pitch class.
+        self.root_pc = int(root[mask, bass_pc])
+        self.root = int(numpy.min(
+                [note for note in chord if note % 12 == self.root_pc]
+        ))
+        self.root_note = NOTE_KEYS[key][self.root_pc]
+        # Chord Bass
+        self.bass = lowest
+        self.bass_pc = bass_pc
+        self.bass_note = NOTE_KEYS[key][self.bass_pc]
+        # Render Chord Symbol
+        self.chord_symbol = chord_vocabulary(key)[label[mask, bass_pc]]
 
 #def chordsymbol_analysis(filepath, none = True):
 #        """ Def.
@@ -338,48 +583,182 @@ test_dict = {
             }
 """
 ###############################################################################
-def salami(midi_file, direct: bool = False):
+class Slice(NamedTuple):
     """
+    One salami slice.
+
+    Attributes:
+        onset -- Start in beats.
+        duration -- Length in beats.
+        pitches -- Sorted array of sounding MIDI numbers, or with mask=True
+                   an int with bit p set while MIDI pitch p sounds.
     """
-    if not direct:
-        midi = MidiFile(midi_file)
-    else:
-        midi = midi_file
-    slices = []
-    current_chord = set()
-    current_time = 0
-    start_time = 0
-    
-    for i, track in enumerate(midi.tracks):
-        for msg in midi.tracks[i]:
-            current_time += msg.time
-            if current_time == start_time:
-                pass
-            elif slices and slices[-1][0] == current_chord:
-                pass
-            elif not current_chord:
-                pass
-            else:
-                slices.append([sorted(list(current_chord)),
-                               (current_time - start_time) / midi.ticks_per_beat])
-            start_time = current_time
-            # If no time has passed, just add it or remove it.
-            if msg.time == 0:
-                if msg.type == 'note_on' and msg.velocity > 0:
-                    current_chord.add(msg.note)
-                elif msg.type == 'note_off' or msg.type == "note_on" and msg.velocity == 0:
-                    current_chord.discard(msg.note)
-                else:
-                    print("Unhandled MIDI message:", msg)
-                    continue
+    onset: float
+    duration: float
+    pitches: object
+
+###############################################################################
+def slice_source(midi_file):
+    """
+    Resolve a file path, Mido MidiFile, AnalyzedMidi, SMFEvents or
+    NoteTable to the SMFEvents or NoteTable that iter_slices streams from.
+    """
+    if isinstance(midi_file, (SMFEvents, NoteTable)):
+        return midi_file
+    if isinstance(midi_file, AnalyzedMidi):
+        return midi_file.events
+    if isinstance(midi_file, MidiFile):
+        return SMFEvents.from_midi(midi_file)
+    if isinstance(midi_file, (str, PathLike)):
+        return read_smf(midi_file)
+    raise TypeError(
+        "Must be a file path, Mido MidiFile, AnalyzedMidi, SMFEvents or NoteTable."
+    )
+
+###############################################################################
+def _track_notes(ticks, status, data1, data2, end):
+    """
+    (tick, pitch, +1/-1) note changes of one track in time order, paired
+    like NoteTable.from_events: unmatched note-offs are dropped and notes
+    still sounding are released at the track's last tick.
+    """
+    sounding = {}
+    for tick, code, pitch, velocity in zip(ticks, status, data1, data2):
+        key = (code & 0x0F, pitch)
+        if code & 0xF0 == NOTE_ON and velocity > 0:
+            sounding[key] = sounding.get(key, 0) + 1
+            yield tick, pitch, 1
+        elif sounding.get(key):
+            sounding[key] -= 1
+            yield tick, pitch, -1
+    for (_, pitch), count in sounding.items():
+        for _ in range(count):
+            yield end, pitch, -1
+
+###############################################################################
+def _note_changes(source):
+    """Note changes of every track merged by absolute tick."""
+    if isinstance(source, NoteTable):
+        return merge(
+            zip(source.onset_ticks.tolist(), source.pitch.tolist(), [1] * len(source)),
+            sorted(zip(source.offset_ticks.tolist(), source.pitch.tolist(), [-1] * len(source)))
+        )
+    notes = numpy.flatnonzero((source.status & 0xE0) == NOTE_OFF)
+    bounds = numpy.searchsorted(
+        source.track[notes], numpy.arange(len(source.track_ends) + 1)
+    )
+    tracks = []
+    for track in range(len(source.track_ends)):
+        index = notes[bounds[track]:bounds[track + 1]]
+        tracks.append(_track_notes(
+            source.ticks[index].tolist(),
+            source.status[index].tolist(),
+            source.data1[index].tolist(),
+            source.data2[index].tolist(),
+            int(source.track_ends[track])
+        ))
+    return merge(*tracks, key = lambda change: change[0])
+
+###############################################################################
+def _mask_pitches(mask: int):
+    """Sorted MIDI numbers of the set bits of a 128-bit pitch mask."""
+    bits = numpy.unpackbits(
+        numpy.frombuffer(mask.to_bytes(16, 'little'), dtype = numpy.uint8),
+        bitorder = 'little'
+    )
+    return numpy.flatnonzero(bits)
+
+###############################################################################
+def iter_slices(midi_file, mask: bool = False):
+    """
+    Stream the salami slices of a MIDI file: a new slice starts whenever a
+    note starts or stops in any track. Tracks are merged by absolute time
+    and silent stretches are skipped; only the sounding state is held, so
+    memory does not grow with the number of slices.
+
+    Keyword arguments:
+    midi_file -- File path, Mido MidiFile, AnalyzedMidi, SMFEvents or
+                 NoteTable.
+    mask -- Yield 128-bit pitch masks instead of pitch arrays.
+
+    Yields:
+        Slice records in time order.
+    """
+    source = slice_source(midi_file)
+    ticks_per_beat = source.ticks_per_beat
+    counts = [0] * 128
+    sounding = 0
+    previous = None
+    emitted = 0
+    for tick, changes in groupby(_note_changes(source), key = lambda change: change[0]):
+        if sounding and tick > previous:
+            emitted += 1
+            yield Slice(
+                previous / ticks_per_beat,
+                (tick - previous) / ticks_per_beat,
+                sounding if mask else _mask_pitches(sounding)
+            )
+        for _, pitch, change in changes:
+            counts[pitch] += change
+            if counts[pitch]:
+                sounding |= 1 << pitch
             else:
-                if msg.type == 'note_on':
-                    current_chord.add(msg.note)
-                elif msg.type == 'note_off':
-                    current_chord.discard(msg.note)
-                else:
-                    print("Unhandled MIDI message:", msg)
-                    continue
-    return slices
+                sounding &= ~(1 << pitch)
+        previous = tick
+    count('slices', emitted)
 
-###############################################################################
\ No newline at end of file
+###############################################################################
+@timed('slice')
+def slice_arrays(midi_file):
+    """
+    Bulk salami slicing: every slice of a file as NumPy arrays.
+
+    Keyword arguments:
+    midi_file -- File path, Mido MidiFile, AnalyzedMidi, SMFEvents or
+                 NoteTable.
+
+    Returns:
+        Dictionary with one entry per slice in each of
+            onset, duration -- Beats.
+            sounding -- (slices x 128) boolean array of sounding pitches.
+            mask -- 12-bit pitch-class set masks.
+            bass -- Lowest sounding MIDI number.
+    """
+    table = note_table(midi_file)
+    boundaries = numpy.unique(
+        numpy.concatenate((table.onset_ticks, table.offset_ticks))
+    )
+    counts = table.sounding(boundaries)
+    keep = numpy.flatnonzero(counts.any(axis = 1))
+    sounding = counts[keep] > 0
+    # Fold the 128 pitches (padded to 11 octaves) onto pitch classes.
+    pcs = numpy.pad(sounding, ((0, 0), (0, 4))).reshape(-1, 11, 12).any(axis = 1)
+    count('slices', len(keep))
+    return {
+        'onset': boundaries[keep] / table.ticks_per_beat,
+        'duration': (boundaries[keep + 1] - boundaries[keep]) / table.ticks_per_beat,
+        'sounding': sounding,
+        'mask': pcs @ (1 << numpy.arange(12)),
+        'bass': sounding.argmax(axis = 1)
+    }
+
+###############################################################################
+@cached(file = True)
+def salami(midi_file, direct: bool = False):
+    """
+    Returns salami slices of a MIDI file: a new slice starts whenever a note
+    starts or stops. Each slice is [sorted MIDI numbers, duration in beats];
+    silent stretches are skipped. See iter_slices and slice_arrays for the
+    streaming and bulk forms.
+
+    Keyword arguments:
+    midi_file -- File path, Mido MidiFile, AnalyzedMidi or NoteTable.
+    direct -- Kept for compatibility; preloaded files are detected.
+    """
+    arrays = slice_arrays(midi_file)
+    return [
+        [numpy.flatnonzero(row).tolist(), float(duration)]
+        for row, duration in zip(arrays['sounding'], arrays['duration'])
+    ]
+
+###############################################################################
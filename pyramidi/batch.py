@@ -0,0 +1,282 @@
+"""
+Parallel corpus feature extraction.
+
+Runs a list of extractors over every file of a corpus on a process pool.
+Each worker handles a chunk of files; extractor errors, per-file timeouts
+and crashed workers are recorded against the file that caused them instead
+of stopping the run. Results stream back in input order, tagged with their
+path.
+"""
+###############################################################################
+# Standard Imports
+import csv
+import os
+import signal
+import threading
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from functools import partial
+from time import perf_counter
+from typing import NamedTuple
+# Local Imports
+from pyramidi import instrument
+from pyramidi.analysis import ambitus, swierckj_pcd
+from pyramidi.core import AnalyzedMidi
+from pyramidi.models import mirmode
+from pyramidi.sdc import get_onset_rate, get_pitch_height
+from pyramidi.tools import parser
+###############################################################################
+# Constants
+__all__ = ['Result', 'run', 'get_extractors']
+###############################################################################
+class Result(NamedTuple):
+    """
+    Features extracted from one file.
+
+    Attributes:
+        path -- File the features belong to.
+        features -- Extractor name to value; None where it failed.
+        errors -- Extractor name to error message for failed extractors.
+        elapsed -- Seconds spent on the file.
+    """
+    path: str
+    features: dict
+    errors: dict
+    elapsed: float
+
+###############################################################################
+class FileTimeout(BaseException):
+    """
+    Raised inside a worker when a file exceeds its time budget. Derives
+    from BaseException so extractors catching Exception cannot swallow it.
+    """
+
+###############################################################################
+def file_mirmode(midi_file, **kwargs):
+    """Returns mirmode of the pitch-class distribution of a file."""
+    return mirmode(list(swierckj_pcd(midi_file).values()), **kwargs)
+
+###############################################################################
+EXTRACTORS = {
+    'pitch_height': get_pitch_height,
+    'onset_rate': get_onset_rate,
+    'swierckj_pcd': swierckj_pcd,
+    'mirmode': file_mirmode,
+    'ambitus': ambitus
+}
+###############################################################################
+def get_extractors():
+    """
+    Get the names of extractors that run accepts by name.
+
+    Arguments:
+        None
+
+    Returns:
+        Set of extractor names.
+    """
+    return set(EXTRACTORS.keys())
+
+###############################################################################
+def _extractor_name(extractor):
+    """Name used to tag the output of an extractor."""
+    while isinstance(extractor, partial):
+        extractor = extractor.func
+    return extractor.__name__
+
+###############################################################################
+def _resolve(extractors):
+    """Map extractor names or picklable callables to (name, callable)."""
+    resolved = []
+    for extractor in extractors:
+        if isinstance(extractor, str):
+            if extractor not in EXTRACTORS:
+                raise TypeError(
+                    f"Invalid extractor name '{extractor}'."
+                )
+            resolved.append((extractor, EXTRACTORS[extractor]))
+        elif callable(extractor):
+            resolved.append((_extractor_name(extractor), extractor))
+        else:
+            raise TypeError(
+                "Extractors must be names or callables."
+            )
+    return resolved
+
+###############################################################################
+def _paths(source, extension: str = ".mid"):
+    """
+    Expand a source into file paths: a directory (walked with
+    tools.parser), a manifest ('.txt' with one path per line, or '.csv'
+    with a 'path' column), or an iterable of paths.
+    """
+    if isinstance(source, (str, os.PathLike)):
+        source = os.fspath(source)
+        if os.path.isdir(source):
+            return parser(source, extension = extension)
+        if source.lower().endswith('.csv'):
+            with open(source, newline = '') as f:
+                return [row['path'] for row in csv.DictReader(f)]
+        with open(source) as f:
+            return [line.strip() for line in f if line.strip()]
+    return list(source)
+
+###############################################################################
+def _on_timeout(signum, frame):
+    raise FileTimeout()
+
+###############################################################################
+def _extract(paths, extractors, timeout = None):
+    """
+    Worker task: run every extractor over a chunk of paths. Built-in
+    extractors share one AnalyzedMidi per file, so it is parsed once.
+    """
+    builtin = list(EXTRACTORS.values())
+    # Signal handlers can only be installed from the main thread.
+    timed = timeout is not None and hasattr(signal, 'setitimer') and \
+        threading.current_thread() is threading.main_thread()
+    if timed:
+        previous = signal.signal(signal.SIGALRM, _on_timeout)
+    results = []
+    try:
+        for path in paths:
+            start = perf_counter()
+            features = dict.fromkeys(name for name, _ in extractors)
+            errors = {}
+            handle = AnalyzedMidi(path)
+            try:
+                if timed:
+                    signal.setitimer(signal.ITIMER_REAL, timeout)
+                with instrument.file_span(path):
+                    for name, extractor in extractors:
+                        try:
+                            with instrument.span(f"feature:{name}"):
+                                features[name] = extractor(
+                                    handle if extractor in builtin else path
+                                )
+                        except Exception as error:
+                            errors[name] = f"{type(error).__name__}: {error}"
+            except FileTimeout:
+                for name, _ in extractors:
+                    if name not in errors and features[name] is None:
+                        errors[name] = f"Timeout after {timeout} seconds."
+            finally:
+                if timed:
+                    signal.setitimer(signal.ITIMER_REAL, 0)
+            results.append(
+                Result(path, features, errors, perf_counter() - start)
+            )
+    finally:
+        if timed:
+            signal.signal(signal.SIGALRM, previous)
+    return results
+
+###############################################################################
+def _extract_reported(paths, extractors, timeout = None):
+    """
+    Worker task used while instrumentation is on: _extract with the
+    worker's own instrumentation reset, returning (results, report) for
+    the parent to merge.
+    """
+    instrument.reset()
+    instrument.enable(slowest = None)
+    results = _extract(paths, extractors, timeout)
+    return results, instrument.report()
+
+###############################################################################
+def _crashed(path, extractors):
+    """Result for a file whose worker process died."""
+    names = [name for name, _ in extractors]
+    return Result(
+        path,
+        dict.fromkeys(names),
+        dict.fromkeys(names, "Worker process crashed."),
+        0.0
+    )
+
+###############################################################################
+def run(
+    source,
+    extractors = ('pitch_height', 'onset_rate', 'swierckj_pcd', 'mirmode', 'ambitus'),
+    workers: int = None,
+    chunksize: int = 8,
+    timeout: float = None,
+    extension: str = ".mid"
+):
+    """
+    Extract features from every file of a corpus in parallel.
+
+    Keyword arguments:
+    source -- Directory, manifest file ('.txt' or '.csv') or list of paths.
+    extractors -- Extractor names (see get_extractors) or picklable
+                  callables taking a path; use functools.partial to set
+                  parameters.
+    workers -- Number of worker processes, defaults to the CPU count;
+               0 runs everything in this process.
+    chunksize -- Number of files sent to a worker at a time.
+    timeout -- Seconds allowed per file (POSIX only), None for no limit.
+               Ignored with workers = 0 outside the main thread.
+    extension -- File extension to collect when source is a directory.
+
+    Yields:
+        One Result per file, in input order. If a worker process dies, its
+        chunk is retried one file at a time so that only the file that
+        crashed it is reported as failed.
+
+    While pyramidi.instrument is enabled, every file is measured and the
+    spans recorded in worker processes are merged into this process.
+    """
+    extractors = _resolve(extractors)
+    paths = _paths(source, extension = extension)
+    chunks = deque(
+        paths[i:i + chunksize] for i in range(0, len(paths), chunksize)
+    )
+    if workers == 0:
+        for chunk in chunks:
+            yield from _extract(chunk, extractors, timeout)
+        return
+    workers = workers or os.cpu_count() or 1
+    window = 2 * workers
+    reported = instrument.is_enabled()
+    task = _extract_reported if reported else _extract
+    pool = ProcessPoolExecutor(workers)
+    futures = {}
+    isolating = False
+    try:
+        while chunks:
+            # Keep the pool busy, or run only the head chunk while isolating
+            # the file that crashed a worker.
+            for index, chunk in enumerate(chunks):
+                if index >= (1 if isolating else window):
+                    break
+                if id(chunk) not in futures:
+                    futures[id(chunk)] = pool.submit(
+                        task, chunk, extractors, timeout
+                    )
+            head = chunks[0]
+            try:
+                results = futures.pop(id(head)).result()
+            except BrokenProcessPool:
+                pool.shutdown(wait = False, cancel_futures = True)
+                pool = ProcessPoolExecutor(workers)
+                futures.clear()
+                if not isolating:
+                    isolating = True
+                elif len(head) > 1:
+                    chunks.popleft()
+                    chunks.extendleft([path] for path in reversed(head))
+                else:
+                    chunks.popleft()
+                    yield _crashed(head[0], extractors)
+                continue
+            chunks.popleft()
+            isolating = False
+            if reported:
+                results, report = results
+                instrument.merge(report)
+            yield from results
+    finally:
+        pool.shutdown(wait = False, cancel_futures = True)
+
+###############################################################################
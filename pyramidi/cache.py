@@ -0,0 +1,272 @@
+"""
+Two-tier content-addressed cache for parsed files and derived features.
+
+Results are keyed by the extractor name, the SHA-256 of the input file's
+content and every other argument (defaults included), so editing a file or
+changing one parameter only recomputes what changed. The first tier is an
+in-process LRU; the optional second tier is a directory of pickles with
+size-based eviction, shared between processes and runs.
+
+Caching is off until configure() is called, or the PYRAMIDI_CACHE
+environment variable names a cache directory. configure() exports that
+variable, so worker processes started afterwards share the disk tier.
+Cached values are shared between callers; do not modify them in place.
+Use it for per-file extractors only: chord- and PCD-level models are
+cheaper to recompute than to hash and pickle, and every distinct argument
+would become its own file in the disk tier.
+"""
+###############################################################################
+# Standard Imports
+import hashlib
+import inspect
+import os
+import pickle
+import tempfile
+from collections import OrderedDict
+from functools import wraps
+# Local Imports
+from pyramidi.core import AnalyzedMidi
+from pyramidi.instrument import count
+###############################################################################
+# Constants
+__all__ = ['Cache', 'configure', 'disable', 'get_cache', 'cached', 'file_hash']
+ENVIRONMENT_VARIABLE = 'PYRAMIDI_CACHE'
+MISSING = object()
+###############################################################################
+class Cache:
+    """
+    LRU memory tier in front of an optional on-disk tier.
+
+    Attributes:
+        directory -- Disk tier location, or None for memory only.
+        memory_items -- Maximum number of values kept in memory.
+        disk_bytes -- Disk tier size above which the least recently used
+                      files are evicted.
+        hits, misses -- Lookup counters.
+    """
+    def __init__(
+        self,
+        directory: str = None,
+        memory_items: int = 1024,
+        disk_bytes: int = 2**30
+    ):
+        """
+        """
+        self.directory = directory
+        self.memory_items = memory_items
+        self.disk_bytes = disk_bytes
+        self.hits = 0
+        self.misses = 0
+        self._memory = OrderedDict()
+        self._disk_size = 0
+        if directory is not None:
+            os.makedirs(directory, exist_ok = True)
+            self._disk_size = sum(size for _, _, size in self._disk_entries())
+    ###########################################################################
+    def __repr__(self):
+        return (
+            f"Cache(directory={self.directory!r}, hits={self.hits}, "
+            f"misses={self.misses})"
+        )
+    ###########################################################################
+    def _path(self, key: str):
+        return os.path.join(self.directory, key[:2], key + '.pkl')
+    ###########################################################################
+    def _disk_entries(self):
+        """(mtime, path, size) of every file in the disk tier."""
+        entries = []
+        for root, dirs, files in os.walk(self.directory):
+            for filename in files:
+                path = os.path.join(root, filename)
+                try:
+                    stat = os.stat(path)
+                except OSError:
+                    continue
+                entries.append((stat.st_mtime, path, stat.st_size))
+        return entries
+    ###########################################################################
+    def get(self, key: str, default = None):
+        """Return the value stored under key, or default."""
+        value = self._memory.get(key, MISSING)
+        if value is not MISSING:
+            self._memory.move_to_end(key)
+            self.hits += 1
+            return value
+        if self.directory is not None:
+            path = self._path(key)
+            try:
+                with open(path, 'rb') as f:
+                    value = pickle.load(f)
+                # Mark as recently used for eviction.
+                os.utime(path)
+            except (OSError, EOFError, pickle.UnpicklingError):
+                value = MISSING
+            if value is not MISSING:
+                self._remember(key, value)
+                self.hits += 1
+                return value
+        self.misses += 1
+        return default
+    ###########################################################################
+    def set(self, key: str, value):
+        """Store value under key in both tiers."""
+        self._remember(key, value)
+        if self.directory is None:
+            return
+        path = self._path(key)
+        os.makedirs(os.path.dirname(path), exist_ok = True)
+        # Write then rename so concurrent readers never see partial files.
+        descriptor, temporary = tempfile.mkstemp(
+            dir = os.path.dirname(path), suffix = '.tmp'
+        )
+        with os.fdopen(descriptor, 'wb') as f:
+            pickle.dump(value, f, protocol = pickle.HIGHEST_PROTOCOL)
+        self._disk_size += os.path.getsize(temporary)
+        os.replace(temporary, path)
+        if self._disk_size > self.disk_bytes:
+            self._evict()
+    ###########################################################################
+    def _remember(self, key: str, value):
+        self._memory[key] = value
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.memory_items:
+            self._memory.popitem(last = False)
+    ###########################################################################
+    def _evict(self):
+        """Remove least recently used disk files down to 90% of the limit."""
+        entries = sorted(self._disk_entries())
+        size = sum(entry[2] for entry in entries)
+        for _, path, file_size in entries:
+            if size <= 0.9 * self.disk_bytes:
+                break
+            try:
+                os.remove(path)
+                size -= file_size
+            except OSError:
+                pass
+        self._disk_size = size
+    ###########################################################################
+    def clear(self):
+        """Empty both tiers."""
+        self._memory.clear()
+        if self.directory is not None:
+            for _, path, _ in self._disk_entries():
+                try:
+                    os.remove(path)
+                except OSError:
+                    pass
+        self._disk_size = 0
+
+###############################################################################
+_cache = None
+_file_hashes = {}
+###############################################################################
+def configure(
+    directory: str = None,
+    memory_items: int = 1024,
+    disk_bytes: int = 2**30
+):
+    """
+    Turn caching on for every cached function.
+
+    Keyword arguments:
+    directory -- Disk tier location; None keeps results in memory only.
+    memory_items -- Maximum number of values in the memory tier.
+    disk_bytes -- Disk tier size limit in bytes.
+
+    Returns:
+        The active Cache.
+    """
+    global _cache
+    _cache = Cache(
+        directory = directory,
+        memory_items = memory_items,
+        disk_bytes = disk_bytes
+    )
+    if directory is not None:
+        os.environ[ENVIRONMENT_VARIABLE] = os.path.abspath(directory)
+    return _cache
+
+###############################################################################
+def disable():
+    """Turn caching off."""
+    global _cache
+    _cache = None
+    os.environ.pop(ENVIRONMENT_VARIABLE, None)
+
+###############################################################################
+def get_cache():
+    """Return the active Cache, or None when caching is off."""
+    return _cache
+
+###############################################################################
+def file_hash(path):
+    """
+    SHA-256 of a file's content. Digests are remembered per path, size and
+    modification time, so unchanged files are read once per process.
+    """
+    stat = os.stat(path)
+    signature = (os.path.abspath(path), stat.st_size, stat.st_mtime_ns)
+    digest = _file_hashes.get(signature)
+    if digest is None:
+        with open(path, 'rb') as f:
+            digest = hashlib.sha256(f.read()).hexdigest()
+        _file_hashes[signature] = digest
+    return digest
+
+###############################################################################
+def cached(func = None, *, file: bool = False):
+    """
+    Decorator caching a function's results in the active Cache.
+
+    Keyword arguments:
+    file -- The first argument is a MIDI file; paths, and AnalyzedMidi
+            handles read from a path, are keyed by content hash. Calls with
+            other preloaded objects bypass the cache.
+
+    Calls whose arguments cannot be pickled bypass the cache. When caching
+    is off the decorated function is called directly.
+    """
+    if func is None:
+        return lambda func: cached(func, file = file)
+    name = f"{func.__module__}.{func.__qualname__}"
+    signature = inspect.signature(func)
+    ###########################################################################
+    @wraps(func)
+    def wrapper(*args, **kwargs):
+        cache = _cache
+        if cache is None:
+            return func(*args, **kwargs)
+        bound = signature.bind(*args, **kwargs)
+        bound.apply_defaults()
+        arguments = list(bound.arguments.items())
+        if file:
+            parameter, value = arguments[0]
+            if isinstance(value, AnalyzedMidi):
+                value = value.path
+            if not isinstance(value, (str, os.PathLike)):
+                return func(*args, **kwargs)
+            arguments[0] = (parameter, ('sha256', file_hash(value)))
+        if any(isinstance(value, AnalyzedMidi) for _, value in arguments):
+            return func(*args, **kwargs)
+        try:
+            key = hashlib.sha256(
+                pickle.dumps((name, arguments), protocol = 4)
+            ).hexdigest()
+        except (pickle.PicklingError, TypeError, AttributeError):
+            return func(*args, **kwargs)
+        result = cache.get(key, MISSING)
+        if result is MISSING:
+            count('cache_misses')
+            result = func(*args, **kwargs)
+            cache.set(key, result)
+        else:
+            count('cache_hits')
+        return result
+    return wrapper
+
+###############################################################################
+if os.environ.get(ENVIRONMENT_VARIABLE):
+    configure(os.environ[ENVIRONMENT_VARIABLE])
+
+###############################################################################
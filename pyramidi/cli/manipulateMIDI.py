@@ -1,6 +1,13 @@
 """Manipulate a MIDI file from the command line
 
-
+    --input is a single '.mid' file, a directory, a glob pattern, or a
+    '.csv'/'.jsonl' job manifest with 'input' and 'output' columns plus
+    optional per-job 'tempo', 'semitones', 'velocity' and 'articulation'.
+    Batches run over a worker pool (--jobs) and report progress per job.
+    Each batch output gets a '.sha256' sidecar holding the hash of its
+    input content and parameters; a later batch skips outputs whose sidecar
+    still matches unless --force is given. A single --input/--output file
+    is always written.
 
     main() is the CLI entrypoint function.
 
@@ -9,9 +16,127 @@
 
 # ============================================================================ #
 # Built-in Imports
+import csv
+import glob
+import hashlib
+import json
+import os
+import sys
 from argparse import ArgumentParser
-# Local Imports
-from pyramidi.manipulate import ManipulateMIDI
+from time import perf_counter
+
+# ============================================================================ #
+# Job parameters and how to read them from a manifest.
+PARAMETERS = {
+    "tempo": float,
+    "semitones": int,
+    "velocity": int,
+    "articulation": float
+}
+
+# Suffix of the file recording which job wrote an output.
+SIDECAR = ".sha256"
+
+# ============================================================================ #
+def is_batch(source):
+    """ True unless source is a single MIDI file. """
+    return not os.path.isfile(source) or \
+        os.path.splitext(source)[1].lower() in (".csv", ".jsonl")
+
+# ============================================================================ #
+def read_jobs(source, output, defaults):
+    """
+        Expand --input/--output into (input, output, parameters) jobs.
+            source = file, directory, glob pattern or manifest.
+            output = output file, or output directory for batches.
+            defaults = parameters given on the command line.
+    """
+    extension = os.path.splitext(source)[1].lower()
+    if extension in (".csv", ".jsonl") and os.path.isfile(source):
+        with open(source, newline = "") as f:
+            if extension == ".csv":
+                rows = list(csv.DictReader(f))
+            else:
+                rows = [json.loads(line) for line in f if line.strip()]
+        jobs = []
+        for row in rows:
+            parameters = dict(defaults)
+            for name, kind in PARAMETERS.items():
+                if row.get(name) not in (None, ""):
+                    parameters[name] = kind(row[name])
+            jobs.append((row["input"], row["output"], parameters))
+        return jobs
+    if not is_batch(source):
+        return [(source, output or "output.mid", dict(defaults))]
+    if os.path.isdir(source):
+        inputs = sorted(
+            os.path.join(root, name)
+            for root, _, names in os.walk(source)
+            for name in names if name.lower().endswith((".mid", ".midi"))
+        )
+        base = source
+    else:
+        inputs = sorted(glob.glob(source, recursive = True))
+        base = os.path.commonpath(inputs) if len(inputs) > 1 else \
+            os.path.dirname(inputs[0]) if inputs else ""
+    if output is None:
+        raise SystemExit("--output must name a directory for batch input.")
+    return [
+        (path, os.path.join(output, os.path.relpath(path, base)), dict(defaults))
+        for path in inputs
+    ]
+
+# ============================================================================ #
+def job_hash(job):
+    """ SHA-256 of the job's input content and parameters. """
+    source, _, parameters = job
+    digest = hashlib.sha256()
+    with open(source, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    digest.update(json.dumps(parameters, sort_keys = True).encode())
+    return digest.hexdigest()
+
+# ============================================================================ #
+def up_to_date(job):
+    """
+        True when the output exists and its sidecar records the same input
+        content and parameters.
+    """
+    _, output, _ = job
+    try:
+        with open(output + SIDECAR) as f:
+            recorded = f.read().strip()
+        return os.path.isfile(output) and recorded == job_hash(job)
+    except OSError:
+        return False
+
+# ============================================================================ #
+def run_job(job, record = False):
+    """
+        Worker task: manipulate one file.
+            record = write the output's job hash sidecar on success.
+        Returns (job, seconds, error message or None).
+    """
+    # Imported here so that --help and argument errors skip NumPy and Mido.
+    from pyramidi.manipulate import ManipulateMIDI
+    source, output, parameters = job
+    start = perf_counter()
+    try:
+        directory = os.path.dirname(output)
+        if directory:
+            os.makedirs(directory, exist_ok = True)
+        ManipulateMIDI(
+            midi_file = source,
+            output_file = output
+        ).qwik(**parameters)
+        if record:
+            with open(output + SIDECAR, "w") as f:
+                f.write(job_hash(job) + "\n")
+        error = None
+    except Exception as exception:
+        error = f"{type(exception).__name__}: {exception}"
+    return job, perf_counter() - start, error
 
 # ============================================================================ #
 def main():
@@ -29,69 +154,117 @@ def main():
     parser.add_argument(
         "--input",
         type = str,
-        help = "A file path to a midi file for manipulating."
+        required = True,
+        help = "A midi file, directory, glob pattern or .csv/.jsonl manifest."
     )
 
     # Set global MIDI velocity.
     parser.add_argument(
         "--velocity",
         type = int,
-        help = "A file path to a midi file for manipulating."
+        help = "Velocity of every note."
     )
 
     # Set global MIDI semitone transposition.
     parser.add_argument(
         "--semitones",
         type = int,
-        help = "A file path to a midi file for manipulating."
+        help = "Transposition in semitones."
     )
 
     # Set the global MIDI tempo.
     parser.add_argument(
         "--tempo",
         type = float,
-        help = "A file path to a midi file for manipulating."
+        help = "Tempo in beats per minute."
     )
 
-    # Set the global MIDI articulation 
-    # TODO: Add this functionality.
+    # Set the global MIDI articulation
     parser.add_argument(
         "--articulation",
         type = float,
-        help = "A file path to a midi file for manipulating."
+        help = "Factor applied to every note duration."
     )
 
     # Specify a filepath to output manipulated MIDI file.
     parser.add_argument(
         "--output",
         type = str,
-        help = "A file path to output the midi file."
+        help = "Output midi file, or output directory for batch input."
+    )
+
+    # Worker processes for batches.
+    parser.add_argument(
+        "--jobs",
+        type = int,
+        default = 1,
+        help = "Number of worker processes."
+    )
+
+    # Rewrite outputs that are already up to date.
+    parser.add_argument(
+        "--force",
+        action = "store_true",
+        help = "Rewrite batch outputs whose input and parameters are unchanged."
     )
 
     args = parser.parse_args()
 
     # ======================================================================== #
-    # TODO: Add checks for arguments.
-
     function_args = {}
-    if args.velocity is not None:
-        function_args["velocity"] = args.velocity
-    if args.tempo is not None:
-        function_args["tempo"] = args.tempo
-    if args.semitones is not None:
-        function_args["semitones"] = args.semitones
-    if args.articulation is not None:
-        function_args["articulation"] = args.articulation
-
-    # Manipulate MIDI file and output new MIDI file.
-    ManipulateMIDI(
-        midi_file = args.input,
-        output_file = args.output
-    ).qwik(**function_args)
+    for name in PARAMETERS:
+        if getattr(args, name) is not None:
+            function_args[name] = getattr(args, name)
+
+    if not glob.has_magic(args.input) and not os.path.exists(args.input):
+        raise SystemExit(f"--input {args.input} does not exist.")
+    jobs = read_jobs(args.input, args.output, function_args)
+    if not jobs:
+        raise SystemExit(f"No MIDI files match --input {args.input}.")
+    batch = is_batch(args.input)
+    pending = [
+        job for job in jobs
+        if args.force or not batch or not up_to_date(job)
+    ]
+    skipped = len(jobs) - len(pending)
+    if skipped:
+        print(f"Skipping {skipped} up-to-date output(s).", file = sys.stderr)
+
+    # Manipulate MIDI files and output new MIDI files.
+    start = perf_counter()
+    if args.jobs > 1 and len(pending) > 1:
+        from concurrent.futures import ProcessPoolExecutor, as_completed
+        pool = ProcessPoolExecutor(args.jobs)
+        results = as_completed(
+            pool.submit(run_job, job, batch) for job in pending
+        )
+        results = (future.result() for future in results)
+    else:
+        pool = None
+        results = (run_job(job, batch) for job in pending)
+    failed = 0
+    for done, (job, seconds, error) in enumerate(results, 1):
+        status = "ok" if error is None else f"failed ({error})"
+        failed += error is not None
+        print(
+            f"[{done}/{len(pending)}] {job[0]} -> {job[1]} "
+            f"{seconds:.3f}s {status}",
+            file = sys.stderr
+        )
+    if pool is not None:
+        pool.shutdown()
+    if len(pending) > 1:
+        print(
+            f"{len(pending) - failed} written, {failed} failed, {skipped} "
+            f"skipped in {perf_counter() - start:.1f}s.",
+            file = sys.stderr
+        )
+    if failed:
+        sys.exit(1)
 
 # =========================================================================== #
 # Execute when the module is not initialized from an import statement.
 if __name__ == "__main__":
     main()
 
-# =========================================================================== #
\ No newline at end of file
+# =========================================================================== #
@@ -1,13 +1,127 @@
 """
 """
 ###############################################################################
+# Standard Imports
+from functools import cached_property
+from os import PathLike, fspath
 # Local Imports
+from pyramidi.instrument import timed
 # Third Party Imports
+import numpy
 from mido import MidiFile, MidiTrack, MetaMessage, Message, tempo2bpm, merge_tracks
 ###############################################################################
 # Constants
-__all__ = ['pre_process', "cut"]
+__all__ = ['AnalyzedMidi', 'pre_process', "cut", "read_excerpt"]
 ###############################################################################
+class AnalyzedMidi:
+    """
+    Handle on one MIDI file that parses it once and computes every derived
+    view lazily, on first access, keeping it for later calls. Functions in
+    core, sdc, analysis and models accept it in place of a file.
+
+    Attributes:
+        path -- Source file path, or None for an in-memory MidiFile.
+        midi -- Mido MidiFile.
+        events -- SMFEvents from the native reader.
+        note_table, tempo_map, bar_index -- Paired notes and time maps.
+        merged -- AnalyzedMidi of the type 0 version (pre_process).
+        excerpt -- AnalyzedMidi of the first 8 bars of merged (cut).
+        excerpt_events -- SMFEvents of the same bars (read_excerpt), read
+                   as a prefix of the file unless it is already loaded.
+        slices -- Salami slices as NumPy arrays (analysis.slice_arrays).
+        pcd -- Pitch-class distribution (analysis.swierckj_pcd).
+        pitch_height, onset_rate -- SDC features of the excerpt.
+    """
+    def __init__(self, midi_file):
+        """
+        Keyword arguments:
+        midi_file -- '.mid' file path or Mido MidiFile.
+        """
+        if isinstance(midi_file, AnalyzedMidi):
+            midi_file = midi_file.path if midi_file.path is not None \
+                else midi_file.midi
+        if isinstance(midi_file, MidiFile):
+            self.path = None
+            self.__dict__['midi'] = midi_file
+        elif isinstance(midi_file, (str, PathLike)):
+            self.path = fspath(midi_file)
+        else:
+            raise TypeError(
+                "Must be a file path or Mido MidiFile."
+            )
+        self._cuts = {}
+    ###########################################################################
+    def __repr__(self):
+        source = repr(self.path) if self.path is not None else 'MidiFile'
+        return f"AnalyzedMidi({source})"
+    ###########################################################################
+    @cached_property
+    def midi(self):
+        return MidiFile(self.path)
+    ###########################################################################
+    @cached_property
+    def events(self):
+        from pyramidi.smf import read_smf
+        # Reuse a MidiFile that is already loaded instead of reading again.
+        if self.path is None or 'midi' in self.__dict__:
+            return read_smf(self.midi)
+        return read_smf(self.path)
+    ###########################################################################
+    @cached_property
+    def note_table(self):
+        from pyramidi.notes import NoteTable
+        return NoteTable.from_events(self.events)
+    ###########################################################################
+    @property
+    def tempo_map(self):
+        return self.note_table.tempo_map
+    ###########################################################################
+    @property
+    def bar_index(self):
+        return self.note_table.bar_index
+    ###########################################################################
+    @cached_property
+    def merged(self):
+        return AnalyzedMidi(pre_process(self.midi))
+    ###########################################################################
+    def cut(self, measures = 8):
+        """AnalyzedMidi of the first measures bars, kept per measures."""
+        if measures not in self._cuts:
+            self._cuts[measures] = AnalyzedMidi(cut(self.midi, measures))
+        return self._cuts[measures]
+    ###########################################################################
+    @property
+    def excerpt(self):
+        return self.merged.cut()
+    ###########################################################################
+    @cached_property
+    def excerpt_events(self):
+        if self.path is None or 'midi' in self.__dict__:
+            return self.excerpt.events
+        return read_excerpt(self.path)
+    ###########################################################################
+    @cached_property
+    def slices(self):
+        from pyramidi.analysis import slice_arrays
+        return slice_arrays(self)
+    ###########################################################################
+    @cached_property
+    def pcd(self):
+        from pyramidi.analysis import swierckj_pcd
+        return swierckj_pcd(self)
+    ###########################################################################
+    @cached_property
+    def pitch_height(self):
+        from pyramidi.sdc import get_pitch_height
+        return get_pitch_height(self)
+    ###########################################################################
+    @cached_property
+    def onset_rate(self):
+        from pyramidi.sdc import get_onset_rate
+        return get_onset_rate(self)
+
+###############################################################################
+@timed('merge')
 def pre_process(
     midi_file,
     savepath: str = None
@@ -17,13 +131,17 @@ def pre_process(
     Returns a Type 0 Mido MidiFile class object.
 
     Keyword arguments:
-    midiFile -- Any '.mid' file with relative path. 
+    midiFile -- Any '.mid' file with relative path, Mido MidiFile or
+                AnalyzedMidi (which returns its memoized merged view).
     savepath -- Filepath for a file version of output.
     """
     # TODO: Add savepath functionality
     ###########################################################################
+    if isinstance(midi_file, AnalyzedMidi):
+        return midi_file.merged
     # Read midi file with Mido.
-    midi_data = MidiFile(midi_file)
+    midi_data = midi_file if isinstance(midi_file, MidiFile) \
+        else MidiFile(midi_file)
     # Create new Type 0 Mido MidiFile class object, add input 'ticks_per_beat'.
     new_midi = MidiFile(
         type = 0,
@@ -48,6 +166,8 @@ def midi_2_key(midiNumber: int):
 
 ###############################################################################
 def get_tempo(midi_file):
+    if isinstance(midi_file, AnalyzedMidi):
+        midi_file = midi_file.midi
     tempo = [msg.tempo for msg in midi_file if msg.type == "set_tempo"]
     time_sig = [(msg.numerator, msg.denominator) for msg in midi_file if msg.type == "time_signature"]
     tempo2bpm(tempo[0])
@@ -55,48 +175,103 @@ def get_tempo(midi_file):
 
 ###############################################################################
 def get_timesig(midi_file):
+    if isinstance(midi_file, AnalyzedMidi):
+        midi_file = midi_file.midi
     time_sig = [(msg.numerator, msg.denominator) for msg in midi_file if msg.type == "time_signature"]
     return time_sig[0]
 
 # =========================================================================== #
+@timed('cut')
 def cut(midi_data, measures = 8):
+    """
+    Returns the first measures bars of a type 0 Mido MidiFile (or the
+    memoized cut of an AnalyzedMidi). The end tick comes from a BarIndex of
+    the track's time signatures and is found by binary search; notes still
+    sounding there are closed. Use NoteTable.excerpt for arbitrary ranges.
+    """
+    if isinstance(midi_data, AnalyzedMidi):
+        return midi_data.cut(measures)
+    from pyramidi.tempo import BarIndex
     # variables
     tpb = midi_data.ticks_per_beat
-    ticks = int()
-    target_ticks = int(
-        [lenBar(
-            (msg.numerator,
-             msg.denominator
-            )
-        ) * measures * tpb for msg in midi_data.tracks[0] if msg.type == "time_signature"
-        ][0])
+    messages = midi_data.tracks[0]
+    ticks = numpy.cumsum([msg.time for msg in messages], dtype = numpy.int64)
+    signatures = [
+        (index, msg.numerator, msg.denominator)
+        for index, msg in enumerate(messages) if msg.type == "time_signature"
+    ]
+    index, numerators, denominators = zip(*signatures) if signatures \
+        else ((), (), ())
+    target_ticks = BarIndex(
+        ticks[list(index)], numerators, denominators, tpb
+    ).bar2tick(measures)
+    # Keep messages up to the target, and those on it before a new note.
+    stop = int(numpy.searchsorted(ticks, target_ticks, side = 'left'))
+    while stop < len(messages) and ticks[stop] == target_ticks and not (
+        messages[stop].type == "note_on" and messages[stop].velocity > 0
+    ):
+        stop += 1
     active_notes = dict()
     # New midi data
     new = MidiFile(type=0, ticks_per_beat=tpb)
-    track = MidiTrack()
+    track = MidiTrack(messages[:stop])
     new.tracks.append(track)
-    for msg in midi_data.tracks[0]:
-        if isinstance(msg, MetaMessage):
-            if msg.type == "time_signature":
-                time_signature = (msg.numerator, msg.denominator)
-                target_ticks = lenBar(time_signature) * measures * tpb
-        elif isinstance(msg, Message):
-            if msg.type == "note_on" and msg.velocity > 0:
-                active_notes[msg.note] = msg.velocity
-            elif msg.type == "note_off" or (msg.type == "note_on" and msg.velocity == 0):
-                active_notes.pop(msg.note, None)
-        ticks += msg.time
-        # write
-        if ticks > target_ticks:
-            break
-        elif ticks == target_ticks and  msg.type == "note_on" and msg.velocity > 0:
-            break
-        else:
-            track.append(msg)
+    for msg in track:
+        if msg.type == "note_on" and msg.velocity > 0:
+            active_notes[msg.note] = msg.velocity
+        elif msg.type == "note_off" or (msg.type == "note_on" and msg.velocity == 0):
+            active_notes.pop(msg.note, None)
     # Clean up
     for leftover in active_notes:
         track.append(Message(type = "note_off", note = leftover, velocity = active_notes[leftover], time = 0))
     track.append(MetaMessage(type = 'end_of_track', time = 1))
     return new
 
-# =========================================================================== #
\ No newline at end of file
+# =========================================================================== #
+
+# =========================================================================== #
+def read_excerpt(midi_file, measures = 8):
+    """
+    Returns cut(pre_process(midi_file), measures) as SMFEvents. A '.mid'
+    path is read with smf.read_smf_prefix, which decodes only as far as the
+    end of the excerpt; other inputs, and files the native reader rejects,
+    are cut with Mido.
+    """
+    from pyramidi.smf import NOTE_OFF, NOTE_ON, SMFEvents, read_smf_prefix
+    if isinstance(midi_file, AnalyzedMidi):
+        return midi_file.merged.cut(measures).events
+    if not isinstance(midi_file, (str, PathLike)):
+        return SMFEvents.from_midi(cut(pre_process(midi_file), measures))
+    try:
+        events = read_smf_prefix(midi_file, measures = measures)
+    except (ValueError, IndexError, KeyError):
+        return SMFEvents.from_midi(cut(pre_process(midi_file), measures))
+    # Close sounding notes like cut: one note_off per pitch at the last tick.
+    active_notes = dict()
+    for status, note, velocity in zip(
+        events.status.tolist(), events.data1.tolist(), events.data2.tolist()
+    ):
+        if status & 0xF0 == NOTE_ON and velocity > 0:
+            active_notes[note] = velocity
+        else:
+            active_notes.pop(note, None)
+    end = events.end_tick
+    last = int(events.ticks[-1]) if len(events) else 0
+    gap = [end - last] + [0] * (len(active_notes) - 1)
+    return SMFEvents(
+        0,
+        events.ticks_per_beat,
+        numpy.concatenate((events.delta, gap[:len(active_notes)])),
+        numpy.concatenate((events.status, [NOTE_OFF] * len(active_notes))),
+        numpy.concatenate((events.data1, list(active_notes))),
+        numpy.concatenate((events.data2, list(active_notes.values()))),
+        numpy.zeros(len(events) + len(active_notes)),
+        [end + 1],
+        tempo_ticks = events.tempo_ticks,
+        tempos = events.tempos,
+        time_signature_ticks = events.time_signature_ticks,
+        numerators = events.numerators,
+        denominators = events.denominators
+    )
+
+# =========================================================================== #
@@ -0,0 +1,257 @@
+"""
+Opt-in instrumentation of the parsing and analysis hot paths.
+
+Spans time named stages (parse, merge, cut, pair, slice, write, and one
+"feature:<extractor>" stage per batch extractor) and counters tally work
+done (events, notes, slices, cache hits and misses). While disabled, the
+default, span returns a shared no-op context and count returns at once, so
+instrumented code pays one flag check per call.
+
+Spans nest, so stage times are inclusive. Inside file_span every stage is
+also charged to the current file, and the slowest files are kept with
+their per-stage breakdown. Worker processes return their report and
+batch.run merges it, so totals cover the whole run:
+
+    instrument.enable()
+    results = list(batch.run('corpus/'))
+    print(instrument.to_prometheus())
+"""
+###############################################################################
+# Standard Imports
+import heapq
+import json
+from contextlib import nullcontext
+from functools import wraps
+from time import perf_counter
+###############################################################################
+# Constants
+__all__ = [
+    'enable',
+    'disable',
+    'is_enabled',
+    'reset',
+    'span',
+    'file_span',
+    'timed',
+    'count',
+    'report',
+    'merge',
+    'to_json',
+    'to_prometheus'
+]
+_NULL = nullcontext()
+###############################################################################
+_enabled = False
+_slowest = 20
+# Stage name -> [calls, seconds, longest call in seconds].
+_stages = {}
+_counters = {}
+# Min-heap of (seconds, sequence, path, stages) for the slowest files.
+_files = []
+_sequence = 0
+# Stage seconds of the file being measured, or None outside file_span.
+_current = None
+###############################################################################
+def enable(slowest: int = 20):
+    """
+    Turn instrumentation on.
+
+    Keyword arguments:
+    slowest -- Number of slowest files to keep; None keeps every file.
+    """
+    global _enabled, _slowest
+    _enabled = True
+    _slowest = slowest
+
+###############################################################################
+def disable():
+    """Turn instrumentation off; recorded values are kept until reset."""
+    global _enabled
+    _enabled = False
+
+###############################################################################
+def is_enabled():
+    """True while instrumentation is on."""
+    return _enabled
+
+###############################################################################
+def reset():
+    """Forget every recorded span, counter and file."""
+    global _current
+    _stages.clear()
+    _counters.clear()
+    _files.clear()
+    _current = None
+
+###############################################################################
+def _add(name: str, seconds: float):
+    stage = _stages.get(name)
+    if stage is None:
+        _stages[name] = [1, seconds, seconds]
+    else:
+        stage[0] += 1
+        stage[1] += seconds
+        if seconds > stage[2]:
+            stage[2] = seconds
+    if _current is not None:
+        _current[name] = _current.get(name, 0.0) + seconds
+
+###############################################################################
+def _keep_file(path: str, seconds: float, stages: dict):
+    global _sequence
+    _sequence += 1
+    entry = (seconds, _sequence, path, stages)
+    if _slowest is None or len(_files) < _slowest:
+        heapq.heappush(_files, entry)
+    elif seconds > _files[0][0]:
+        heapq.heapreplace(_files, entry)
+
+###############################################################################
+class _Span:
+    """Times one stage."""
+    __slots__ = ('name', 'start')
+    def __init__(self, name: str):
+        self.name = name
+    ###########################################################################
+    def __enter__(self):
+        self.start = perf_counter()
+        return self
+    ###########################################################################
+    def __exit__(self, *exc_info):
+        _add(self.name, perf_counter() - self.start)
+        return False
+
+###############################################################################
+class _FileSpan:
+    """Charges the stages run inside it to one file."""
+    __slots__ = ('path', 'start', 'outer')
+    def __init__(self, path: str):
+        self.path = path
+    ###########################################################################
+    def __enter__(self):
+        global _current
+        self.outer = _current
+        _current = {}
+        self.start = perf_counter()
+        return self
+    ###########################################################################
+    def __exit__(self, *exc_info):
+        global _current
+        seconds = perf_counter() - self.start
+        stages = _current
+        _current = self.outer
+        _keep_file(self.path, seconds, stages)
+        return False
+
+###############################################################################
+def span(name: str):
+    """
+    Context manager timing the stage name; a shared no-op when disabled.
+    """
+    if not _enabled:
+        return _NULL
+    return _Span(name)
+
+###############################################################################
+def file_span(path):
+    """
+    Context manager charging the stages inside it to the file path, and
+    keeping the file if it is among the slowest.
+    """
+    if not _enabled:
+        return _NULL
+    return _FileSpan(str(path))
+
+###############################################################################
+def timed(name: str):
+    """Decorator timing every call of a function as the stage name."""
+    def decorator(func):
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            if not _enabled:
+                return func(*args, **kwargs)
+            with _Span(name):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+###############################################################################
+def count(name: str, value: int = 1):
+    """Add value to the counter name."""
+    if _enabled:
+        _counters[name] = _counters.get(name, 0) + value
+
+###############################################################################
+def report():
+    """
+    Snapshot of everything recorded.
+
+    Returns:
+        Dictionary with "stages" (name to calls, seconds and max_seconds),
+        "counters" (name to total) and "files" (slowest first, each with
+        its path, seconds and stages ordered from slowest).
+    """
+    return {
+        'stages': {
+            name: {'calls': calls, 'seconds': seconds, 'max_seconds': longest}
+            for name, (calls, seconds, longest) in sorted(_stages.items())
+        },
+        'counters': dict(sorted(_counters.items())),
+        'files': [
+            {
+                'path': path,
+                'seconds': seconds,
+                'stages': dict(sorted(
+                    stages.items(), key = lambda item: item[1], reverse = True
+                ))
+            }
+            for seconds, _, path, stages in sorted(_files, reverse = True)
+        ]
+    }
+
+###############################################################################
+def merge(other: dict):
+    """Add a report from another process to the values recorded here."""
+    for name, stage in other['stages'].items():
+        mine = _stages.setdefault(name, [0, 0.0, 0.0])
+        mine[0] += stage['calls']
+        mine[1] += stage['seconds']
+        mine[2] = max(mine[2], stage['max_seconds'])
+    for name, value in other['counters'].items():
+        _counters[name] = _counters.get(name, 0) + value
+    for entry in other['files']:
+        _keep_file(entry['path'], entry['seconds'], dict(entry['stages']))
+
+###############################################################################
+def to_json(data: dict = None, indent: int = 2):
+    """JSON text of a report, by default the current one."""
+    return json.dumps(report() if data is None else data, indent = indent)
+
+###############################################################################
+def _label(value: str):
+    return value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+###############################################################################
+def to_prometheus(data: dict = None, prefix: str = 'pyramidi'):
+    """
+    Prometheus text exposition of a report, by default the current one.
+    Per-file timings are left to the JSON report.
+    """
+    data = report() if data is None else data
+    lines = []
+    for metric, kind, field in (
+        ('stage_seconds_total', 'counter', 'seconds'),
+        ('stage_calls_total', 'counter', 'calls'),
+        ('stage_max_seconds', 'gauge', 'max_seconds')
+    ):
+        lines.append(f"# TYPE {prefix}_{metric} {kind}")
+        for name, stage in data['stages'].items():
+            lines.append(
+                f'{prefix}_{metric}{{stage="{_label(name)}"}} {stage[field]}'
+            )
+    for name, value in data['counters'].items():
+        lines.append(f"# TYPE {prefix}_{name}_total counter")
+        lines.append(f"{prefix}_{name}_total {value}")
+    return "\n".join(lines) + "\n"
+
+###############################################################################
@@ -1,11 +1,399 @@
 """
+Transforms of tempo, pitch, velocity and articulation for generating
+stimulus variants of a MIDI file.
+
+Transforms are chained on a Pipeline, which compiles them into a single
+vectorized pass over the event arrays of a file read once with the native
+reader. No intermediate MidiFiles are built and every track is preserved.
 """
 ###############################################################################
+# Standard Imports
+import csv
+import os
+from concurrent.futures import ProcessPoolExecutor
+from itertools import product
+from os import PathLike
 # Third-Party Imports
-from mido import MidiFile, MidiTrack, bpm2tempo
+import numpy
+from mido import MidiFile, bpm2tempo
+# Local Imports
+from pyramidi.core import AnalyzedMidi
+from pyramidi.smf import (
+    META, NOTE_OFF, NOTE_ON, SET_TEMPO, SMFEvents, read_smf, write_smf
+)
 ###############################################################################
 # Constants
-__all__ = ['ManipulateMIDI']
+__all__ = ['ManipulateMIDI', 'Pipeline', 'generate_grid']
+KEY_PRESSURE = 0xA0
+END_OF_TRACK = 0x2F
+GRID_PARAMETERS = ('tempo', 'semitones', 'velocity', 'articulation')
+###############################################################################
+class Pipeline:
+    """
+    Composable MIDI transforms applied in one pass.
+
+    Each method returns a new Pipeline with one more step, so a base
+    pipeline can be shared between variants:
+
+        base = Pipeline().transpose(12, max_pitch = 96)
+        fast = base.tempo(scale = 1.5).apply('tests/test.mid')
+
+    Attributes:
+        steps -- Tuple of (transform, parameters) in application order.
+    """
+    def __init__(self, steps = ()):
+        self.steps = tuple(steps)
+    ###########################################################################
+    def __repr__(self):
+        return f"Pipeline({list(self.steps)})"
+    ###########################################################################
+    def _then(self, kind: str, **parameters):
+        return Pipeline(self.steps + ((kind, parameters),))
+    ###########################################################################
+    def tempo(self, bpm: float = None, scale: float = None):
+        """
+        Set every tempo to bpm, and/or multiply the speed by scale (above 1
+        is faster). Files without a tempo at tick 0 get one there.
+        """
+        if bpm is None and scale is None:
+            raise TypeError(
+                "Give a bpm, a scale or both."
+            )
+        if (bpm is not None and bpm <= 0) or (scale is not None and scale <= 0):
+            raise TypeError(
+                "bpm and scale must be positive."
+            )
+        return self._then('tempo', bpm = bpm, scale = scale)
+    ###########################################################################
+    def transpose(
+        self,
+        semitones: int = 0,
+        min_pitch: int = 0,
+        max_pitch: int = 127
+    ):
+        """
+        Transpose every note by semitones, folding notes outside
+        [min_pitch, max_pitch] back by octaves.
+        """
+        _check_range(min_pitch, max_pitch)
+        return self._then(
+            'transpose',
+            semitones = int(semitones),
+            min_pitch = min_pitch,
+            max_pitch = max_pitch
+        )
+    ###########################################################################
+    def velocity(self, value: int = None, scale: float = None):
+        """
+        Set the velocity of every sounding note_on to value, and/or
+        multiply it by scale; results are kept within 1 to 127.
+        """
+        if value is None and scale is None:
+            raise TypeError(
+                "Give a value, a scale or both."
+            )
+        return self._then('velocity', value = value, scale = scale)
+    ###########################################################################
+    def articulation(self, factor: float = 1):
+        """
+        Multiply the duration of every note by factor, keeping onsets.
+        """
+        if factor <= 0:
+            raise TypeError(
+                "factor must be positive."
+            )
+        return self._then('articulation', factor = factor)
+    ###########################################################################
+    def apply(self, midi_file):
+        """
+        Run every step over a file.
+
+        Keyword arguments:
+        midi_file -- File path, Mido MidiFile, AnalyzedMidi, or SMFEvents
+                     read with full = True (reuse these for many variants).
+
+        Returns:
+            Transformed SMFEvents; call to_bytes() or write_smf() to encode
+            it, or to_midi() for a Mido MidiFile.
+        """
+        events = _full_events(midi_file)
+        ticks = events.ticks.copy()
+        status = events.status
+        data1 = events.data1.astype(numpy.int64)
+        data2 = events.data2.astype(numpy.int64)
+        payload = list(events.payload)
+        kind = status & 0xF0
+        sounding = (kind == NOTE_ON) & (data2 > 0)
+        pitched = ((status & 0xE0) == NOTE_OFF) | (kind == KEY_PRESSURE)
+        is_tempo = (status == META) & (data1 == SET_TEMPO)
+        tempo_index = numpy.flatnonzero(is_tempo)
+        tempos = numpy.array(
+            [int.from_bytes(payload[i][:3], 'big') for i in tempo_index],
+            dtype = numpy.float64
+        )
+        tempo_steps = []
+        articulation = 1.0
+        for step, parameters in self.steps:
+            if step == 'tempo':
+                tempo_steps.append(parameters)
+            elif step == 'transpose':
+                data1[pitched] = fold(
+                    data1[pitched] + parameters['semitones'],
+                    parameters['min_pitch'],
+                    parameters['max_pitch']
+                )
+            elif step == 'velocity':
+                if parameters['value'] is not None:
+                    data2[sounding] = parameters['value']
+                if parameters['scale'] is not None:
+                    data2[sounding] = numpy.round(
+                        data2[sounding] * parameters['scale']
+                    )
+                data2[sounding] = numpy.clip(data2[sounding], 1, 127)
+            elif step == 'articulation':
+                articulation *= parameters['factor']
+        track = events.track
+        moved = numpy.zeros(len(ticks), dtype = bool)
+        if articulation != 1:
+            on, off = _note_pairs(events)
+            duration = ticks[off] - ticks[on]
+            # Sounding notes never shrink to zero length.
+            duration = numpy.maximum(
+                numpy.round(duration * articulation).astype(numpy.int64),
+                numpy.minimum(duration, 1)
+            )
+            moved[off] = ticks[off] != ticks[on] + duration
+            ticks[off] = ticks[on] + duration
+        if tempo_steps:
+            if not numpy.any(ticks[tempo_index] == 0):
+                # Give the file an explicit default tempo at tick 0.
+                ticks, status, data1, data2, track, moved = (
+                    numpy.insert(column, 0, value) for column, value in (
+                        (ticks, 0), (status, META), (data1, SET_TEMPO),
+                        (data2, 0), (track, 0), (moved, False)
+                    )
+                )
+                payload.insert(0, None)
+                tempo_index = numpy.concatenate(([0], tempo_index + 1))
+                tempos = numpy.concatenate(([bpm2tempo(120)], tempos))
+            for parameters in tempo_steps:
+                if parameters['bpm'] is not None:
+                    tempos[:] = bpm2tempo(parameters['bpm'])
+                if parameters['scale'] is not None:
+                    tempos = tempos / parameters['scale']
+            tempos = numpy.clip(numpy.round(tempos), 1, 0xFFFFFF).astype(numpy.int64)
+            for index, tempo in zip(tempo_index.tolist(), tempos.tolist()):
+                payload[index] = tempo.to_bytes(3, 'big')
+        return _rebuild(
+            events, ticks, status, data1, data2, track, payload, moved
+        )
+
+###############################################################################
+def _check_range(min_pitch: int, max_pitch: int):
+    if not 0 <= min_pitch <= max_pitch <= 127 or max_pitch - min_pitch < 11:
+        raise TypeError(
+            "Pitch range must lie within 0-127 and span at least an octave."
+        )
+
+###############################################################################
+def fold(notes, min_pitch: int = 0, max_pitch: int = 127):
+    """
+    Move MIDI numbers outside [min_pitch, max_pitch] into the range by
+    whole octaves; works on ints and arrays.
+    """
+    _check_range(min_pitch, max_pitch)
+    notes = numpy.asarray(notes)
+    above = numpy.maximum(notes - max_pitch, 0)
+    below = numpy.maximum(min_pitch - notes, 0)
+    folded = notes - 12 * -(-above // 12) + 12 * -(-below // 12)
+    return folded if folded.ndim else int(folded)
+
+###############################################################################
+def _full_events(midi_file):
+    """Resolve a source to SMFEvents holding every event."""
+    if isinstance(midi_file, SMFEvents):
+        if midi_file.payload is None:
+            raise TypeError(
+                "SMFEvents must be read with full = True."
+            )
+        return midi_file
+    if isinstance(midi_file, AnalyzedMidi):
+        midi_file = midi_file.path if midi_file.path is not None \
+            else midi_file.midi
+    if isinstance(midi_file, (str, PathLike, MidiFile)):
+        return read_smf(midi_file, full = True)
+    raise TypeError(
+        "Must be a file path, Mido MidiFile, AnalyzedMidi or SMFEvents."
+    )
+
+###############################################################################
+def _note_pairs(events: SMFEvents):
+    """
+    Event indices of paired note_on and note_off events, paired first in,
+    first out per (track, channel, pitch) like NoteTable.from_events.
+    """
+    notes = numpy.flatnonzero((events.status & 0xE0) == NOTE_OFF)
+    on, off, sounding = [], [], {}
+    for index, status, note, velocity, track in zip(
+        notes.tolist(),
+        events.status[notes].tolist(),
+        events.data1[notes].tolist(),
+        events.data2[notes].tolist(),
+        events.track[notes].tolist()
+    ):
+        key = (track, status & 0x0F, note)
+        if status & 0xF0 == NOTE_ON and velocity > 0:
+            sounding.setdefault(key, []).append(index)
+        elif sounding.get(key):
+            on.append(sounding[key].pop(0))
+            off.append(index)
+    return (
+        numpy.array(on, dtype = numpy.int64),
+        numpy.array(off, dtype = numpy.int64)
+    )
+
+###############################################################################
+def _rebuild(events, ticks, status, data1, data2, track, payload, moved):
+    """
+    SMFEvents from transformed columns: events are re-sorted by tick within
+    each track (moved note-offs first on their new tick) and every
+    end_of_track stays last.
+    """
+    is_end = (status == META) & (data1 == END_OF_TRACK)
+    track_ends = numpy.zeros(len(events.track_ends), dtype = numpy.int64)
+    if len(ticks):
+        numpy.maximum.at(track_ends, track.astype(numpy.int64), ticks)
+    ticks = numpy.where(is_end, track_ends[track.astype(numpy.int64)], ticks)
+    order = numpy.lexsort((is_end, ~moved, ticks, track))
+    ticks, status, data1, data2, track = (
+        column[order] for column in (ticks, status, data1, data2, track)
+    )
+    delta = numpy.diff(ticks, prepend = 0)
+    starts = numpy.flatnonzero(numpy.diff(track.astype(numpy.int64), prepend = -1))
+    delta[starts] = ticks[starts]
+    is_tempo = (status == META) & (data1 == SET_TEMPO)
+    return SMFEvents(
+        events.type,
+        events.ticks_per_beat,
+        delta,
+        status,
+        data1,
+        data2,
+        track,
+        numpy.maximum(track_ends, events.track_ends),
+        tempo_ticks = ticks[is_tempo],
+        tempos = [
+            int.from_bytes(payload[i][:3], 'big') for i in order[is_tempo]
+        ],
+        time_signature_ticks = events.time_signature_ticks,
+        numerators = events.numerators,
+        denominators = events.denominators,
+        payload = [payload[i] for i in order]
+    )
+
+###############################################################################
+def _variant_name(stem: str, tempo, semitones, velocity, articulation):
+    """Deterministic file name of one grid variant."""
+    def value(parameter):
+        return "orig" if parameter is None else format(parameter, 'g')
+    return (
+        f"{stem}_t{value(tempo)}_s{semitones:+d}_v{value(velocity)}"
+        f"_a{value(articulation)}.mid"
+    )
+
+###############################################################################
+_shared = {}
+###############################################################################
+def _share(events: SMFEvents, min_pitch: int, max_pitch: int):
+    """Worker initializer: keep the parsed source for every task."""
+    _shared['events'] = events
+    _shared['range'] = (min_pitch, max_pitch)
+
+###############################################################################
+def _write_variants(jobs):
+    """Worker task: transform the shared source and write each variant."""
+    min_pitch, max_pitch = _shared['range']
+    for path, tempo, semitones, velocity, articulation in jobs:
+        pipeline = Pipeline().transpose(semitones, min_pitch, max_pitch)
+        if tempo is not None:
+            pipeline = pipeline.tempo(bpm = tempo)
+        if velocity is not None:
+            pipeline = pipeline.velocity(value = velocity)
+        if articulation is not None:
+            pipeline = pipeline.articulation(articulation)
+        write_smf(pipeline.apply(_shared['events']), path)
+    return len(jobs)
+
+###############################################################################
+def generate_grid(
+    source,
+    output_dir: str = ".",
+    tempos = (None,),
+    semitones = (0,),
+    velocities = (None,),
+    articulations = (None,),
+    min_pitch: int = 0,
+    max_pitch: int = 127,
+    workers: int = None,
+    chunksize: int = 32
+):
+    """
+    Write every combination of tempo, transposition, velocity and
+    articulation of one source file.
+
+    The source is parsed once and shared with the worker processes, which
+    derive each variant from its event arrays. Files are named after their
+    parameters, e.g. 'piece_t90_s+2_vorig_a0.8.mid', so reruns overwrite the
+    same outputs.
+
+    Keyword arguments:
+    source -- File path, Mido MidiFile, AnalyzedMidi or full SMFEvents.
+    output_dir -- Directory for the variants and 'manifest.csv'.
+    tempos -- BPMs to set; None keeps the file's tempos.
+    semitones -- Transpositions, folded into [min_pitch, max_pitch].
+    velocities -- Velocities to set; None keeps the file's velocities.
+    articulations -- Duration factors; None keeps note durations.
+    workers -- Number of worker processes, defaults to the CPU count;
+               0 writes everything in this process.
+    chunksize -- Number of variants sent to a worker at a time.
+
+    Returns:
+        Manifest rows, one dictionary per variant with its 'path' and
+        parameters; also written to output_dir/manifest.csv, which
+        batch.run accepts as a source.
+    """
+    _check_range(min_pitch, max_pitch)
+    events = _full_events(source)
+    if isinstance(source, AnalyzedMidi):
+        source = source.path
+    stem = os.path.splitext(os.path.basename(os.fspath(source)))[0] \
+        if isinstance(source, (str, PathLike)) else "variant"
+    os.makedirs(output_dir, exist_ok = True)
+    manifest = []
+    jobs = []
+    for parameters in product(tempos, semitones, velocities, articulations):
+        path = os.path.join(output_dir, _variant_name(stem, *parameters))
+        manifest.append(dict(zip(('path',) + GRID_PARAMETERS, (path,) + parameters)))
+        jobs.append((path,) + parameters)
+    chunks = [jobs[i:i + chunksize] for i in range(0, len(jobs), chunksize)]
+    if workers == 0:
+        _share(events, min_pitch, max_pitch)
+        for chunk in chunks:
+            _write_variants(chunk)
+    else:
+        with ProcessPoolExecutor(
+            workers or os.cpu_count() or 1,
+            initializer = _share,
+            initargs = (events, min_pitch, max_pitch)
+        ) as pool:
+            for _ in pool.map(_write_variants, chunks):
+                pass
+    with open(os.path.join(output_dir, 'manifest.csv'), 'w', newline = '') as f:
+        writer = csv.DictWriter(f, fieldnames = ('path',) + GRID_PARAMETERS)
+        writer.writeheader()
+        writer.writerows(manifest)
+    return manifest
+
 ###############################################################################
 class ManipulateMIDI:
     """
@@ -21,10 +409,26 @@ class ManipulateMIDI:
         self.midi_file = midi_file
         self.output_file = output_file
         if file == True:
-            self.midi = MidiFile(midi_file)
+            self._midi = None
+            self.events = read_smf(midi_file, full = True)
         else:
-            self.midi = midi_file
-        self.manipulated_midi = None
+            self._midi = midi_file
+            self.events = _full_events(midi_file)
+        self.manipulated_events = None
+    ###########################################################################
+    @property
+    def midi(self):
+        """Mido MidiFile of the input, read on first access."""
+        if self._midi is None:
+            self._midi = MidiFile(self.midi_file)
+        return self._midi
+    ###########################################################################
+    @property
+    def manipulated_midi(self):
+        """Mido MidiFile of the last manipulate() result, or None."""
+        if self.manipulated_events is None:
+            return None
+        return self.manipulated_events.to_midi()
     ###########################################################################
     def __str__(self):
         """
@@ -42,28 +446,28 @@ class ManipulateMIDI:
     ):
         """
         """
-        self.manipulated_midi = change_bpm(
-            self.midi,
+        pipeline = Pipeline().tempo(
             bpm = tempo
-        )
-        self.manipulated_midi = change_pitchHeight(
-            self.manipulated_midi,
+        ).transpose(
             semitones = semitones,
-            min = min_pitch,
-            max = max_pitch
-        )
-        self.manipulated_midi = change_velocity(
-            self.manipulated_midi,
-            velocity = velocity
+            min_pitch = min_pitch,
+            max_pitch = max_pitch
+        ).velocity(
+            value = velocity
+        ).articulation(
+            factor = articulation
         )
-        # TODO: make change_articulation work
-        #self.manipulated_midi = change_articulation(self.manipulated_mid,
-        #                                           articulation = articulation)
+        self.manipulated_events = pipeline.apply(self.events)
     ###########################################################################
-    def export(self):
+    def export(self, file = None):
         """
+        Write the manipulated file to output_file, or to file: a path or
+        any object with a write method. Returns the file's bytes.
         """
-        self.manipulated_midi.save(self.output_file)
+        return write_smf(
+            self.manipulated_events,
+            self.output_file if file is None else file
+        )
     ###########################################################################
     def qwik(self,
              tempo: float = 120,
@@ -76,8 +480,8 @@ class ManipulateMIDI:
         """
         self.manipulate(tempo = tempo,
                         semitones = semitones,
-                        min_pitch = 0,
-                        max_pitch = 127,
+                        min_pitch = min_pitch,
+                        max_pitch = max_pitch,
                         velocity = velocity,
                         articulation = articulation)
         self.export()
@@ -85,15 +489,10 @@ class ManipulateMIDI:
 ########################################################################
 def check_midiNo(note: int, min: int = 0, max: int = 127):
     """
+    Fold a MIDI number into [min, max] by octaves.
     """
-    if note > max:
-        new_note = check_midiNo(note - 12)
-        return new_note
-    elif note < min:
-        new_note = check_midiNo(note + 12)
-        return new_note
-    else: return note
-    
+    return fold(note, min_pitch = min, max_pitch = max)
+
 ###############################################################################
 def change_pitchHeight(midiFile: str,
                       semitones = 0,
@@ -101,114 +500,53 @@ def change_pitchHeight(midiFile: str,
                       max: int = 127):
     """
     """
-    #midiFile = MidiFile (midiFile)
-    new = MidiFile(type=0, ticks_per_beat = midiFile.ticks_per_beat)
-    track = MidiTrack()
-    new.tracks.append(track)
-    for i in range(len(midiFile.tracks)):
-        for msg in midiFile.tracks[i]:
-            if msg.type in ["note_on", "note_off"]:
-                new_note = check_midiNo(msg.note + semitones, 
-                                       min = min, max = max)
-                track.append(msg.copy(note = new_note))
-            else:
-                track.append(msg)   
-    return new
+    return Pipeline().transpose(
+        semitones, min_pitch = min, max_pitch = max
+    ).apply(midiFile).to_midi()
 
 ###############################################################################
 def change_velocity(midiFile: str, velocity = 64):
     """
     """
-    #midiFile = MidiFile(midiFile)
-    new = MidiFile(type=0, ticks_per_beat = midiFile.ticks_per_beat)
-    track = MidiTrack()
-    new.tracks.append(track)
-    for i in range(len(midiFile.tracks)):
-        for msg in midiFile.tracks[i]:
-            if msg.type == "note_on":
-                track.append(msg.copy(velocity = int(velocity)))
-            else:
-                track.append(msg)   
-    return new
+    return Pipeline().velocity(value = int(velocity)).apply(midiFile).to_midi()
 
 ###############################################################################
 def change_tempo(midiFile: str, tempo: float = 2.0):
     """
         MIDI tempo is given in microseconds per quarter note
         when multiplying the tempo of a file:
-        numbers below 1 will decrease the microseconds per quarter note, 
+        numbers below 1 will decrease the microseconds per quarter note,
         speeding up the file
-        numbers above 1 will increse the microseconds per quarter note, 
+        numbers above 1 will increse the microseconds per quarter note,
         slowing down the file
-        Intuitively, we thinking of a number above 1 increasing the tempo, 
+        Intuitively, we thinking of a number above 1 increasing the tempo,
         and below decreasing.
-        Therefore, we take 1/a of the tempo multiplier argument 
+        Therefore, we take 1/a of the tempo multiplier argument
         so it makes sense to the user.
     """
-    #midiFile = MidiFile (midiFile)
-    new = MidiFile(type=0, ticks_per_beat = midiFile.ticks_per_beat)
-    track = MidiTrack()
-    new.tracks.append(track)
-    for i in range(len(midiFile.tracks)):
-        for msg in midiFile.tracks[i]:
-            if msg.type == "set_tempo":
-                newTempo = int(msg.tempo * (1/tempo))
-                track.append(msg.copy(tempo = (newTempo)))
-            else:
-                track.append(msg)
-    return new
+    return Pipeline().tempo(scale = tempo).apply(midiFile).to_midi()
 
 ###############################################################################\
 def change_bpm(midiFile: str, bpm = float):
     """
     """
-    new = MidiFile(type=0, ticks_per_beat = midiFile.ticks_per_beat)
-    track = MidiTrack()
-    new.tracks.append(track)
-    tempo = bpm2tempo(bpm)
-    for i in range(len(midiFile.tracks)):
-        for msg in midiFile.tracks[i]:
-            if msg.type == "set_tempo":
-                track.append(msg.copy(tempo = (tempo)))
-            else:
-                track.append(msg)
-    return new
+    return Pipeline().tempo(bpm = bpm).apply(midiFile).to_midi()
 
 ###############################################################################
-# DEV
 def change_articulation(midiFile: str, duration: float = 1):
     """
+    Multiply the duration of every note by duration, keeping onsets.
     """
-    #midiFile = MidiFile (midiFile)
-    new = MidiFile(type=0, ticks_per_beat = midiFile.ticks_per_beat)
-    track = MidiTrack()
-    new.tracks.append(track)
-    for i in range(len(midiFile.tracks)):
-        for msg in midiFile.tracks[i]:
-            if msg.type in ["note_on", "note_off"]:
-                if msg.time > 0:
-                    track.append(msg.copy(time = int(msg.time * duration)))
-                else: 
-                    track.append(msg)
-            else:
-                track.append(msg)
-    return new
+    return Pipeline().articulation(duration).apply(midiFile).to_midi()
 
-"""
-abs_time = 0
-for i in range(len(midiFile.tracks)):
-    for msg in midiFile.tracks[i]:
-        abs_time = abs_time + msg.time
-        print(msg.copy(time = abs_time))
-        if msg.type == "note_on":
-            for next_msg in midiFile.tracks[i][index + 1:]:
-                if msg.type == "note_off" or msg.velocity == 0:
-                    pass
-"""           
 ###############################################################################
-def export(midiFile, filename):
+def export(midiFile, filename = None):
     """
+    Write a Mido MidiFile or full SMFEvents to filename: a path, any object
+    with a write method, or None. Returns the file's bytes.
     """
-    midiFile.save(filename)
+    if isinstance(midiFile, MidiFile):
+        midiFile = SMFEvents.from_midi(midiFile, full = True)
+    return write_smf(midiFile, filename)
 
-###############################################################################
\ No newline at end of file
+###############################################################################
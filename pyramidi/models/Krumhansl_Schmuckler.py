@@ -34,9 +34,12 @@ International Conference on Music Perception and Cognition (ICMPC 10);
     2008, Sapporo, Japan.
 """
 ###############################################################################
+# Standard Imports
+from functools import lru_cache
+# Local Imports
+from pyramidi.core import AnalyzedMidi
 # Third Party Imports
-from scipy.stats import pearsonr, spearmanr
-from scipy.spatial.distance import cosine, euclidean
+import numpy
 ###############################################################################
 # Constants
 PROFILES = {
@@ -264,12 +267,15 @@ for profile in PROFILES:
                                            for (ind, val) in enumerate(org)]     
     PROFILES[profile] = buffer
 
+# Similarity of two distributions, as computed for whole batches below.
 SIMILARITY_METRICS = {
-    'pearsonr': lambda u, v: pearsonr(u, v)[0],
-    'cosine': lambda u, v: 1 - cosine(u, v),
-    'euclidean': lambda u, v: 1 - euclidean(u, v),
-    'spearman': lambda u, v: spearmanr(u, v)[0] 
+    'pearsonr': lambda u, v: _similarity(u, v, 'pearsonr'),
+    'cosine': lambda u, v: _similarity(u, v, 'cosine'),
+    'euclidean': lambda u, v: _similarity(u, v, 'euclidean'),
+    'spearman': lambda u, v: _similarity(u, v, 'spearman')
 }
+# Row order of the compiled (24 x 12) profile matrices and keyfinding output.
+KEYS = [str(pc) + "_" + mode for mode in ("major", "minor") for pc in range(12)]
 ###############################################################################
 def get_profiles():
     """
@@ -298,33 +304,206 @@ def get_similarity_metrics():
     return set([i for i in SIMILARITY_METRICS.keys()])
 
 ###############################################################################
-def keyfinding(
-    pitchDistribution: list,
+def _rank(rows):
+    """Average ranks (ties share their mean rank) along the last axis."""
+    less = (rows[:, :, None] > rows[:, None, :]).sum(axis = 2)
+    equal = (rows[:, :, None] == rows[:, None, :]).sum(axis = 2)
+    return less + (equal + 1) / 2
+
+###############################################################################
+def _prepare(rows, similarity: str):
+    """
+    Transform (N x 12) rows so that the similarity metric becomes a dot
+    product: Pearson and Spearman rows are (ranked,) centred and scaled to
+    unit length, cosine rows are scaled to unit length. Euclidean rows are
+    returned unchanged.
+    """
+    rows = numpy.asarray(rows, dtype = numpy.float64)
+    if similarity == "spearman":
+        rows = _rank(rows)
+    if similarity in ("pearsonr", "spearman"):
+        rows = rows - rows.mean(axis = 1, keepdims = True)
+    if similarity != "euclidean":
+        with numpy.errstate(invalid = "ignore", divide = "ignore"):
+            rows = rows / numpy.linalg.norm(rows, axis = 1, keepdims = True)
+    return rows
+
+###############################################################################
+@lru_cache(maxsize = None)
+def profile_matrix(
     profile: str = "KrumhanslKessler",
-    similarity: str = 'pearsonr'
+    similarity: str = "pearsonr"
 ):
     """
+    Rotated key profiles as a read-only (24 x 12) matrix prepared for a
+    similarity metric. Rows follow KEYS: 0-11 major, then 0-11 minor.
     """
-    if not isinstance(pitchDistribution, list):
-        raise TypeError(
-            "must be pitch distribution."
-        )
-    if profile not in PROFILES.keys():
+    matrix = _prepare(
+        [PROFILES[profile][key] for key in KEYS],
+        similarity
+    )
+    matrix.flags.writeable = False
+    return matrix
+
+###############################################################################
+def _check(profile: str, similarity: str, allow_all: bool = False):
+    if profile not in PROFILES.keys() and not (allow_all and profile == "all"):
         raise TypeError(
             "Invalid profile name"
         )
-    if similarity not in SIMILARITY_METRICS.keys():
+    if similarity not in SIMILARITY_METRICS.keys() and \
+            not (allow_all and similarity == "all"):
         raise TypeError(
             "Invalid similarity metric."
         )
-    similarity_function = SIMILARITY_METRICS[similarity]
-    coefis = {}
-    for key in PROFILES[profile]:
-        coefis[key] = similarity_function(
-            PROFILES[profile][key],
-            pitchDistribution
+
+###############################################################################
+def _scores(distributions, matrices, similarity: str):
+    """
+    Similarity of prepared (N x 12) distributions to (P x 24 x 12)
+    prepared profile matrices, as a (P x N x 24) array.
+    """
+    if similarity == "euclidean":
+        squared = (distributions**2).sum(axis = 1)[None, :, None] + \
+            (matrices**2).sum(axis = 2)[:, None, :] - \
+            2 * numpy.einsum("nk,pjk->pnj", distributions, matrices)
+        return 1 - numpy.sqrt(numpy.maximum(squared, 0))
+    return numpy.einsum("nk,pjk->pnj", distributions, matrices)
+
+###############################################################################
+def _similarity(u, v, similarity: str):
+    """Similarity of two distributions with the batch kernels."""
+    return float(_scores(
+        _prepare([u], similarity),
+        _prepare([v], similarity)[None],
+        similarity
+    )[0, 0, 0])
+
+###############################################################################
+def keyfinding_batch(
+    pitchDistributions,
+    profile: str = "KrumhanslKessler",
+    similarity: str = "pearsonr"
+):
+    """
+    Keyfinding coefficients of many pitch distributions at once.
+
+    Arguments:
+        pitchDistributions -- (N x 12) array-like, or a single distribution.
+        profile -- Key profile name, see get_profiles().
+        similarity -- Similarity metric name, see get_similarity_metrics().
+
+    Returns:
+        (N x 24) array of coefficients, columns ordered as KEYS.
+        Distributions with no variance give NaN for Pearson/Spearman.
+    """
+    _check(profile, similarity)
+    distributions = _prepare(numpy.atleast_2d(pitchDistributions), similarity)
+    matrix = profile_matrix(profile, similarity)
+    return _scores(distributions, matrix[None], similarity)[0]
+
+###############################################################################
+def keyfinding_all(pitchDistributions):
+    """
+    Keyfinding coefficients for every profile and similarity metric.
+
+    Arguments:
+        pitchDistributions -- (N x 12) array-like, or a single distribution.
+
+    Returns:
+        (profiles, similarities, coefficients): sorted profile and metric
+        names, and a (profiles x similarities x N x 24) array.
+    """
+    profiles = sorted(PROFILES.keys())
+    similarities = sorted(SIMILARITY_METRICS.keys())
+    raw = numpy.atleast_2d(pitchDistributions)
+    coefficients = numpy.stack([
+        _scores(
+            _prepare(raw, similarity),
+            numpy.stack([profile_matrix(p, similarity) for p in profiles]),
+            similarity
+        )
+        for similarity in similarities
+    ], axis = 1)
+    return profiles, similarities, coefficients
+
+###############################################################################
+def mode_from_coefficients(coefficients, method: str = "best"):
+    """
+    Reduce (... x 24) keyfinding coefficients, columns ordered as KEYS, to
+    mirmode values.
+    """
+    major = coefficients[..., :12]
+    minor = coefficients[..., 12:]
+    if method == "best":
+        return major.max(axis = -1) - minor.max(axis = -1)
+    return major.sum(axis = -1) + minor.sum(axis = -1)
+
+###############################################################################
+def mirmode_batch(
+    pitchDistributions,
+    weights: str = "KrumhanslKessler",
+    method: str = "best",
+    similarity: str = "pearsonr"
+):
+    """
+    mirmode of many pitch distributions at once.
+
+    Arguments:
+        pitchDistributions -- (N x 12) array-like, or a single distribution.
+        weights -- Key profile name, or "all" for every profile.
+        method -- "best" or "sum".
+        similarity -- Similarity metric name, or "all" for every metric.
+
+    Returns:
+        (N,) array, or with "all" a dict keyed by (profile, similarity).
+    """
+    if method not in [
+        "best",
+        "sum"
+    ]:
+        raise TypeError(
+            "method must be 'best' or 'sum'."
+        )
+    _check(weights, similarity, allow_all = True)
+    if weights == "all" or similarity == "all":
+        profiles, similarities, coefficients = keyfinding_all(
+            pitchDistributions
         )
-    return coefis
+        modes = mode_from_coefficients(coefficients, method)
+        return {
+            (p, s): modes[i, j]
+            for i, p in enumerate(profiles)
+            for j, s in enumerate(similarities)
+            if weights in ("all", p) and similarity in ("all", s)
+        }
+    return mode_from_coefficients(
+        keyfinding_batch(pitchDistributions, weights, similarity),
+        method
+    )
+
+###############################################################################
+def keyfinding(
+    pitchDistribution: list,
+    profile: str = "KrumhanslKessler",
+    similarity: str = 'pearsonr'
+):
+    """
+    Correlate a pitch distribution, or the PCD of an AnalyzedMidi, with
+    all 24 rotations of a key profile.
+
+    Returns:
+        Dictionary of coefficients keyed "<tonic pc>_major|minor".
+    """
+    if isinstance(pitchDistribution, AnalyzedMidi):
+        pitchDistribution = list(pitchDistribution.pcd.values())
+    if not isinstance(pitchDistribution, list):
+        raise TypeError(
+            "must be pitch distribution."
+        )
+    _check(profile, similarity)
+    coefis = keyfinding_batch(pitchDistribution, profile, similarity)[0]
+    return {key: float(value) for key, value in zip(KEYS, coefis)}
 
 ###############################################################################
 def mirmode(
@@ -334,7 +513,12 @@ def mirmode(
     similarity: str = "pearsonr"
 ):
     """
+    Major/minor mode strength of a pitch distribution, or the PCD of an
+    AnalyzedMidi, after MIRtoolbox: best major minus best minor coefficient
+    ("best"), or the summed coefficients ("sum").
     """
+    if isinstance(pitchDistribution, AnalyzedMidi):
+        pitchDistribution = list(pitchDistribution.pcd.values())
     if not isinstance(
         pitchDistribution,
         list
@@ -342,29 +526,17 @@ def mirmode(
         raise TypeError(
             "coefis must be list of integers"
         )
-    if weights not in PROFILES.keys():
+    if "all" in (weights, similarity):
         raise TypeError(
-            "Invalid profile name"
+            "mirmode takes one profile and similarity; use mirmode_batch "
+            "for 'all'."
         )
-    if method not in [
-        "best",
-        "sum"
-    ]:
-        raise TypeError(
-            "method must be 'best' or 'sum'."
-        )
-    coefis = keyfinding(
+    _check(weights, similarity)
+    return float(mirmode_batch(
         pitchDistribution,
-        profile = weights,
+        weights = weights,
+        method = method,
         similarity = similarity
-    )
-    if method == "best":
-        max_major = max([coefis[key] for key in coefis if 'major' in key])
-        max_minor = max([coefis[key] for key in coefis if 'minor' in key])
-        return max_major - max_minor
-    elif method == "sum":
-        sum_major = sum([coefis[key] for key in coefis if 'major' in key])
-        sum_minor = sum([coefis[key] for key in coefis if 'minor' in key])
-        return sum_major + sum_minor
+    )[0])
 
 ###############################################################################
\ No newline at end of file
@@ -4,9 +4,16 @@ Implemented by Konrad Swierczek and Karen Chan 2022
 Digital Music Lab, McMaster University
 """
 ###############################################################################
+# Standard Imports
+from functools import lru_cache
+# Third Party Imports
+import numpy
+###############################################################################
 # Constants
 __all__ = [
-    'PitchSalience'
+    'PitchSalience',
+    'pitch_salience',
+    'salience_table'
 ]
 WEIGHTS88 = [
     1,
@@ -36,9 +43,107 @@ WEIGHTS93 = [
     2,
     0
 ]
+###############################################################################
+def _salience(pc_chord, weights):
+    """
+    Parncutt salience of a pitch-class indicator vector. Returns the
+    rounded salience of every pitch class, ra and the root pitch class
+    (None when several pitch classes share the highest salience).
+    """
+    weight_sums = []
+    for pc in range(
+        0,
+        12
+    ):
+        pc_index = [i % 12 for i in range(pc, pc+11)]
+        weight_sums.append(sum(list(pc_chord[ind] * 
+                                    weight for weight, ind in \
+                                        zip(weights,pc_index))))
+    rasums = [pc/max(weight_sums) for pc in weight_sums]
+    ra = round(sum(rasums)**0.5, 3)
+    ps = [round((1 / ra) * pc, 3) for pc in rasums]
+    if len([index for index, value in enumerate(ps) if 
+            value == max(ps)]) > 1:
+        root_pc = None
+    else:
+        root_pc = ps.index(max(ps))
+    return ps, ra, root_pc
+
+###############################################################################
+@lru_cache(maxsize = None)
+def salience_table(weights = 93):
+    """
+    Salience of every pitch-class set, indexed by 12-bit mask (bit pc set
+    when pitch class pc sounds). Built once per weight set.
+
+    Returns:
+        (ps, ra, root_pc): read-only (4096 x 12), (4096,) and (4096,)
+        arrays; root_pc is -1 where the root is ambiguous, and row 0 (the
+        empty set) is NaN.
+    """
+    weight_set = WEIGHTS88 if weights == 88 else WEIGHTS93
+    ps = numpy.full((4096, 12), numpy.nan)
+    ra = numpy.full(4096, numpy.nan)
+    root_pc = numpy.full(4096, -1, dtype = numpy.int64)
+    for mask in range(1, 4096):
+        pc_chord = [(mask >> pc) & 1 for pc in range(12)]
+        ps[mask], ra[mask], root = _salience(pc_chord, weight_set)
+        if root is not None:
+            root_pc[mask] = root
+    for array in (ps, ra, root_pc):
+        array.flags.writeable = False
+    return ps, ra, root_pc
+
+###############################################################################
+def pc_mask(chord):
+    """12-bit pitch-class set mask of a chord of MIDI numbers."""
+    mask = 0
+    for note in chord:
+        mask |= 1 << (note % 12)
+    return mask
+
+###############################################################################
+def pitch_salience(chords, weights = 93):
+    """
+    Pitch salience and root of many chords at once.
+
+    Arguments:
+        chords -- List of chords, each a list of MIDI numbers.
+        weights -- 88 or 93, the Parncutt weight set.
+
+    Returns:
+        (ps, root): (N x 12) array of pitch-class saliences and (N,) array
+        of root MIDI numbers (the last chord note of the root pitch class),
+        -1 where the root is ambiguous.
+    """
+    ps_table, _, root_table = salience_table(weights)
+    lengths = numpy.array([len(chord) for chord in chords], dtype = numpy.int64)
+    width = max(lengths.max(initial = 0), 1)
+    notes = numpy.full((len(chords), width), -1, dtype = numpy.int64)
+    valid = numpy.arange(width)[None, :] < lengths[:, None]
+    notes[valid] = numpy.concatenate(
+        [numpy.asarray(chord, dtype = numpy.int64) for chord in chords] or [[]]
+    )
+    if numpy.any(lengths == 0):
+        raise TypeError(
+            "Chords must contain at least one note."
+        )
+    bits = numpy.where(valid, numpy.left_shift(1, notes % 12), 0)
+    masks = numpy.bitwise_or.reduce(bits, axis = 1)
+    root_pc = root_table[masks]
+    matches = valid & (notes % 12 == root_pc[:, None])
+    last = width - 1 - numpy.argmax(matches[:, ::-1], axis = 1)
+    root = numpy.where(
+        root_pc >= 0,
+        notes[numpy.arange(len(notes)), last],
+        -1
+    )
+    return ps_table[masks], root
+
 ###############################################################################
 class PitchSalience:
     """
+    Parncutt pitch salience of a chord, read from salience_table.
     """
     def __init__ (
         self,
@@ -47,36 +152,26 @@ class PitchSalience:
     ):
         """
         Chord = list of MIDI numbers
-        weights = 
-        returns
+        weights = 88 or 93, the Parncutt weight set
         """
         self.chord = chord
         if weights == 88:
             self.weights = WEIGHTS88
         else: 
             self.weights = WEIGHTS93
-        chord_pc =(note % 12 for note in self.chord)
-        pc_chord = [0 for i in range(12)]
-        for note in chord_pc:
-            pc_chord[note] = 1
-        weight_sums = []
-        for pc in range(
-            0,
-            12
-        ):
-            pc_index = [i % 12 for i in range(pc, pc+11)]
-            weight_sums.append(sum(list(pc_chord[ind] * 
-                                        weight for weight, ind in \
-                                            zip(self.weights,pc_index))))
-        rasums = [pc/max(weight_sums) for pc in weight_sums]
-        self.ra = round(sum(rasums)**0.5, 3)
-        self.ps = [round((1 / self.ra) * pc, 3) for pc in rasums]
-        if len([index for index, value in enumerate(self.ps) if 
-                value == max(self.ps)]) > 1:
+        mask = pc_mask(self.chord)
+        if mask == 0:
+            raise TypeError(
+                "Chord must contain at least one note."
+            )
+        ps, ra, root_pc = salience_table(88 if weights == 88 else 93)
+        self.ra = float(ra[mask])
+        self.ps = ps[mask].tolist()
+        if root_pc[mask] < 0:
             self.root_pc = None
             self.root = None
         else:
-            self.root_pc = self.ps.index(max(self.ps))
+            self.root_pc = int(root_pc[mask])
             self.rootmatcher = {note%12:[note] for note in chord}
             #append MIDI notes to list in values of rootmatcher
             self.root = self.rootmatcher[self.root_pc][0]
@@ -84,4 +179,4 @@ class PitchSalience:
             #will return higher of roots
             #must return LOWER of the all root options, or both
 
-###############################################################################
\ No newline at end of file
+###############################################################################
@@ -1,11 +1,48 @@
+"""
+Tonal attraction model after Woolhouse 2009.
 
+Event attraction between two chords combines interval cycles, voice
+leading, root salience (Parncutt 1993) and consonance/dissonance. The
+engine pads whole progressions into arrays and evaluates every requested
+chord pair with broadcast NumPy operations; chroma and key attraction are
+cached per unique chord.
+"""
+###############################################################################
+# Standard Imports
+from functools import lru_cache
 from itertools import combinations
+# Third Party Imports
+import numpy
+# Local Imports
+from pyramidi.core import AnalyzedMidi
+from pyramidi.models.PitchSalience import pitch_salience
+###############################################################################
+# Constants
 __all__ = [
     'event_attraction',
+    'attraction',
     'chroma_attraction',
+    'chroma_attraction_batch',
     'key_attraction',
+    'key_attraction_batch',
     'diatonicity'
 ]
+# Consonant ("C") or dissonant ("D") absolute pitch-class differences.
+CDDICT = {
+    0: "C",
+    1: "D",
+    2: "D",
+    3: "C",
+    4: "C",
+    5: "C",
+    6: "D",
+    7: "C",
+    8: "C",
+    9: "C",
+    10: "D",
+    11: "D"
+}
+DISSONANT = numpy.array([CDDICT[interval] == "D" for interval in range(12)])
 # Diatonic Sets, represented by pitch class root (0 = C) and mode (ma = major).
 # Values are represented in pitch classes.
 DIATONIC_SETS = {
@@ -40,6 +77,78 @@ ALLPC = list(range(
     0,
     12
 ))
+###############################################################################
+def _pad(chords):
+    """Chords as a -1 padded (N x M) integer array and a validity mask."""
+    lengths = numpy.array([len(chord) for chord in chords], dtype = numpy.int64)
+    if numpy.any(lengths == 0):
+        raise TypeError(
+            "Chords must contain at least one note."
+        )
+    width = max(lengths.max(initial = 0), 1)
+    notes = numpy.full((len(chords), width), -1, dtype = numpy.int64)
+    mask = numpy.arange(width)[None, :] < lengths[:, None]
+    notes[mask] = numpy.concatenate(
+        [numpy.asarray(chord, dtype = numpy.int64) for chord in chords] or [[]]
+    )
+    return notes, mask
+
+###############################################################################
+def _dissonant(notes, mask):
+    """Whether each padded chord contains any dissonant interval."""
+    pcs = notes % 12
+    intervals = numpy.abs(pcs[:, :, None] - pcs[:, None, :])
+    pairs = mask[:, :, None] & mask[:, None, :] & \
+        numpy.triu(numpy.ones((notes.shape[1],) * 2, dtype = bool), k = 1)
+    return (DISSONANT[intervals] & pairs).any(axis = (1, 2))
+
+###############################################################################
+def _event_attraction(
+    pre_notes,
+    pre_mask,
+    pre_root,
+    pre_dissonant,
+    suc_notes,
+    suc_mask,
+    suc_root,
+    suc_dissonant,
+    alpha,
+    beta,
+    Gamma,
+    delta
+):
+    """
+    Unrounded event attraction for P chord pairs given as padded (P x M)
+    note arrays, root MIDI numbers (-1 for none) and dissonance flags.
+    """
+    valid = pre_mask[:, :, None] & suc_mask[:, None, :]
+    # Pitch Distance Matrix
+    pd = numpy.abs(pre_notes[:, :, None] - suc_notes[:, None, :])
+    # Interval Cycle Matrix
+    ic_mat = 12 / numpy.gcd(pd, 12)
+    # Voice Leading Matrix
+    vl_mat = alpha / (pd + alpha)
+    # Interval Cycle/Voice Leading Matrix
+    icvl = ic_mat * vl_mat
+    # Root Salience Matrices
+    rs_prec = numpy.where(pre_notes == pre_root[:, None], beta, 1)
+    rs_succ = numpy.where(suc_notes == suc_root[:, None], Gamma, 1)
+    rs2 = numpy.where(valid, rs_prec[:, :, None] * rs_succ[:, None, :], 0)
+    rs3 = rs2 / rs2.sum(axis = (1, 2), keepdims = True)
+    # Consonance/Dissonance weighting
+    cd = numpy.ones(len(pre_notes))
+    cd[pre_dissonant & ~suc_dissonant] = 1 + delta
+    cd[~pre_dissonant & suc_dissonant] = 1 - delta
+    ea_matrix = numpy.where(valid, icvl * rs3, 0)
+    return ea_matrix.sum(axis = (1, 2)) * cd / 12
+
+###############################################################################
+def _features(chords):
+    """Padded notes, mask, Parncutt roots and dissonance of chords."""
+    notes, mask = _pad(chords)
+    _, roots = pitch_salience([list(chord) for chord in chords])
+    return notes, mask, roots, _dissonant(notes, mask)
+
 ###############################################################################
 def event_attraction(
     pre_chord,
@@ -57,80 +166,85 @@ def event_attraction(
         beta = Preceding chord Root Salience weighting variable.
         Gamma = Succeding chord Root Salience weighting variable.
         delta = Consonance/Dissonance weighting variable.
-        Returns blah blah blah. 
-    """
-###########################################################################
-    def cd_chord(chord):
-        """ Calculate if chord contains consonant or dissonant intervals. 
-            chord = list of MIDI numbers representing a chord
-            Returns "D" if chord contains any dissonant intervals.
-            Returns "C" if chord only contains consonant intervals. 
-        """
-        intervals = [abs((interval[0]%12)- (interval[1]%12)) for interval in list(combinations(chord,2))]
-        cd_intervals = [CDDICT[interval] for interval in intervals]
-        if "D" in cd_intervals:
-            return "D"
-        else:
-            return "C" 
-###########################################################################
-    def pd(
-        midi1,
-        midi2
-    ):
-        """ Calculate semitone distance between two midi numbers. """
-        return abs(midi1 - midi2)
-###########################################################################
-    def ic(pd):
-        """ Calculate interval cycle of given interval. """
-        return int(12/(gcd(int(pd),12)))                                
-###########################################################################
-    # Pitch Distance Matrix
-    pdlist = [[pd(pre_note, suc_note) for suc_note in suc_chord] for pre_note in pre_chord]
-    # Interval Cycle Matrix
-    iclist = [[ic(cell) for cell in row] for row in pdlist]
-    ic_mat = numpy.array(iclist).reshape(len(pre_chord),len(suc_chord))
-    # Voice Leading Matrix
-    vllist = [[None if pd is None else (alpha/(pd+alpha)) for pd in row] for row in pdlist]
-    vl_mat = numpy.array(vllist).reshape(len(pre_chord),len(suc_chord))
-    # Interval Cycle/Voice Leading Matrix   
-    icvl = ic_mat * vl_mat
-    # Root Salience 1 Matrix (placeholder)
-    rs1list= [[1 if vl > 0 else 0 for vl in row] for row in vllist]
-    rs1 = numpy.array(rs1list).reshape(len(pre_chord),len(suc_chord))
-    # Calculate root of chords using Parncutt 1993
-    prec_root = PitchSalience(pre_chord).root
-    succ_root = PitchSalience(suc_chord).root
-    rs_prec = []
-    for note in pre_chord:
-        if note == prec_root:
-            rs_prec.append(beta)
-        else: 
-            rs_prec.append(1)
-    rs_succ = []
-    for note in suc_chord:
-        if note == succ_root:
-            rs_succ.append(Gamma)
-        else: 
-            rs_succ.append(1)
-    rs2list = [[pre_note * suc_note for suc_note in rs_succ] for pre_note in rs_prec]
-    rs2_sum = sum([sum(rs2) for rs2 in rs2list])
-    rs2_matrix = numpy.array(rs2list).reshape(len(pre_chord),len(suc_chord))
-    # Root Salience 3 Matrix
-    rs3 = numpy.array([num/rs2_sum for cell in rs2_matrix for num in cell]).reshape(len(pre_chord),len(suc_chord))
-    # Consonance/Dissonance Matrix
-    prec_cd = cd_chord(pre_chord)
-    succ_cd = cd_chord(suc_chord)
-    if prec_cd == succ_cd:
-        cd = rs3
-    if prec_cd == "D" and succ_cd == "C":
-        cd = (1+delta) * rs3
-    if prec_cd == "C" and succ_cd == "D":
-        cd = (1-delta) * rs3
-    # Calculate Event Attraction
-    ea_matrix = icvl * cd
-    ea = round(sum(sum(ea_matrix))/12,3)
+        Returns the event attraction rounded to 3 decimals.
+    """
+    notes, mask, roots, dissonant = _features([pre_chord, suc_chord])
+    ea = _event_attraction(
+        notes[:1], mask[:1], roots[:1], dissonant[:1],
+        notes[1:], mask[1:], roots[1:], dissonant[1:],
+        alpha, beta, Gamma, delta
+    )
+    return round(float(ea[0]), 3)
+
+###############################################################################
+def attraction(
+    progression,
+    pairs: str = "consecutive",
+    alpha = 99999,
+    beta = 4,
+    Gamma = 8,
+    delta = 0.1
+):
+    """
+    Event attraction across a whole chord progression, such as salami
+    slices.
+
+    Arguments:
+        progression -- List of chords, each a list of MIDI numbers, or an
+                       AnalyzedMidi for its salami slices.
+        pairs -- "consecutive" for each chord to the next, or "all" for
+                 every ordered pair of chords.
+        alpha, beta, Gamma, delta -- See event_attraction.
+
+    Returns:
+        (N - 1,) array for "consecutive", or (N x N) array whose [i, j]
+        entry is the attraction of chord i to chord j for "all"; values
+        rounded to 3 decimals.
+    """
+    if pairs not in ("consecutive", "all"):
+        raise TypeError(
+            "pairs must be 'consecutive' or 'all'."
+        )
+    if isinstance(progression, AnalyzedMidi):
+        progression = [
+            numpy.flatnonzero(row) for row in progression.slices['sounding']
+        ]
+    progression = [list(chord) for chord in progression]
+    if len(progression) < 2:
+        return numpy.zeros((0,) if pairs == "consecutive" else (len(progression),) * 2)
+    notes, mask, roots, dissonant = _features(progression)
+    if pairs == "consecutive":
+        pre = numpy.arange(len(progression) - 1)
+        suc = pre + 1
+    else:
+        pre, suc = numpy.divmod(numpy.arange(len(progression)**2), len(progression))
+    ea = _event_attraction(
+        notes[pre], mask[pre], roots[pre], dissonant[pre],
+        notes[suc], mask[suc], roots[suc], dissonant[suc],
+        alpha, beta, Gamma, delta
+    )
+    ea = numpy.round(ea, 3)
+    if pairs == "all":
+        ea = ea.reshape(len(progression), len(progression))
     return ea
 
+###############################################################################
+@lru_cache(maxsize = 4096)
+def _chroma_attraction(chord: tuple, alpha, beta):
+    """Cached chroma attraction of one chord as a read-only array."""
+    notes, mask, roots, dissonant = _features([list(chord)] + [[pc] for pc in ALLPC])
+    ea = _event_attraction(
+        numpy.repeat(notes[:1], 12, axis = 0),
+        numpy.repeat(mask[:1], 12, axis = 0),
+        numpy.repeat(roots[:1], 12),
+        numpy.repeat(dissonant[:1], 12),
+        notes[1:], mask[1:], roots[1:], dissonant[1:],
+        alpha, beta, 1, 0
+    )
+    ca = numpy.round(ea, 3)
+    ca.flags.writeable = False
+    return ca
+
 ###############################################################################
 def chroma_attraction(
     chord,
@@ -138,29 +252,49 @@ def chroma_attraction(
     beta = 4
 ):
     """
+    Attraction of a chord to each of the 12 pitch classes, cached per
+    unique chord.
     """
-    ca = [(round(event_attraction(
-                chord,
-                pc,
-                alpha = alpha,
-                beta = beta,
-                Gamma = 1,
-                delta = 0),
-            3)) for pc in ALLPC]
-    return ca
+    return _chroma_attraction(tuple(chord), alpha, beta).tolist()
 
+###############################################################################
+def chroma_attraction_batch(
+    chords,
+    alpha = 9999999,
+    beta = 4
+):
+    """
+    (N x 12) chroma attraction of many chords; each unique chord is
+    computed once.
+    """
+    return numpy.array([
+        _chroma_attraction(tuple(chord), alpha, beta) for chord in chords
+    ]).reshape(len(chords), 12)
+
+###############################################################################
+# Pitch-class membership of every scale in SCALES, one row per scale.
+SCALE_MATRIX = numpy.array([
+    [pc in scale for pc in ALLPC] for scale in SCALES.values()
+], dtype = numpy.float64)
 ###############################################################################
 def key_attraction(chord):
     """
+    Mean chroma attraction of a chord over the pitch classes of each key
+    in SCALES.
     """
     ca = chroma_attraction(chord)
-    ka = {}
-    for name, scale in SCALES.items():
-        ka_list = []
-        for pc in SCALES[name]:
-            ka_list.append(ca[pc])
-            ka[name] = sum(ka_list)/ len(ka_list)
-    return ka
+    return {
+        name: sum(ca[pc] for pc in scale) / len(scale)
+        for name, scale in SCALES.items()
+    }
+
+###############################################################################
+def key_attraction_batch(chords):
+    """
+    (N x 12) key attraction of many chords, columns ordered as SCALES.
+    """
+    ca = chroma_attraction_batch(chords)
+    return ca @ SCALE_MATRIX.T / SCALE_MATRIX.sum(axis = 1)
 
 ###############################################################################
 def diatonicity(
@@ -1,4 +1,4 @@
 from . PitchSalience import *
 from . roughness import *
-#from . Woolhouse import *
+from . Woolhouse import *
 from . Krumhansl_Schmuckler import *
\ No newline at end of file
@@ -10,6 +10,8 @@
 """
 ###############################################################################
 # Imports
+import os
+from functools import lru_cache
 from math import *
 from itertools import combinations
 import numpy
@@ -21,6 +23,7 @@ CBWCUTOFF = 1.2
 A = 0.25
 B = 2
 partials = 10
+OCTAVE_WEIGHTS = [1, 1, 0.33, 1, 0.2, 0.33, 0.14, 1, 0.11, 0.01]
 ###############################################################################
 def roughnessDyad(dyad, rolloff = 1, partials = 11):
     """ DOC STRING GOES HERE IN A FUNCTION
@@ -70,14 +73,98 @@ def roughnessDyad(dyad, rolloff = 1, partials = 11):
     roughness = numerator / denominator
     return roughness
 
+###############################################################################
+def _dyad_roughness(low, high, weights):
+    """
+    roughnessDyad for arrays of MIDI number pairs at once, given the
+    weight of every partial. Returns an array shaped like low and high.
+    """
+    low = numpy.asarray(low, dtype = numpy.float64)[..., None, None]
+    high = numpy.asarray(high, dtype = numpy.float64)[..., None, None]
+    weights = numpy.asarray(weights, dtype = numpy.float64)
+    overtones = numpy.arange(1, len(weights) + 1, dtype = numpy.float64)
+    note1 = (440*((2**(1/12))**(low-69))) * overtones[:, None]
+    note2 = (440*((2**(1/12))**(high-69))) * overtones[None, :]
+    cbw = CBWA * ((note1 + note2)/2)**CBWB
+    cbw_distance = numpy.abs(note1 - note2) / cbw
+    roughness = numpy.where(
+        cbw_distance > CBWCUTOFF,
+        0,
+        ((cbw_distance/A)*numpy.exp(1-(cbw_distance/A)))**B
+    )
+    numerator = 0.5*numpy.sum(
+        roughness * (weights[:, None] * weights[None, :]),
+        axis = (-2, -1)
+    )
+    return numerator / numpy.sum(weights**2)
+
+###############################################################################
+# Environment variable naming the dyad table directory; set it empty to keep
+# tables in memory only.
+TABLE_VARIABLE = 'PYRAMIDI_TABLES'
+###############################################################################
+def _table_directory():
+    """Directory for persisted dyad tables, or None to persist nothing."""
+    if TABLE_VARIABLE in os.environ:
+        return os.environ[TABLE_VARIABLE] or None
+    return os.path.join(
+        os.environ.get("XDG_CACHE_HOME", os.path.join(os.path.expanduser("~"), ".cache")),
+        "pyramidi"
+    )
+
+# Location of persisted dyad tables; set to None to keep them in memory only.
+TABLE_DIRECTORY = _table_directory()
+###############################################################################
+@lru_cache(maxsize = None)
+def dyad_table(rolloff = 1, partials = 11):
+    """
+    Read-only 128 x 128 table of roughnessDyad for every pair of MIDI
+    numbers. Built on first use for each (rolloff, partials) and persisted
+    to TABLE_DIRECTORY, so later processes load it instead. The directory
+    defaults to $XDG_CACHE_HOME/pyramidi; PYRAMIDI_TABLES overrides it, and
+    an empty PYRAMIDI_TABLES turns persistence off.
+    """
+    path = None
+    if TABLE_DIRECTORY is not None:
+        path = os.path.join(
+            TABLE_DIRECTORY,
+            f"roughness_rolloff{rolloff!r}_partials{partials!r}.npy"
+        )
+        try:
+            table = numpy.load(path)
+            if table.shape == (128, 128):
+                table.flags.writeable = False
+                return table
+        except (OSError, ValueError):
+            pass
+    notes = numpy.arange(128)
+    weights = [num**(rolloff*-1) for num in range(1, partials+1)]
+    table = _dyad_roughness(notes[:, None], notes[None, :], weights)
+    if path is not None:
+        try:
+            os.makedirs(TABLE_DIRECTORY, exist_ok = True)
+            temporary = f"{path}.{os.getpid()}.npy"
+            numpy.save(temporary, table)
+            os.replace(temporary, path)
+        except OSError:
+            pass
+    table.flags.writeable = False
+    return table
+
+###############################################################################
 def roughnessChord(chord, rolloff = 1, partials = 11):
-    """ Calculating roughness for a chord
+    """ Calculating roughness for a chord: the sum of the roughness of every
+    dyad, looked up in dyad_table, scaled by 2 / number of notes.
     """
-    rolloff = rolloff
-    partials = partials 
-    dyads = [dyad for dyad in (combinations(chord,2))]
-    dyads_roughness = [roughnessDyad(dyad) for dyad in dyads]
-    roughness = 2/len(chord)*(sum(dyads_roughness))
+    chord = numpy.asarray(chord, dtype = numpy.int64)
+    first, second = numpy.triu_indices(len(chord), k = 1)
+    low, high = chord[first], chord[second]
+    if chord.min() >= 0 and chord.max() < 128:
+        dyads_roughness = dyad_table(rolloff, partials)[low, high]
+    else:
+        weights = [num**(rolloff*-1) for num in range(1, partials+1)]
+        dyads_roughness = _dyad_roughness(low, high, weights)
+    roughness = 2/len(chord)*(float(numpy.sum(dyads_roughness)))
     return round(roughness,3)
 
 """
@@ -136,7 +223,7 @@ def roughnessDyad2(dyad):
     dyad_freqs = [[(440*((2**(1/12))**(note-69))) * overtone for index, overtone in enumerate(partials_list)] for note in dyad]
     note1 = dyad_freqs[0]
     note2 = dyad_freqs[1]
-    octave_weights = [1, 1, 0.33, 1, 0.2, 0.33, 0.14, 1, 0.11, 0.01]
+    octave_weights = OCTAVE_WEIGHTS
     
     # Idenitfying which frequencies are applicable with our
     # input and creating a frequency matrix
@@ -181,3 +268,134 @@ def roughnessChord2(chord, rolloff = 1, partials = 11):
     roughness = 2/len(chord)*(sum(dyads_roughness))
     return round(roughness,3)
 
+###############################################################################
+def _pad(chords):
+    """Ragged chords as a NaN-padded (N x M) float array and a validity mask."""
+    lengths = numpy.array([len(chord) for chord in chords], dtype = numpy.int64)
+    notes = numpy.full((len(chords), max(lengths.max(initial = 0), 1)), numpy.nan)
+    mask = numpy.arange(notes.shape[1])[None, :] < lengths[:, None]
+    notes[mask] = numpy.concatenate(
+        [numpy.asarray(chord, dtype = numpy.float64) for chord in chords] or [[]]
+    )
+    return notes, mask, lengths
+
+###############################################################################
+def _batch_dyads(notes, mask, lengths, weights, block):
+    """Dyad-sum roughness (roughnessChord / roughnessChord2) per chord."""
+    first, second = numpy.triu_indices(notes.shape[1], k = 1)
+    valid = mask[:, first] & mask[:, second]
+    pairs = numpy.stack((notes[:, first][valid], notes[:, second][valid]), axis = 1)
+    # Every distinct dyad is computed once, from spectra built once per note.
+    unique, inverse = numpy.unique(pairs, axis = 0, return_inverse = True)
+    values = numpy.concatenate([
+        _dyad_roughness(unique[i:i + block, 0], unique[i:i + block, 1], weights)
+        for i in range(0, len(unique), block)
+    ] or [numpy.zeros(0)])
+    dyads = numpy.zeros(valid.shape)
+    dyads[valid] = values[inverse.ravel()]
+    with numpy.errstate(divide = "ignore", invalid = "ignore"):
+        return 2/lengths*dyads.sum(axis = 1)
+
+###############################################################################
+def _batch_all(notes, mask, weights, block):
+    """Whole-spectrum roughness (roughness_all) per chord."""
+    results = []
+    weights = numpy.asarray(weights, dtype = numpy.float64)
+    overtones = numpy.arange(1, len(weights) + 1, dtype = numpy.float64)
+    for start in range(0, len(notes), block):
+        chunk = notes[start:start + block]
+        valid = mask[start:start + block].copy()
+        # Repeated notes contribute one spectrum, as in roughness_all.
+        later = (chunk[:, :, None] == chunk[:, None, :]) & \
+            numpy.triu(numpy.ones((chunk.shape[1],) * 2, dtype = bool), k = 1)
+        valid &= ~later.any(axis = 2)
+        frequencies = ((440*((2**(1/12))**(chunk-69)))[:, :, None] * overtones)
+        frequencies = frequencies.reshape(len(chunk), -1)
+        component_weights = numpy.broadcast_to(
+            weights, chunk.shape + weights.shape
+        ).reshape(len(chunk), -1)
+        components = numpy.repeat(valid, len(weights), axis = 1)
+        # Coinciding components keep the weight of their last occurrence.
+        size = frequencies.shape[1]
+        upper = numpy.triu(numpy.ones((size, size), dtype = bool), k = 1)
+        same = frequencies[:, :, None] == frequencies[:, None, :]
+        components &= ~(same & upper & components[:, None, :]).any(axis = 2)
+        pair_mask = components[:, :, None] & components[:, None, :] & upper
+        f1 = frequencies[:, :, None]
+        f2 = frequencies[:, None, :]
+        with numpy.errstate(invalid = "ignore"):
+            cbw_distance = numpy.abs(f1 - f2) / (CBWA * ((f1 + f2)/2)**CBWB)
+            contributions = numpy.where(
+                cbw_distance > CBWCUTOFF,
+                0,
+                ((cbw_distance/A)*numpy.exp(1-(cbw_distance/A)))**B
+            )
+        pair_weights = numpy.where(
+            pair_mask,
+            component_weights[:, :, None] * component_weights[:, None, :],
+            0
+        )
+        numerator = 0.5*numpy.sum(
+            numpy.where(pair_mask, contributions, 0) * pair_weights,
+            axis = (1, 2)
+        )
+        with numpy.errstate(divide = "ignore", invalid = "ignore"):
+            results.append(numerator / numpy.sum(pair_weights**2, axis = (1, 2)))
+    return numpy.concatenate(results or [numpy.zeros(0)])
+
+###############################################################################
+def roughness_batch(
+    chords,
+    model: str = "rolloff",
+    rolloff: float = None,
+    partials: int = 11,
+    decimals: int = 3,
+    block: int = 4096
+):
+    """
+    Roughness of many chords at once.
+
+    Partial spectra are built once per note and every pairwise critical
+    bandwidth distance, Hutchinson-Knopoff contribution and weight is
+    computed as a broadcast array operation.
+
+    Arguments:
+        chords -- List (or ragged array) of chords, each a list of MIDI
+                  numbers.
+        model -- "rolloff" (roughnessChord: dyads, partial weights
+                 n**-rolloff), "octave" (roughnessChord2: dyads, octave
+                 weights) or "all" (roughness_all: every pair of spectral
+                 components in the chord).
+        rolloff -- Partial weight rolloff; defaults to 1 for "rolloff" and
+                   0 for "all" as in the single-chord functions.
+        partials -- Number of partials for "rolloff" and "all".
+        decimals -- Rounding of the results, None for no rounding.
+        block -- Number of dyads ("rolloff"/"octave") or chords ("all")
+                 computed per vectorized step, bounding memory use.
+
+    Returns:
+        Array with one roughness value per chord; NaN for empty chords.
+    """
+    if model not in ("rolloff", "octave", "all"):
+        raise TypeError(
+            "model must be 'rolloff', 'octave' or 'all'."
+        )
+    chords = list(chords)
+    if not chords:
+        return numpy.zeros(0)
+    notes, mask, lengths = _pad(chords)
+    if model == "octave":
+        weights = OCTAVE_WEIGHTS
+    else:
+        if rolloff is None:
+            rolloff = 0 if model == "all" else 1
+        weights = [num**(rolloff*-1) for num in range(1, partials+1)]
+    if model == "all":
+        roughness = _batch_all(notes, mask, weights, max(block // 16, 1))
+    else:
+        roughness = _batch_dyads(notes, mask, lengths, weights, block)
+    if decimals is not None:
+        roughness = numpy.round(roughness, decimals)
+    return roughness
+
+###############################################################################
@@ -0,0 +1,273 @@
+"""
+Columnar note-event table shared by the analysis, SDC and model functions.
+
+A NoteTable pairs every note_on with its note_off once, in a single pass,
+and stores the resulting notes as NumPy arrays. Features such as pitch-class
+distributions, pitch height, ambitus and salami slices are array reductions
+over this table instead of repeated forward scans through the tracks.
+"""
+###############################################################################
+# Standard Imports
+from functools import cached_property
+from os import PathLike
+# Third Party Imports
+import numpy
+from mido import MidiFile
+# Local Imports
+from pyramidi.cache import cached
+from pyramidi.core import AnalyzedMidi
+from pyramidi.instrument import count, timed
+from pyramidi.smf import NOTE_OFF, NOTE_ON, SMFEvents, read_smf
+from pyramidi.tempo import BarIndex, TempoMap, TimeIndex
+###############################################################################
+# Constants
+__all__ = ['NoteTable', 'note_table']
+###############################################################################
+class NoteTable:
+    """
+    NumPy arrays describing every note of a MIDI file, sorted by onset.
+
+    Attributes:
+        onset_ticks, offset_ticks -- Absolute note boundaries in ticks.
+        onset_seconds, offset_seconds -- Absolute note boundaries in seconds.
+        tempo_map -- TempoMap used to convert ticks to seconds.
+        bar_index -- BarIndex used to convert ticks to bars.
+        time_index -- TimeIndex converting ticks, beats, bars and seconds.
+        pitch, velocity, channel, track -- Per-note MIDI values.
+        ticks_per_beat -- Resolution of the source file.
+        end_tick -- Absolute tick of the last end_of_track in the file.
+    """
+    def __init__(
+        self,
+        onset_ticks,
+        offset_ticks,
+        pitch,
+        velocity,
+        channel,
+        track,
+        ticks_per_beat: int,
+        tempo_map: TempoMap = None,
+        end_tick: int = None,
+        bar_index: BarIndex = None
+    ):
+        """
+        Build a table from parallel arrays. Notes are sorted by onset tick,
+        then pitch. Seconds are derived from tempo_map, which defaults to a
+        constant 120 bpm; bar_index defaults to a constant 4/4.
+        """
+        onset_ticks = numpy.asarray(onset_ticks, dtype = numpy.int64)
+        offset_ticks = numpy.asarray(offset_ticks, dtype = numpy.int64)
+        pitch = numpy.asarray(pitch, dtype = numpy.int16)
+        order = numpy.lexsort((pitch, onset_ticks))
+        self.onset_ticks = onset_ticks[order]
+        self.offset_ticks = offset_ticks[order]
+        self.pitch = pitch[order]
+        self.velocity = numpy.asarray(velocity, dtype = numpy.int16)[order]
+        self.channel = numpy.asarray(channel, dtype = numpy.int8)[order]
+        self.track = numpy.asarray(track, dtype = numpy.int16)[order]
+        self.ticks_per_beat = ticks_per_beat
+        if tempo_map is None:
+            tempo_map = TempoMap([], [], ticks_per_beat)
+        self.tempo_map = tempo_map
+        if bar_index is None:
+            bar_index = BarIndex([], [], [], ticks_per_beat)
+        self.bar_index = bar_index
+        self.onset_seconds = tempo_map.tick2second(self.onset_ticks)
+        self.offset_seconds = tempo_map.tick2second(self.offset_ticks)
+        if end_tick is None:
+            end_tick = int(self.offset_ticks.max()) if len(self) else 0
+        self.end_tick = end_tick
+    ###########################################################################
+    def __len__(self):
+        return len(self.pitch)
+    ###########################################################################
+    def __repr__(self):
+        return f"NoteTable({len(self)} notes, ticks_per_beat={self.ticks_per_beat})"
+    ###########################################################################
+    @property
+    def duration_ticks(self):
+        return self.offset_ticks - self.onset_ticks
+    ###########################################################################
+    @property
+    def duration_seconds(self):
+        return self.offset_seconds - self.onset_seconds
+    ###########################################################################
+    @property
+    def duration_beats(self):
+        return self.duration_ticks / self.ticks_per_beat
+    ###########################################################################
+    @property
+    def pitch_class(self):
+        return self.pitch % 12
+    ###########################################################################
+    @cached_property
+    def time_index(self):
+        return TimeIndex(self.tempo_map, self.bar_index)
+    ###########################################################################
+    @cached_property
+    def _latest_offset(self):
+        """Running maximum of offsets in onset order, for range searches."""
+        return numpy.maximum.accumulate(self.offset_ticks)
+    ###########################################################################
+    def excerpt(self, start = 0, end = None, unit: str = 'bars'):
+        """
+        Notes between two positions, found by binary search.
+
+        Notes sounding across a boundary are cut at it: a note that started
+        before start opens at start, and one still sounding at end closes at
+        end. The excerpt is rebased to start at tick 0, with the tempo and
+        time signature in effect at start.
+
+        Keyword arguments:
+        start, end -- Positions in unit; end defaults to the end of the file.
+        unit -- 'ticks', 'beats', 'bars' (counted from 0) or 'seconds'.
+
+        Returns:
+            NoteTable of the excerpt.
+        """
+        start = int(round(float(self.time_index.to_ticks(start, unit))))
+        end = self.end_tick if end is None else \
+            int(round(float(self.time_index.to_ticks(end, unit))))
+        if end < start:
+            raise TypeError(
+                "end must not come before start."
+            )
+        # Notes before first ended by start; notes from last start at end.
+        first = min(
+            numpy.searchsorted(self._latest_offset, start, side = 'right'),
+            numpy.searchsorted(self.onset_ticks, start, side = 'left')
+        )
+        last = numpy.searchsorted(self.onset_ticks, end, side = 'left')
+        index = numpy.arange(first, last)
+        index = index[
+            (self.offset_ticks[index] > start) | (self.onset_ticks[index] >= start)
+        ]
+        return NoteTable(
+            numpy.maximum(self.onset_ticks[index], start) - start,
+            numpy.minimum(self.offset_ticks[index], end) - start,
+            self.pitch[index],
+            self.velocity[index],
+            self.channel[index],
+            self.track[index],
+            self.ticks_per_beat,
+            tempo_map = self.tempo_map.slice(start, end),
+            end_tick = end - start,
+            bar_index = self.bar_index.slice(start, end)
+        )
+    ###########################################################################
+    def excerpts(self, ranges, unit: str = 'bars'):
+        """
+        Several excerpts of one file; ranges is a list of (start, end)
+        positions in unit. See excerpt.
+        """
+        return [self.excerpt(start, end, unit = unit) for start, end in ranges]
+    ###########################################################################
+    @classmethod
+    @timed('pair')
+    def from_events(cls, events: SMFEvents):
+        """
+        Pair the note events of an SMFEvents in one pass.
+
+        Each (track, channel, pitch) keeps a stack of sounding notes. A
+        note_off, or a note_on with velocity 0, closes the earliest sounding
+        note for that key, so overlapping notes of the same pitch pair first
+        in, first out. Note-offs with nothing sounding are ignored, and notes
+        still sounding at the end of a track are closed at its last tick.
+        """
+        is_note = (events.status & 0xE0) == NOTE_OFF
+        onsets, offsets, pitches, velocities, channels, tracks = \
+            [], [], [], [], [], []
+        sounding = {}
+        for tick, status, note, velocity, track in zip(
+            events.ticks[is_note].tolist(),
+            events.status[is_note].tolist(),
+            events.data1[is_note].tolist(),
+            events.data2[is_note].tolist(),
+            events.track[is_note].tolist()
+        ):
+            key = (track, status & 0x0F, note)
+            if status & 0xF0 == NOTE_ON and velocity > 0:
+                sounding.setdefault(key, []).append((tick, velocity))
+            else:
+                stack = sounding.get(key)
+                if stack:
+                    onset, velocity = stack.pop(0)
+                    onsets.append(onset)
+                    offsets.append(tick)
+                    pitches.append(note)
+                    velocities.append(velocity)
+                    channels.append(key[1])
+                    tracks.append(track)
+        for (track, channel, note), stack in sounding.items():
+            for onset, velocity in stack:
+                onsets.append(onset)
+                offsets.append(int(events.track_ends[track]))
+                pitches.append(note)
+                velocities.append(velocity)
+                channels.append(channel)
+                tracks.append(track)
+        count('notes', len(onsets))
+        return cls(
+            onsets,
+            offsets,
+            pitches,
+            velocities,
+            channels,
+            tracks,
+            events.ticks_per_beat,
+            tempo_map = events.tempo_map(),
+            end_tick = events.end_tick,
+            bar_index = events.bar_index()
+        )
+    ###########################################################################
+    @classmethod
+    def from_midi(cls, midi: MidiFile):
+        """Pair the notes of a Mido MidiFile."""
+        return cls.from_events(SMFEvents.from_midi(midi))
+    ###########################################################################
+    @classmethod
+    def from_file(cls, midi_file):
+        """Read a '.mid' file with the native reader and pair its notes."""
+        return cls.from_events(read_smf(midi_file))
+    ###########################################################################
+    def sounding(self, boundaries):
+        """
+        Count sounding notes of every MIDI pitch between boundaries.
+
+        Arguments:
+            boundaries -- Sorted array of ticks.
+
+        Returns:
+            (len(boundaries) - 1, 128) array; row i counts the notes sounding
+            from boundaries[i] up to boundaries[i + 1].
+        """
+        boundaries = numpy.asarray(boundaries, dtype = numpy.int64)
+        delta = numpy.zeros((len(boundaries), 128), dtype = numpy.int32)
+        on = numpy.searchsorted(boundaries, self.onset_ticks)
+        off = numpy.searchsorted(boundaries, self.offset_ticks)
+        numpy.add.at(delta, (on, self.pitch), 1)
+        numpy.add.at(delta, (off, self.pitch), -1)
+        return numpy.cumsum(delta, axis = 0)[:-1]
+
+###############################################################################
+@cached(file = True)
+def note_table(midi_file):
+    """
+    Return a NoteTable for a file path, Mido MidiFile, SMFEvents,
+    AnalyzedMidi or an existing NoteTable.
+    """
+    if isinstance(midi_file, NoteTable):
+        return midi_file
+    if isinstance(midi_file, AnalyzedMidi):
+        return midi_file.note_table
+    if isinstance(midi_file, SMFEvents):
+        return NoteTable.from_events(midi_file)
+    if isinstance(midi_file, MidiFile):
+        return NoteTable.from_midi(midi_file)
+    if isinstance(midi_file, (str, PathLike)):
+        return NoteTable.from_file(midi_file)
+    raise TypeError(
+        "Must be a file path, Mido MidiFile, AnalyzedMidi or NoteTable."
+    )
+
+###############################################################################
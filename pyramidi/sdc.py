@@ -2,77 +2,87 @@
 """
 ###############################################################################
 # Local Imports
-from pyramidi.analysis import salami
-from pyramidi.core import pre_process, cut, midi_2_key, get_tempo
+from pyramidi.analysis import iter_slices, slice_source
+from pyramidi.cache import cached
+from pyramidi.core import AnalyzedMidi, midi_2_key, read_excerpt
+from pyramidi.instrument import span
+from pyramidi.notes import NoteTable, note_table
 # Third Party Imports
-from mido import MidiFile, second2tick
+import numpy
 ###############################################################################
 # Constants
 __all__ = []
 ###############################################################################
+@cached(file = True)
 def pitch_height(midiFile, direct: bool = False):
     """
+    Returns the duration-weighted mean piano key number of all notes.
+
+    Keyword arguments:
+    midiFile -- File path, Mido MidiFile, AnalyzedMidi or NoteTable.
+    direct -- Kept for compatibility; preloaded files are detected.
     """
-    # Option to use preloaded Mido MidiFile class object.
-    if direct == False:
-        midiFile = MidiFile(midiFile)
-    else:
-        pass
-    # Create lists to store pitch and timing information.
-    pitch = []
-    weight = []
-    for t in range(len(midiFile.tracks)):
-        # Loop across all messages, including an index number.
-        for i, msg in enumerate(midiFile.tracks[t]):
-            # Find "note_off" to go with a given "note_on".
-            if msg.type == "note_on":
-                # For each new message, restart the next message overall timing counter.
-                next_abs_time = 0
-                for next in range(i + 1, len(midiFile.tracks[t])):
-                    next_msg = midiFile.tracks[t][next]
-                    next_abs_time = next_abs_time + next_msg.time
-                    if next_msg.type == "note_off" and \
-                    next_msg.note == msg.note: 
-                        pitch.append(midi_2_key(msg.note))
-                        weight.append(next_abs_time/midiFile.ticks_per_beat)
-                        break
-    return sum([p * w for (p, w) in zip(pitch, weight)])/sum(weight)
+    table = note_table(midiFile)
+    weight = table.duration_beats
+    return float(numpy.sum(midi_2_key(table.pitch) * weight) / numpy.sum(weight))
 
 ###############################################################################
+@cached(file = True)
 def beat_density(midi_file: str = 'tests/test.mid'):
-    midi = midi_file
-    ticks = int(second2tick(midi.length, midi.ticks_per_beat, get_tempo(midi)))
-    beats = int(ticks / midi.ticks_per_beat)
-    slices = salami(midi)
-    return len(slices) / beats
+    """
+    Returns the number of salami slices per beat.
+    """
+    source = slice_source(midi_file)
+    with span('slice'):
+        slices = sum(1 for _ in iter_slices(source, mask = True))
+    beats = int(source.end_tick / source.ticks_per_beat)
+    return slices / beats
 
 ###############################################################################
+@cached(file = True)
 def onset_rate(midiFile, time_unit: str = "beat", direct: bool = False):
     """
+    Returns the number of salami slices per beat ("beat") or per second
+    ("length"). Seconds follow every tempo change in the file.
+
+    Keyword arguments:
+    midiFile -- File path, Mido MidiFile, AnalyzedMidi or NoteTable.
+    direct -- Kept for compatibility; preloaded files are detected.
     """
-    if not direct:
-        midi = MidiFile(midiFile)
-    else:
-        midi = midiFile
-    tpb = midi.ticks_per_beat
-    tempo = [msg.tempo for msg in midi if msg.type == "set_tempo"][0]
-    length = int(second2tick(midi.length, tpb, tempo))
-    onsets = len(salami(midiFile, direct = direct))
+    if time_unit not in ("beat", "length"):
+        raise TypeError(
+            "time_unit must be 'beat' or 'length'."
+        )
+    source = slice_source(midiFile)
+    with span('slice'):
+        onsets = sum(1 for _ in iter_slices(source, mask = True))
     if time_unit == "beat":
-        time_unit = length / tpb
-    elif time_unit == "length":
-        time_unit = midi.length
+        time_unit = source.end_tick / source.ticks_per_beat
     else:
-        print("error")
+        tempo_map = source.tempo_map if isinstance(source, NoteTable) \
+            else source.tempo_map()
+        time_unit = float(tempo_map.tick2second(source.end_tick))
     return onsets / time_unit
 
 ###############################################################################
+def _excerpt(file):
+    """
+    First 8 bars of file, read only up to the end of the excerpt
+    (core.read_excerpt); memoized on an AnalyzedMidi.
+    """
+    if isinstance(file, AnalyzedMidi):
+        return file.excerpt_events
+    return read_excerpt(file)
+
+###############################################################################
+@cached(file = True)
 def get_pitch_height(file):
-    return pitch_height(cut(pre_process(file), direct = True), direct = True)
+    return pitch_height(_excerpt(file), direct = True)
 
 ###############################################################################
+@cached(file = True)
 def get_onset_rate(file, time_unit: str = "beat"):
-    return onset_rate(cut(pre_process(file), direct = True), time_unit = time_unit, direct = True)
+    return onset_rate(_excerpt(file), time_unit = time_unit, direct = True)
 
 ###############################################################################
 #def ambitus():
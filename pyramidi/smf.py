@@ -0,0 +1,712 @@
+"""
+Native Standard MIDI File reader and writer.
+
+Parses SMF chunks straight from a memory-mapped buffer into compact typed
+NumPy arrays (delta, ticks, status, data1, data2, track) without building a
+Mido Message per event. By default only note events plus tempo and time
+signature changes are materialized, which is all the analyses need; pass
+full = True to keep every event. Files the reader cannot parse are handed to
+Mido, whose messages are converted to the same arrays. read_smf_prefix
+decodes the tracks lazily and stops at the end of an excerpt. write_smf
+encodes such arrays back to SMF bytes with vectorized delta-time VLQs.
+"""
+###############################################################################
+# Standard Imports
+import heapq
+import mmap
+from io import BytesIO
+from operator import itemgetter
+from os import PathLike
+# Third Party Imports
+import numpy
+from mido import Message, MidiFile, MidiTrack
+from mido.midifiles.meta import build_meta_message
+# Local Imports
+from pyramidi.instrument import count, timed
+from pyramidi.tempo import BarIndex, TempoMap
+###############################################################################
+# Constants
+__all__ = ['SMFEvents', 'read_smf', 'read_smf_prefix', 'write_smf']
+NOTE_OFF = 0x80
+NOTE_ON = 0x90
+SYSEX = 0xF0
+ESCAPE = 0xF7
+META = 0xFF
+END_OF_TRACK = 0x2F
+SET_TEMPO = 0x51
+TIME_SIGNATURE = 0x58
+# Number of data bytes following each channel message status.
+DATA_BYTES = {
+    0x80: 2,
+    0x90: 2,
+    0xA0: 2,
+    0xB0: 2,
+    0xC0: 1,
+    0xD0: 1,
+    0xE0: 2
+}
+###############################################################################
+class SMFEvents:
+    """
+    Events of a Standard MIDI File as parallel NumPy arrays.
+
+    Events are grouped by track and kept in file order within a track.
+    Channel messages store their status byte (including the channel) and
+    up to two data bytes. Meta events, present only when read with
+    full = True, have status 0xFF, the meta type in data1 and their raw
+    bytes in payload; sysex events have status 0xF0/0xF7 and a payload.
+
+    Attributes:
+        type -- SMF format (0, 1 or 2).
+        ticks_per_beat -- Resolution of the file.
+        delta -- Ticks since the previous materialized event of the track.
+        ticks -- Absolute tick of every event.
+        status, data1, data2 -- Status and data bytes of every event.
+        track -- Track index of every event.
+        payload -- Raw bytes of meta/sysex events, None for channel events,
+                   or None altogether when read without full.
+        track_ends -- Absolute tick of the last event of every track.
+        tempo_ticks, tempos -- Every set_tempo event.
+        time_signature_ticks, numerators, denominators -- Every
+                   time_signature event.
+    """
+    def __init__(
+        self,
+        type: int,
+        ticks_per_beat: int,
+        delta,
+        status,
+        data1,
+        data2,
+        track,
+        track_ends,
+        tempo_ticks = (),
+        tempos = (),
+        time_signature_ticks = (),
+        numerators = (),
+        denominators = (),
+        payload = None
+    ):
+        """
+        Build from per-event sequences; absolute ticks are accumulated from
+        delta within each track.
+        """
+        self.type = type
+        self.ticks_per_beat = ticks_per_beat
+        self.delta = numpy.asarray(delta, dtype = numpy.int64)
+        self.status = numpy.asarray(status, dtype = numpy.uint8)
+        self.data1 = numpy.asarray(data1, dtype = numpy.uint8)
+        self.data2 = numpy.asarray(data2, dtype = numpy.uint8)
+        self.track = numpy.asarray(track, dtype = numpy.uint16)
+        self.track_ends = numpy.asarray(track_ends, dtype = numpy.int64)
+        self.ticks = _accumulate(self.delta, self.track)
+        self.tempo_ticks = numpy.asarray(tempo_ticks, dtype = numpy.int64)
+        self.tempos = numpy.asarray(tempos, dtype = numpy.int64)
+        self.time_signature_ticks = numpy.asarray(
+            time_signature_ticks, dtype = numpy.int64
+        )
+        self.numerators = numpy.asarray(numerators, dtype = numpy.int64)
+        self.denominators = numpy.asarray(denominators, dtype = numpy.int64)
+        self.payload = payload
+    ###########################################################################
+    def __len__(self):
+        return len(self.status)
+    ###########################################################################
+    def __repr__(self):
+        return (
+            f"SMFEvents(type={self.type}, {len(self.track_ends)} tracks, "
+            f"{len(self)} events, ticks_per_beat={self.ticks_per_beat})"
+        )
+    ###########################################################################
+    @property
+    def end_tick(self):
+        """Absolute tick of the last event in the file."""
+        return int(self.track_ends.max()) if len(self.track_ends) else 0
+    ###########################################################################
+    def tempo_map(self):
+        """Return the TempoMap of the file."""
+        return TempoMap(self.tempo_ticks, self.tempos, self.ticks_per_beat)
+    ###########################################################################
+    def bar_index(self):
+        """Return the BarIndex of the file."""
+        return BarIndex(
+            self.time_signature_ticks,
+            self.numerators,
+            self.denominators,
+            self.ticks_per_beat
+        )
+    ###########################################################################
+    @classmethod
+    def from_midi(cls, midi: MidiFile, full: bool = False):
+        """
+        Convert a Mido MidiFile to event arrays.
+        """
+        columns = _Columns(full)
+        track_ends = []
+        for index, track in enumerate(midi.tracks):
+            tick = 0
+            last = 0
+            for msg in track:
+                tick += msg.time
+                if msg.is_meta:
+                    if msg.type == 'set_tempo':
+                        columns.tempo(tick, msg.tempo)
+                    elif msg.type == 'time_signature':
+                        columns.time_signature(
+                            tick, msg.numerator, msg.denominator
+                        )
+                    if full:
+                        raw = msg.bytes()
+                        length, start = _read_vlq(raw, 2)
+                        columns.add(
+                            tick - last,
+                            META,
+                            raw[1],
+                            0,
+                            index,
+                            bytes(raw[start:start + length])
+                        )
+                        last = tick
+                    continue
+                raw = msg.bytes()
+                status = raw[0]
+                if status >= SYSEX:
+                    if full and msg.type == 'sysex':
+                        columns.add(
+                            tick - last, SYSEX, 0, 0, index, bytes(raw[1:])
+                        )
+                        last = tick
+                    continue
+                if full or status & 0xE0 == NOTE_OFF:
+                    columns.add(
+                        tick - last,
+                        status,
+                        raw[1],
+                        raw[2] if len(raw) > 2 else 0,
+                        index
+                    )
+                    last = tick
+            track_ends.append(tick)
+        return columns.build(midi.type, midi.ticks_per_beat, track_ends)
+    ###########################################################################
+    def to_bytes(self):
+        """Encode events read with full = True as Standard MIDI File bytes."""
+        return write_smf(self)
+    ###########################################################################
+    def to_midi(self):
+        """
+        Convert events read with full = True back to a Mido MidiFile, one
+        MidiTrack per track.
+        """
+        if self.payload is None:
+            raise TypeError(
+                "Only events read with full = True can be converted."
+            )
+        midi = MidiFile(type = self.type, ticks_per_beat = self.ticks_per_beat)
+        tracks = [MidiTrack() for _ in self.track_ends]
+        midi.tracks.extend(tracks)
+        for delta, status, data1, data2, track, payload in zip(
+            self.delta.tolist(),
+            self.status.tolist(),
+            self.data1.tolist(),
+            self.data2.tolist(),
+            self.track.tolist(),
+            self.payload
+        ):
+            if status == META:
+                msg = build_meta_message(data1, payload, delta)
+            elif status >= SYSEX:
+                data = payload[:-1] if payload[-1:] == bytes([ESCAPE]) else payload
+                msg = Message('sysex', data = data, time = delta)
+            else:
+                raw = [status, data1, data2][:1 + DATA_BYTES[status & 0xF0]]
+                msg = Message.from_bytes(raw, time = delta)
+            tracks[track].append(msg)
+        return midi
+
+###############################################################################
+class _Columns:
+    """Growable per-event lists used while parsing."""
+    def __init__(self, full: bool):
+        self.full = full
+        self.delta, self.status, self.data1, self.data2, self.track = \
+            [], [], [], [], []
+        self.payload = [] if full else None
+        self.tempo_ticks, self.tempos = [], []
+        self.time_signature_ticks, self.numerators, self.denominators = \
+            [], [], []
+    ###########################################################################
+    def add(self, delta, status, data1, data2, track, payload = None):
+        self.delta.append(delta)
+        self.status.append(status)
+        self.data1.append(data1)
+        self.data2.append(data2)
+        self.track.append(track)
+        if self.full:
+            self.payload.append(payload)
+    ###########################################################################
+    def tempo(self, tick, tempo):
+        self.tempo_ticks.append(tick)
+        self.tempos.append(tempo)
+    ###########################################################################
+    def time_signature(self, tick, numerator, denominator):
+        self.time_signature_ticks.append(tick)
+        self.numerators.append(numerator)
+        self.denominators.append(denominator)
+    ###########################################################################
+    def build(self, type, ticks_per_beat, track_ends):
+        count('events', len(self.status))
+        return SMFEvents(
+            type,
+            ticks_per_beat,
+            self.delta,
+            self.status,
+            self.data1,
+            self.data2,
+            self.track,
+            track_ends,
+            tempo_ticks = self.tempo_ticks,
+            tempos = self.tempos,
+            time_signature_ticks = self.time_signature_ticks,
+            numerators = self.numerators,
+            denominators = self.denominators,
+            payload = self.payload
+        )
+
+###############################################################################
+def _accumulate(delta, track):
+    """Absolute ticks from per-track deltas, for events grouped by track."""
+    ticks = numpy.cumsum(delta)
+    if len(ticks):
+        starts = numpy.flatnonzero(numpy.diff(track.astype(numpy.int64))) + 1
+        offsets = numpy.zeros(len(ticks), dtype = numpy.int64)
+        offsets[starts] = ticks[starts - 1]
+        ticks -= numpy.maximum.accumulate(offsets)
+    return ticks
+
+###############################################################################
+def _read_vlq(buf, pos):
+    """Read a variable-length quantity, returning (value, new position)."""
+    value = 0
+    while True:
+        byte = buf[pos]
+        pos += 1
+        value = (value << 7) | (byte & 0x7F)
+        if byte < 0x80:
+            return value, pos
+
+###############################################################################
+def _iter_track(buf, pos, end):
+    """
+    Decode one MTrk chunk body from buf[pos:end] lazily, one event at a
+    time, yielding (tick, status, data1, data2, data). Meta events have
+    status 0xFF, their type in data1 and their body in data; sysex events
+    carry their body in data; data is None for channel messages.
+    _read_track keeps its own inlined loop, which is faster for whole files.
+    """
+    tick = 0
+    running = None
+    while pos < end:
+        delta, pos = _read_vlq(buf, pos)
+        tick += delta
+        status = buf[pos]
+        if status < 0x80:
+            if running is None:
+                raise ValueError("Running status without a previous status.")
+            status = running
+        else:
+            pos += 1
+        if status < SYSEX:
+            # Channel message; meta and sysex events leave running status.
+            running = status
+            data1 = buf[pos]
+            if DATA_BYTES[status & 0xF0] == 2:
+                data2 = buf[pos + 1]
+                pos += 2
+            else:
+                data2 = 0
+                pos += 1
+            yield tick, status, data1, data2, None
+        elif status == META:
+            kind = buf[pos]
+            length, pos = _read_vlq(buf, pos + 1)
+            yield tick, META, kind, 0, buf[pos:pos + length]
+            pos += length
+        elif status == SYSEX or status == ESCAPE:
+            length, pos = _read_vlq(buf, pos)
+            yield tick, status, 0, 0, buf[pos:pos + length]
+            pos += length
+        else:
+            raise ValueError(f"Invalid status byte {status:#x} in track.")
+    if pos != end:
+        raise ValueError("Track chunk ends inside an event.")
+
+###############################################################################
+def _read_track(buf, pos, end, index, columns, track_ends):
+    """Parse one MTrk chunk body from buf[pos:end] into columns."""
+    full = columns.full
+    add = columns.add
+    tick = 0
+    last = 0
+    running = None
+    while pos < end:
+        delta, pos = _read_vlq(buf, pos)
+        tick += delta
+        status = buf[pos]
+        if status < 0x80:
+            if running is None:
+                raise ValueError("Running status without a previous status.")
+            status = running
+        else:
+            pos += 1
+        if status < SYSEX:
+            # Channel message; meta and sysex events leave running status.
+            running = status
+            data1 = buf[pos]
+            if DATA_BYTES[status & 0xF0] == 2:
+                data2 = buf[pos + 1]
+                pos += 2
+            else:
+                data2 = 0
+                pos += 1
+            if full or status & 0xE0 == NOTE_OFF:
+                add(tick - last, status, data1, data2, index)
+                last = tick
+        elif status == META:
+            kind = buf[pos]
+            length, pos = _read_vlq(buf, pos + 1)
+            data = buf[pos:pos + length]
+            pos += length
+            if kind == SET_TEMPO:
+                columns.tempo(tick, int.from_bytes(data[:3], 'big'))
+            elif kind == TIME_SIGNATURE:
+                columns.time_signature(tick, data[0], 2 ** data[1])
+            if full:
+                add(tick - last, META, kind, 0, index, bytes(data))
+                last = tick
+        elif status == SYSEX or status == ESCAPE:
+            length, pos = _read_vlq(buf, pos)
+            if full:
+                add(tick - last, status, 0, 0, index, bytes(buf[pos:pos + length]))
+                last = tick
+            pos += length
+        else:
+            raise ValueError(f"Invalid status byte {status:#x} in track.")
+    if pos != end:
+        raise ValueError("Track chunk ends inside an event.")
+    track_ends.append(tick)
+
+###############################################################################
+def _chunks(buf):
+    """
+    Read the MThd header and locate the MTrk chunks of an SMF buffer.
+
+    Returns:
+        (type, ticks_per_beat, [(start, end) of every track body]).
+    """
+    if buf[:4] != b'MThd':
+        raise ValueError("No MThd header at start of file.")
+    length = int.from_bytes(buf[4:8], 'big')
+    if length < 6 or len(buf) < 8 + length:
+        raise ValueError("Truncated MThd header.")
+    type = int.from_bytes(buf[8:10], 'big')
+    ntracks = int.from_bytes(buf[10:12], 'big')
+    ticks_per_beat = int.from_bytes(buf[12:14], 'big')
+    if ticks_per_beat & 0x8000:
+        raise ValueError("SMPTE time division is not supported.")
+    tracks = []
+    pos = 8 + length
+    while len(tracks) < ntracks:
+        if pos + 8 > len(buf):
+            raise ValueError("File ends before all tracks were read.")
+        name = buf[pos:pos + 4]
+        size = int.from_bytes(buf[pos + 4:pos + 8], 'big')
+        pos += 8
+        if pos + size > len(buf):
+            raise ValueError("Chunk is longer than the file.")
+        if name == b'MTrk':
+            tracks.append((pos, pos + size))
+        pos += size
+    return type, ticks_per_beat, tracks
+
+###############################################################################
+def _parse(buf, full: bool):
+    """Parse a whole SMF buffer into SMFEvents, raising on malformed data."""
+    type, ticks_per_beat, tracks = _chunks(buf)
+    columns = _Columns(full)
+    track_ends = []
+    for index, (start, end) in enumerate(tracks):
+        _read_track(buf, start, end, index, columns, track_ends)
+    return columns.build(type, ticks_per_beat, track_ends)
+
+###############################################################################
+def _read_prefix(buf, end, measures):
+    """Merge the tracks of an SMF buffer lazily up to the end of a prefix."""
+    _, ticks_per_beat, tracks = _chunks(buf)
+    columns = _Columns(False)
+    # heapq.merge is stable, so ties keep track order as in merge_tracks.
+    merged = heapq.merge(
+        *(_iter_track(buf, start, stop) for start, stop in tracks),
+        key = itemgetter(0)
+    )
+    if measures is not None:
+        end = BarIndex([], [], [], ticks_per_beat).bar2tick(measures)
+    tick = last = kept = 0
+    exhausted = True
+    for tick, status, data1, data2, data in merged:
+        if tick > end or (
+            tick == end and status & 0xF0 == NOTE_ON and data2 > 0
+        ):
+            exhausted = False
+            break
+        if status < SYSEX:
+            if status & 0xE0 == NOTE_OFF:
+                columns.add(tick - last, status, data1, data2, 0)
+                last = tick
+        elif status == META:
+            if data1 == END_OF_TRACK:
+                # Only the last end_of_track of the file survives a merge.
+                continue
+            if data1 == SET_TEMPO:
+                columns.tempo(tick, int.from_bytes(data[:3], 'big'))
+            elif data1 == TIME_SIGNATURE:
+                columns.time_signature(tick, data[0], 2 ** data[1])
+                if measures is not None:
+                    end = BarIndex(
+                        columns.time_signature_ticks,
+                        columns.numerators,
+                        columns.denominators,
+                        ticks_per_beat
+                    ).bar2tick(measures)
+        kept = tick
+    if exhausted:
+        # The whole file fits: its final end_of_track is kept as well.
+        kept = tick
+    return columns.build(0, ticks_per_beat, [kept])
+
+###############################################################################
+@timed('parse')
+def read_smf(midi_file, full: bool = False):
+    """
+    Read a Standard MIDI File into SMFEvents.
+
+    Keyword arguments:
+    midi_file -- '.mid' file path, bytes-like object or Mido MidiFile.
+    full -- Keep every event (all channel messages, meta and sysex with
+            payloads) instead of only note, tempo and time signature events.
+
+    Malformed files that the native parser rejects are read by Mido
+    instead; Mido's error is raised if it cannot read them either.
+    """
+    if isinstance(midi_file, MidiFile):
+        return SMFEvents.from_midi(midi_file, full = full)
+    if isinstance(midi_file, (str, PathLike)):
+        with open(midi_file, 'rb') as f:
+            try:
+                buf = mmap.mmap(f.fileno(), 0, access = mmap.ACCESS_READ)
+            except ValueError:
+                # Empty files cannot be mapped.
+                buf = b''
+            try:
+                return _parse(buf, full)
+            except (ValueError, IndexError, KeyError):
+                return SMFEvents.from_midi(
+                    MidiFile(midi_file, clip = True), full = full
+                )
+            finally:
+                if isinstance(buf, mmap.mmap):
+                    buf.close()
+    buf = memoryview(midi_file).cast('B')
+    try:
+        return _parse(buf, full)
+    except (ValueError, IndexError, KeyError):
+        return SMFEvents.from_midi(
+            MidiFile(file = BytesIO(bytes(buf)), clip = True), full = full
+        )
+
+###############################################################################
+@timed('parse')
+def read_smf_prefix(midi_file, end: int = None, measures: float = None):
+    """
+    Read the beginning of a Standard MIDI File as one merged track.
+
+    Tracks are decoded lazily and merged by absolute tick in the order of
+    Mido's merge_tracks; reading stops as soon as the merge passes the end
+    of the prefix, so the cost follows the length of the prefix rather than
+    of the file. Events before the end are kept, as are those on it up to
+    the first sounding note_on (the same rule as core.cut).
+
+    Keyword arguments:
+    midi_file -- '.mid' file path or bytes-like object.
+    end -- End of the prefix in ticks.
+    measures -- End of the prefix in bars, counted with the time signatures
+                read on the way.
+
+    Returns:
+        Type 0 SMFEvents of the note, tempo and time signature events kept.
+        Its track end is the tick of the last event kept.
+
+    Raises ValueError for files the native parser rejects; there is no
+    Mido fallback.
+    """
+    if (end is None) == (measures is None):
+        raise TypeError(
+            "Give exactly one of end or measures."
+        )
+    if isinstance(midi_file, (str, PathLike)):
+        with open(midi_file, 'rb') as f:
+            try:
+                buf = mmap.mmap(f.fileno(), 0, access = mmap.ACCESS_READ)
+            except ValueError:
+                # Empty files cannot be mapped.
+                buf = b''
+            try:
+                return _read_prefix(buf, end, measures)
+            finally:
+                if isinstance(buf, mmap.mmap):
+                    buf.close()
+    return _read_prefix(memoryview(midi_file).cast('B'), end, measures)
+
+###############################################################################
+###############################################################################
+def _vlq_length(values):
+    """Bytes needed to encode each value as a variable-length quantity."""
+    values = numpy.asarray(values, dtype = numpy.int64)
+    return 1 + (values >= 1 << 7) + (values >= 1 << 14) + (values >= 1 << 21)
+
+###############################################################################
+def _vlq(value: int):
+    """Encode one variable-length quantity."""
+    out = [value & 0x7F]
+    value >>= 7
+    while value:
+        out.append(0x80 | (value & 0x7F))
+        value >>= 7
+    return bytes(reversed(out))
+
+###############################################################################
+def _with_end_of_track(events: SMFEvents):
+    """
+    Columns of events with an end_of_track appended to every track that
+    does not already end with one.
+    """
+    delta, status, data1, data2, track = (
+        events.delta, events.status, events.data1, events.data2, events.track
+    )
+    payload = list(events.payload)
+    ntracks = len(events.track_ends)
+    ends = numpy.searchsorted(track, numpy.arange(ntracks), side = 'right')
+    starts = numpy.searchsorted(track, numpy.arange(ntracks), side = 'left')
+    has_end = (ends > starts) & (status[ends - 1] == META) & \
+        (data1[ends - 1] == END_OF_TRACK)
+    missing = numpy.flatnonzero(~has_end)
+    if len(missing):
+        last = numpy.where(
+            ends > starts, events.ticks[numpy.maximum(ends - 1, 0)], 0
+        )
+        gap = events.track_ends[missing] - last[missing]
+        positions = ends[missing]
+        delta = numpy.insert(delta, positions, numpy.maximum(gap, 0))
+        status = numpy.insert(status, positions, META)
+        data1 = numpy.insert(data1, positions, END_OF_TRACK)
+        data2 = numpy.insert(data2, positions, 0)
+        track = numpy.insert(track, positions, missing)
+        for offset, position in enumerate(positions.tolist()):
+            payload.insert(position + offset, b'')
+    return delta, status, data1, data2, track, payload
+
+###############################################################################
+@timed('write')
+def write_smf(events: SMFEvents, file = None):
+    """
+    Encode SMFEvents read with full = True as a Standard MIDI File.
+
+    Delta times and channel messages are written straight from the event
+    arrays, using running status; only meta and sysex payloads are copied
+    one by one. Tracks that do not end with end_of_track get one.
+
+    Keyword arguments:
+    events -- SMFEvents holding every event (full = True).
+    file -- None to only return the bytes, a file path, or any object
+            with a write method (open file, pipe, BytesIO).
+
+    Returns:
+        The encoded file as bytes.
+    """
+    if events.payload is None:
+        raise TypeError(
+            "Only events read with full = True can be written."
+        )
+    delta, status, data1, data2, track, payload = _with_end_of_track(events)
+    ntracks = len(events.track_ends)
+    channel = status < SYSEX
+    data_bytes = numpy.zeros(len(status), dtype = numpy.int64)
+    data_bytes[channel] = numpy.where(
+        numpy.isin(status[channel] & 0xF0, (0xC0, 0xD0)), 1, 2
+    )
+    # Meta and sysex bodies are built in Python; channel events are not.
+    other = numpy.flatnonzero(~channel)
+    bodies = []
+    for index in other.tolist():
+        data = payload[index]
+        if status[index] == META:
+            bodies.append(bytes((META, data1[index])) + _vlq(len(data)) + data)
+        else:
+            bodies.append(bytes((status[index],)) + _vlq(len(data)) + data)
+    # Running status: repeated channel statuses within a track are omitted
+    # (meta and sysex events cancel it).
+    running = numpy.zeros(len(status), dtype = bool)
+    running[1:] = channel[1:] & channel[:-1] & \
+        (status[1:] == status[:-1]) & (track[1:] == track[:-1])
+    status_length = numpy.where(running, 0, 1)
+    body_length = status_length + data_bytes
+    body_length[other] = [len(body) for body in bodies]
+    delta_length = _vlq_length(delta)
+    length = delta_length + body_length
+    track_length = numpy.bincount(
+        track.astype(numpy.int64), weights = length, minlength = ntracks
+    ).astype(numpy.int64)
+    # Offsets: 14-byte header, then an 8-byte chunk header per track.
+    track_start = 14 + numpy.concatenate(
+        ([0], numpy.cumsum(track_length + 8)[:-1])
+    ).astype(numpy.int64)
+    position = numpy.cumsum(length) - length
+    if len(length):
+        first = numpy.searchsorted(track, numpy.arange(ntracks))
+        before = numpy.concatenate(([0], numpy.cumsum(length)))[first]
+        position += (track_start + 8 - before)[track.astype(numpy.int64)]
+    out = numpy.zeros(14 + int(numpy.sum(track_length + 8)), dtype = numpy.uint8)
+    out[:14] = numpy.frombuffer(
+        b'MThd' + (6).to_bytes(4, 'big') + events.type.to_bytes(2, 'big') +
+        ntracks.to_bytes(2, 'big') + events.ticks_per_beat.to_bytes(2, 'big'),
+        dtype = numpy.uint8
+    )
+    for start, size in zip(track_start.tolist(), track_length.tolist()):
+        out[start:start + 8] = numpy.frombuffer(
+            b'MTrk' + size.to_bytes(4, 'big'), dtype = numpy.uint8
+        )
+    # Delta times, most significant group first.
+    for k in range(4):
+        index = numpy.flatnonzero(delta_length > k)
+        shift = 7 * (delta_length[index] - 1 - k)
+        more = numpy.where(k < delta_length[index] - 1, 0x80, 0)
+        out[position[index] + k] = ((delta[index] >> shift) & 0x7F) | more
+    body = position + delta_length
+    index = numpy.flatnonzero(channel & ~running)
+    out[body[index]] = status[index]
+    index = numpy.flatnonzero(channel)
+    data = body[index] + status_length[index]
+    out[data] = data1[index]
+    two = data_bytes[index] == 2
+    out[data[two] + 1] = data2[index[two]]
+    for start, chunk in zip(body[other].tolist(), bodies):
+        out[start:start + len(chunk)] = numpy.frombuffer(chunk, dtype = numpy.uint8)
+    data = out.tobytes()
+    if isinstance(file, (str, PathLike)):
+        with open(file, 'wb') as f:
+            f.write(data)
+    elif file is not None:
+        file.write(data)
+    return data
+
+###############################################################################
@@ -0,0 +1,407 @@
+"""
+SQLite feature store for corpus analyses.
+
+Features are keyed by the SHA-256 of the file content, so renamed or copied
+files share their results. Numeric features go to an indexed table, which
+makes range queries over a large corpus an index lookup:
+
+    store = FeatureStore('features.db')
+    store.ingest(batch.run('corpus/'))
+    store.query(mirmode = ('<', 0), onset_rate = ('>', 4),
+                ambitus_range = ('>', 36))
+
+Structured values (PCDs, keyfinding coefficients, chord statistics, ...)
+are stored as JSON next to them. Every feature row carries the version of
+the extractor that produced it; registering a new version hides older rows
+from get and query, and missing lists the files to re-run.
+"""
+###############################################################################
+# Standard Imports
+import json
+import numbers
+import os
+import sqlite3
+# Local Imports
+from pyramidi.cache import file_hash
+from pyramidi.models.Krumhansl_Schmuckler import KEYS
+###############################################################################
+# Constants
+__all__ = ['FeatureStore']
+SCHEMA_VERSION = 1
+# Files and feature names get integer ids, which keeps the feature rows and
+# the range index small.
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value TEXT
+);
+CREATE TABLE IF NOT EXISTS extractors (
+    name TEXT PRIMARY KEY,
+    version INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS files (
+    id INTEGER PRIMARY KEY,
+    hash TEXT NOT NULL UNIQUE
+);
+CREATE TABLE IF NOT EXISTS paths (
+    path TEXT PRIMARY KEY,
+    file INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS paths_file ON paths (file);
+CREATE TABLE IF NOT EXISTS names (
+    id INTEGER PRIMARY KEY,
+    name TEXT NOT NULL UNIQUE
+);
+CREATE TABLE IF NOT EXISTS features (
+    file INTEGER NOT NULL,
+    feature INTEGER NOT NULL,
+    version INTEGER NOT NULL,
+    value REAL,
+    PRIMARY KEY (file, feature)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS features_range ON features (feature, version, value);
+CREATE TABLE IF NOT EXISTS documents (
+    file INTEGER NOT NULL,
+    feature INTEGER NOT NULL,
+    version INTEGER NOT NULL,
+    value TEXT,
+    PRIMARY KEY (file, feature)
+) WITHOUT ROWID;
+"""
+OPERATORS = {'<', '<=', '>', '>=', '=', '!='}
+# Rows counted per condition when choosing the query's join order.
+ESTIMATE_LIMIT = 20000
+# Indexed scalars derived from structured features: name to (source
+# feature, function of its value). They share the source's version.
+DERIVED = {
+    'ambitus_range': ('ambitus', lambda value: value[1] - value[0]),
+    'key': ('keyfinding', lambda value: KEYS.index(max(value, key = value.get)))
+}
+###############################################################################
+def _plain(value):
+    """JSON fallback for NumPy scalars and arrays."""
+    if hasattr(value, 'tolist'):
+        return value.tolist()
+    raise TypeError(
+        f"Cannot store a {type(value).__name__} feature."
+    )
+
+###############################################################################
+def _decode(text: str):
+    """JSON value, with integer dictionary keys (e.g. pitch classes) restored."""
+    def keys(pairs):
+        if pairs and all(key.lstrip('-').isdigit() for key, _ in pairs):
+            return {int(key): value for key, value in pairs}
+        return dict(pairs)
+    return json.loads(text, object_pairs_hook = keys)
+
+###############################################################################
+class FeatureStore:
+    """
+    Per-file features in a SQLite database.
+
+    Attributes:
+        path -- Database file, or ':memory:'.
+        connection -- sqlite3 connection.
+    """
+    def __init__(self, path: str = ':memory:'):
+        """
+        Open or create a store.
+
+        Keyword arguments:
+        path -- Database file; ':memory:' keeps the store in memory.
+        """
+        self.path = os.fspath(path)
+        self.connection = sqlite3.connect(self.path)
+        if self.path != ':memory:':
+            self.connection.execute("PRAGMA journal_mode = WAL")
+            self.connection.execute("PRAGMA synchronous = NORMAL")
+        with self.connection:
+            self.connection.executescript(SCHEMA)
+            row = self.connection.execute(
+                "SELECT value FROM meta WHERE key = 'schema_version'"
+            ).fetchone()
+            if row is None:
+                self.connection.execute(
+                    "INSERT INTO meta VALUES ('schema_version', ?)",
+                    (str(SCHEMA_VERSION),)
+                )
+            elif int(row[0]) != SCHEMA_VERSION:
+                raise ValueError(
+                    f"Feature store schema version {row[0]} is not supported."
+                )
+        self._load_names()
+    ###########################################################################
+    def __repr__(self):
+        return f"FeatureStore({self.path!r}, {len(self)} files)"
+    ###########################################################################
+    def __len__(self):
+        return self.connection.execute(
+            "SELECT COUNT(*) FROM files"
+        ).fetchone()[0]
+    ###########################################################################
+    def __enter__(self):
+        return self
+    ###########################################################################
+    def __exit__(self, *exc_info):
+        self.close()
+        return False
+    ###########################################################################
+    def close(self):
+        """Update the query planner statistics and close the database."""
+        self.connection.execute("PRAGMA optimize")
+        self.connection.close()
+    ###########################################################################
+    def versions(self):
+        """Registered extractor name to version."""
+        return dict(self.connection.execute("SELECT name, version FROM extractors"))
+    ###########################################################################
+    def register(self, name: str, version: int = 1):
+        """
+        Set the current version of an extractor. Rows stored with another
+        version are ignored until re-extracted, or removed by prune.
+        """
+        with self.connection:
+            self.connection.execute(
+                "INSERT OR REPLACE INTO extractors VALUES (?, ?)",
+                (name, int(version))
+            )
+    ###########################################################################
+    def _version(self, name: str, versions: dict = None):
+        """Current version of a feature: that of its extractor, default 1."""
+        versions = self.versions() if versions is None else versions
+        return versions.get(DERIVED[name][0] if name in DERIVED else name, 1)
+    ###########################################################################
+    def _load_names(self):
+        """Read the feature name to id map from the database."""
+        self._names = dict(self.connection.execute("SELECT name, id FROM names"))
+    ###########################################################################
+    def _name_id(self, name: str):
+        """Id of a feature name, added on first use."""
+        if name not in self._names:
+            self._names[name] = self.connection.execute(
+                "INSERT INTO names (name) VALUES (?)", (name,)
+            ).lastrowid
+        return self._names[name]
+    ###########################################################################
+    def _file_id(self, hash: str):
+        """Id of a content hash, added on first use."""
+        self.connection.execute(
+            "INSERT OR IGNORE INTO files (hash) VALUES (?)", (hash,)
+        )
+        return self.connection.execute(
+            "SELECT id FROM files WHERE hash = ?", (hash,)
+        ).fetchone()[0]
+    ###########################################################################
+    def _rows(self, file: int, features: dict, versions: dict):
+        """(scalar rows, document rows) for one file's features."""
+        values = dict(features)
+        for name, (source, function) in DERIVED.items():
+            if features.get(source) is not None:
+                values[name] = function(features[source])
+        scalars, documents = [], []
+        for name, value in values.items():
+            if value is None:
+                continue
+            row = (file, self._name_id(name), self._version(name, versions))
+            if isinstance(value, numbers.Real):
+                scalars.append(row + (float(value),))
+            else:
+                documents.append(row + (json.dumps(value, default = _plain),))
+        return scalars, documents
+    ###########################################################################
+    def put_many(self, records):
+        """
+        Bulk insert in one transaction.
+
+        Arguments:
+            records -- Iterable of (path, features) pairs, features being a
+                       dict of extractor name to value; None values are
+                       skipped. Files are keyed by content hash, and an
+                       existing value of the same feature is replaced.
+
+        Returns:
+            Number of files stored.
+        """
+        versions = self.versions()
+        paths, scalars, documents = [], [], []
+        try:
+            with self.connection:
+                for path, features in records:
+                    path = os.fspath(path)
+                    file = self._file_id(file_hash(path))
+                    paths.append((path, file))
+                    rows = self._rows(file, features, versions)
+                    scalars.extend(rows[0])
+                    documents.extend(rows[1])
+                self.connection.executemany(
+                    "INSERT OR REPLACE INTO paths VALUES (?, ?)", paths
+                )
+                self.connection.executemany(
+                    "INSERT OR REPLACE INTO features VALUES (?, ?, ?, ?)", scalars
+                )
+                self.connection.executemany(
+                    "INSERT OR REPLACE INTO documents VALUES (?, ?, ?, ?)", documents
+                )
+        except BaseException:
+            # The rollback also dropped names added by this transaction.
+            self._load_names()
+            raise
+        return len(paths)
+    ###########################################################################
+    def put(self, path, features: dict):
+        """Store the features of one file; see put_many."""
+        self.put_many([(path, features)])
+    ###########################################################################
+    def ingest(self, results, batch_size: int = 1000):
+        """
+        Store batch.Result records (e.g. straight from batch.run) in
+        transactions of batch_size files. Failed extractors are skipped.
+
+        Returns:
+            Number of files stored.
+        """
+        stored = 0
+        chunk = []
+        for result in results:
+            chunk.append((result.path, result.features))
+            if len(chunk) >= batch_size:
+                stored += self.put_many(chunk)
+                chunk = []
+        return stored + self.put_many(chunk)
+    ###########################################################################
+    def _find(self, hash: str):
+        """Id of a stored content hash, or None."""
+        row = self.connection.execute(
+            "SELECT id FROM files WHERE hash = ?", (hash,)
+        ).fetchone()
+        return None if row is None else row[0]
+    ###########################################################################
+    def _features(self, file: int, versions: dict):
+        """Current-version features of a file id."""
+        features = {}
+        for table, decode in (('features', None), ('documents', _decode)):
+            for name, version, value in self.connection.execute(
+                f"SELECT n.name, t.version, t.value FROM {table} AS t "
+                "JOIN names AS n ON n.id = t.feature WHERE t.file = ?",
+                (file,)
+            ):
+                if version == self._version(name, versions):
+                    features[name] = decode(value) if decode else value
+        return features
+    ###########################################################################
+    def get(self, key):
+        """
+        Current-version features of a file, by path or content hash. A path
+        is looked up by its current content, so an edited file has no
+        features until it is stored again, and a copy shares the original's.
+
+        Returns:
+            Dictionary of feature name to value; empty if nothing is stored.
+        """
+        key = os.fspath(key)
+        file = self._find(file_hash(key) if os.path.isfile(key) else key)
+        if file is None:
+            return {}
+        return self._features(file, self.versions())
+    ###########################################################################
+    def _estimate(self, clause: str, arguments: list):
+        """Rows matching one query condition, counted up to ESTIMATE_LIMIT."""
+        return self.connection.execute(
+            "SELECT COUNT(*) FROM (SELECT 1 FROM features AS f WHERE " +
+            clause.format("f") + f" LIMIT {ESTIMATE_LIMIT})",
+            arguments
+        ).fetchone()[0]
+    ###########################################################################
+    def query(self, conditions: dict = None, **kwargs):
+        """
+        Paths of the files whose numeric features meet every condition.
+
+        Conditions map a feature name to (operator, value) with operator
+        one of <, <=, >, >=, =, !=; to ('between', low, high); or to a
+        bare value for equality. Names that are not valid keywords can be
+        given in the conditions dict. Each condition is answered from the
+        (feature, version, value) index; unknown features match nothing.
+
+        Returns:
+            Sorted list of paths, as stored by the last put of each.
+        """
+        conditions = dict(conditions or {}, **kwargs)
+        if not conditions:
+            raise TypeError(
+                "Give at least one condition."
+            )
+        versions = self.versions()
+        clauses = []
+        for name, condition in conditions.items():
+            if not isinstance(condition, tuple):
+                condition = ('=', condition)
+            clause = "{0}.feature = ? AND {0}.version = ? AND "
+            # Unknown names get id -1, which matches nothing.
+            arguments = [self._names.get(name, -1), self._version(name, versions)]
+            if condition[0] == 'between' and len(condition) == 3:
+                clause += "{0}.value BETWEEN ? AND ?"
+                arguments += [condition[1], condition[2]]
+            elif condition[0] in OPERATORS and len(condition) == 2:
+                clause += "{0}.value " + condition[0] + " ?"
+                arguments.append(condition[1])
+            else:
+                raise TypeError(
+                    f"Invalid condition for '{name}': {condition}."
+                )
+            clauses.append((self._estimate(clause, arguments), clause, arguments))
+        # Drive the join from the most selective condition and probe the
+        # others by primary key; CROSS JOIN keeps SQLite to this order.
+        clauses.sort(key = lambda clause: clause[0])
+        sql = "SELECT p.path FROM features AS f0"
+        parameters = []
+        for index, (_, clause, arguments) in enumerate(clauses[1:], 1):
+            sql += (
+                f" CROSS JOIN features AS f{index} ON f{index}.file = f0.file"
+                " AND " + clause.format(f"f{index}")
+            )
+            parameters += arguments
+        sql += (
+            " CROSS JOIN paths AS p ON p.file = f0.file WHERE " +
+            clauses[0][1].format("f0") + " ORDER BY p.path"
+        )
+        parameters += clauses[0][2]
+        return [path for path, in self.connection.execute(sql, parameters)]
+    ###########################################################################
+    def missing(self, paths, names):
+        """
+        Paths among paths whose current content lacks a current-version
+        value of any feature in names; run these through the extractors
+        again. Paths that are not files are left out, as there is nothing
+        to extract.
+        """
+        names = list(names)
+        versions = self.versions()
+        missing = []
+        for path in paths:
+            if not os.path.isfile(path):
+                continue
+            file = self._find(file_hash(path))
+            if file is None or not set(self._features(file, versions)).issuperset(names):
+                missing.append(path)
+        return missing
+    ###########################################################################
+    def prune(self):
+        """
+        Delete feature rows of outdated extractor versions.
+
+        Returns:
+            Number of rows deleted.
+        """
+        versions = self.versions()
+        deleted = 0
+        with self.connection:
+            for table in ('features', 'documents'):
+                for name, feature in self._names.items():
+                    deleted += self.connection.execute(
+                        f"DELETE FROM {table} WHERE feature = ? AND version != ?",
+                        (feature, self._version(name, versions))
+                    ).rowcount
+        return deleted
+
+###############################################################################
@@ -0,0 +1,264 @@
+"""
+Tempo map for exact conversion between ticks and seconds, bar index for
+conversion between ticks and bars, and a time index combining both.
+
+Every set_tempo event in a file becomes a breakpoint. Elapsed time at each
+breakpoint is kept as an integer count of microseconds scaled by
+ticks_per_beat, so conversions never accumulate floating point error and
+whole arrays of ticks convert with a single searchsorted.
+"""
+###############################################################################
+# Third Party Imports
+import numpy
+###############################################################################
+# Constants
+__all__ = ['TempoMap', 'BarIndex', 'TimeIndex']
+DEFAULT_TEMPO = 500000
+###############################################################################
+class TempoMap:
+    """
+    Piecewise-constant tempo of a MIDI file.
+
+    Attributes:
+        ticks -- Absolute tick of every tempo breakpoint, starting at 0.
+        tempos -- Tempo in microseconds per beat from each breakpoint on.
+        elapsed -- Microseconds * ticks_per_beat elapsed at each breakpoint.
+        ticks_per_beat -- Resolution of the source file.
+    """
+    def __init__(
+        self,
+        ticks,
+        tempos,
+        ticks_per_beat: int
+    ):
+        """
+        Build a tempo map from absolute tempo event ticks and tempos, in any
+        order and from any track. A file without a tempo at tick 0 starts at
+        the MIDI default of 120 bpm; of several tempos on one tick, the last
+        one given wins.
+        """
+        ticks = numpy.concatenate(
+            ([0], numpy.asarray(ticks, dtype = numpy.int64))
+        )
+        tempos = numpy.concatenate(
+            ([DEFAULT_TEMPO], numpy.asarray(tempos, dtype = numpy.int64))
+        )
+        order = numpy.argsort(ticks, kind = 'stable')
+        ticks, tempos = ticks[order], tempos[order]
+        # Keep the last tempo given on any tick.
+        last = numpy.append(ticks[1:] != ticks[:-1], True)
+        self.ticks = ticks[last]
+        self.tempos = tempos[last]
+        self.elapsed = numpy.concatenate((
+            [0],
+            numpy.cumsum(numpy.diff(self.ticks) * self.tempos[:-1])
+        ))
+        self.ticks_per_beat = ticks_per_beat
+    ###########################################################################
+    def __len__(self):
+        return len(self.ticks)
+    ###########################################################################
+    def __repr__(self):
+        return f"TempoMap({len(self)} tempos, ticks_per_beat={self.ticks_per_beat})"
+    ###########################################################################
+    @classmethod
+    def from_midi(cls, midi):
+        """Collect set_tempo events from every track of a Mido MidiFile."""
+        ticks, tempos = [], []
+        for track in midi.tracks:
+            tick = 0
+            for msg in track:
+                tick += msg.time
+                if msg.type == 'set_tempo':
+                    ticks.append(tick)
+                    tempos.append(msg.tempo)
+        return cls(ticks, tempos, midi.ticks_per_beat)
+    ###########################################################################
+    def tempo_at(self, ticks):
+        """Tempo in microseconds per beat sounding at absolute ticks."""
+        index = numpy.searchsorted(self.ticks, ticks, side = 'right') - 1
+        return self.tempos[index]
+    ###########################################################################
+    def tick2second(self, ticks):
+        """
+        Convert absolute ticks to seconds.
+
+        Arguments:
+            ticks -- Integer tick or array of integer ticks.
+
+        Returns:
+            Seconds as a float or float64 array of the same shape.
+        """
+        ticks = numpy.asarray(ticks, dtype = numpy.int64)
+        index = numpy.searchsorted(self.ticks, ticks, side = 'right') - 1
+        scaled = self.elapsed[index] + \
+            (ticks - self.ticks[index]) * self.tempos[index]
+        return scaled / (self.ticks_per_beat * 1e6)
+    ###########################################################################
+    def second2tick(self, seconds):
+        """
+        Convert seconds to (fractional) absolute ticks.
+
+        Arguments:
+            seconds -- Float or array of floats.
+
+        Returns:
+            Ticks as a float or float64 array of the same shape; round
+            to get a tick position.
+        """
+        scaled = numpy.asarray(seconds, dtype = numpy.float64) * \
+            (self.ticks_per_beat * 1e6)
+        index = numpy.searchsorted(self.elapsed, scaled, side = 'right') - 1
+        index = numpy.maximum(index, 0)
+        return self.ticks[index] + \
+            (scaled - self.elapsed[index]) / self.tempos[index]
+    ###########################################################################
+    def slice(self, start: int, end: int = None):
+        """
+        TempoMap of ticks start to end, rebased so that start is tick 0 and
+        begins with the tempo sounding at start.
+        """
+        keep = self.ticks > start
+        if end is not None:
+            keep &= self.ticks < end
+        return TempoMap(
+            numpy.concatenate(([0], self.ticks[keep] - start)),
+            numpy.concatenate(([self.tempo_at(start)], self.tempos[keep])),
+            self.ticks_per_beat
+        )
+
+###############################################################################
+class BarIndex:
+    """
+    Bar positions of a MIDI file from its time signature changes.
+
+    Bars are counted from 0 at tick 0 and may be fractional. A time
+    signature change that does not fall on a bar line starts a new bar
+    length from that tick on.
+
+    Attributes:
+        ticks -- Absolute tick of every time signature, starting at 0.
+        numerators, denominators -- Time signature from each tick on.
+        bar_ticks -- Length of a bar in ticks from each tick on.
+        bars -- Bar position of every time signature change.
+        ticks_per_beat -- Resolution of the source file.
+    """
+    def __init__(
+        self,
+        ticks,
+        numerators,
+        denominators,
+        ticks_per_beat: int
+    ):
+        """
+        Build from absolute time signature ticks; a file without a time
+        signature at tick 0 starts in 4/4. Of several time signatures on one
+        tick, the last one given wins.
+        """
+        ticks = numpy.concatenate(
+            ([0], numpy.asarray(ticks, dtype = numpy.int64))
+        )
+        numerators = numpy.concatenate(([4], numerators)).astype(numpy.int64)
+        denominators = numpy.concatenate(([4], denominators)).astype(numpy.int64)
+        order = numpy.argsort(ticks, kind = 'stable')
+        ticks = ticks[order]
+        last = numpy.append(ticks[1:] != ticks[:-1], True)
+        self.ticks = ticks[last]
+        self.numerators = numerators[order][last]
+        self.denominators = denominators[order][last]
+        self.bar_ticks = ticks_per_beat * 4 * self.numerators / self.denominators
+        self.bars = numpy.concatenate((
+            [0.0],
+            numpy.cumsum(numpy.diff(self.ticks) / self.bar_ticks[:-1])
+        ))
+        self.ticks_per_beat = ticks_per_beat
+    ###########################################################################
+    def __len__(self):
+        return len(self.ticks)
+    ###########################################################################
+    def __repr__(self):
+        return f"BarIndex({len(self)} time signatures, ticks_per_beat={self.ticks_per_beat})"
+    ###########################################################################
+    def tick2bar(self, ticks):
+        """Convert absolute ticks to (fractional) bar positions."""
+        ticks = numpy.asarray(ticks, dtype = numpy.int64)
+        index = numpy.searchsorted(self.ticks, ticks, side = 'right') - 1
+        return self.bars[index] + \
+            (ticks - self.ticks[index]) / self.bar_ticks[index]
+    ###########################################################################
+    def bar2tick(self, bars):
+        """Convert (fractional) bar positions to (fractional) ticks."""
+        bars = numpy.asarray(bars, dtype = numpy.float64)
+        index = numpy.searchsorted(self.bars, bars, side = 'right') - 1
+        index = numpy.maximum(index, 0)
+        return self.ticks[index] + \
+            (bars - self.bars[index]) * self.bar_ticks[index]
+    ###########################################################################
+    def slice(self, start: int, end: int = None):
+        """
+        BarIndex of ticks start to end, rebased so that start is tick 0 and
+        bar 0, and begins with the time signature in effect at start.
+        """
+        index = numpy.searchsorted(self.ticks, start, side = 'right') - 1
+        keep = self.ticks > start
+        if end is not None:
+            keep &= self.ticks < end
+        return BarIndex(
+            numpy.concatenate(([0], self.ticks[keep] - start)),
+            numpy.concatenate(([self.numerators[index]], self.numerators[keep])),
+            numpy.concatenate(([self.denominators[index]], self.denominators[keep])),
+            self.ticks_per_beat
+        )
+
+###############################################################################
+class TimeIndex:
+    """
+    Conversion between ticks, beats (quarter notes), bars and seconds of
+    one file, built once from its tempo map and bar index. Every
+    conversion is a binary search over the change points.
+
+    Attributes:
+        tempo_map -- TempoMap of the file.
+        bar_index -- BarIndex of the file.
+    """
+    UNITS = ('ticks', 'beats', 'bars', 'seconds')
+    def __init__(self, tempo_map: TempoMap, bar_index: BarIndex):
+        self.tempo_map = tempo_map
+        self.bar_index = bar_index
+        self.ticks_per_beat = tempo_map.ticks_per_beat
+    ###########################################################################
+    def __repr__(self):
+        return (
+            f"TimeIndex({len(self.tempo_map)} tempos, "
+            f"{len(self.bar_index)} time signatures)"
+        )
+    ###########################################################################
+    def _check(self, unit: str):
+        if unit not in self.UNITS:
+            raise TypeError(
+                f"unit must be one of {', '.join(self.UNITS)}."
+            )
+    ###########################################################################
+    def to_ticks(self, values, unit: str = 'bars'):
+        """Convert positions in unit to (fractional) absolute ticks."""
+        self._check(unit)
+        if unit == 'ticks':
+            return numpy.asarray(values, dtype = numpy.float64)
+        if unit == 'beats':
+            return numpy.asarray(values, dtype = numpy.float64) * self.ticks_per_beat
+        if unit == 'bars':
+            return self.bar_index.bar2tick(values)
+        return self.tempo_map.second2tick(values)
+    ###########################################################################
+    def from_ticks(self, ticks, unit: str = 'bars'):
+        """Convert absolute ticks to positions in unit."""
+        self._check(unit)
+        if unit == 'ticks':
+            return numpy.asarray(ticks, dtype = numpy.int64)
+        if unit == 'beats':
+            return numpy.asarray(ticks) / self.ticks_per_beat
+        if unit == 'bars':
+            return self.bar_index.tick2bar(ticks)
+        return self.tempo_map.tick2second(ticks)
+
+###############################################################################
@@ -2,45 +2,222 @@
 """
 ###############################################################################
 # Standard Imports
+import hashlib
+import json
 import os
-from time import time
+import warnings
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from functools import wraps
+from time import perf_counter
+from typing import NamedTuple
+# Local Imports
+from pyramidi.instrument import count, timed
 ###############################################################################
 # Constants
-__all__ = []
+__all__ = ['Changes', 'Manifest', 'scan']
+MANIFEST_VERSION = 1
 ###############################################################################
 def timer(func):
     """
+    Print the elapsed time of every call of func. Deprecated: use
+    pyramidi.instrument.timed, whose spans show up in instrument.report.
+    Calls are recorded as a span named after func as well.
     """
-    def wrapper(
-            *args,
-            **kwargs
-        ):
-        """
-        """
-        start_time = time()
-        result = func(
-            *args,
-            **kwargs
-        )
-        end_time = time()
-        execution_time = end_time - start_time
-        print(f"Elapsed Time: {execution_time:.2f}")
+    warnings.warn(
+        "tools.timer is deprecated; use pyramidi.instrument.timed.",
+        DeprecationWarning,
+        stacklevel = 2
+    )
+    func = timed(func.__name__)(func)
+    @wraps(func)
+    def wrapper(*args, **kwargs):
+        start_time = perf_counter()
+        result = func(*args, **kwargs)
+        print(f"Elapsed Time: {perf_counter() - start_time:.2f}")
         return result
     return wrapper
 
 ###############################################################################
-@timer
+def _list_directory(directory: str, extension: str, stat: bool):
+    """
+    One directory's matching files as (path, size, mtime_ns), and its
+    subdirectories. Size and mtime are None unless stat is set.
+    Unreadable entries are skipped, as os.walk does.
+    """
+    files, subdirectories = [], []
+    try:
+        with os.scandir(directory) as entries:
+            for entry in entries:
+                try:
+                    if entry.is_dir(follow_symlinks = False):
+                        subdirectories.append(entry.path)
+                    elif entry.is_file() and os.path.splitext(entry.name)[1] \
+                            .lower().endswith(extension):
+                        if stat:
+                            result = entry.stat()
+                            files.append(
+                                (entry.path, result.st_size, result.st_mtime_ns)
+                            )
+                        else:
+                            files.append((entry.path, None, None))
+                except OSError:
+                    continue
+    except OSError:
+        pass
+    return files, subdirectories
+
+###############################################################################
+def _walk(directory, extension: str = ".mid", workers: int = 8, stat: bool = True):
+    """
+    Walk a tree with scandir on a thread pool, one directory per task,
+    yielding (path, size, mtime_ns) as each directory is listed.
+    """
+    pool = ThreadPoolExecutor(workers)
+    try:
+        pending = {
+            pool.submit(_list_directory, os.fspath(directory), extension, stat)
+        }
+        while pending:
+            done, pending = wait(pending, return_when = FIRST_COMPLETED)
+            for future in done:
+                files, subdirectories = future.result()
+                pending.update(
+                    pool.submit(_list_directory, subdirectory, extension, stat)
+                    for subdirectory in subdirectories
+                )
+                yield from files
+    finally:
+        pool.shutdown(wait = False, cancel_futures = True)
+
+###############################################################################
+def scan(directory, extension: str = ".mid", workers: int = 8):
+    """
+    Yield the paths of every file with the extension under directory as
+    they are found. Directories are listed concurrently, so the order is
+    not fixed; symbolic links to directories are not followed.
+
+    Keyword arguments:
+    directory -- Root of the tree.
+    extension -- File extension to match (case-insensitive).
+    workers -- Directories listed at the same time.
+    """
+    for path, _, _ in _walk(directory, extension, workers, stat = False):
+        yield path
+
+###############################################################################
+@timed('scan')
 def parser(
     dir,
     extension = ".mid"
 ):
     """Accepts folder directory, returns root paths of all MIDI files."""
-    data = []
-    for root, dirs, files in os.walk(dir):
-        for filename in files:
-            nm, ext = os.path.splitext(filename)
-            if ext.lower().endswith((extension)):
-                data.append((root + "/" + filename))
-    return data
-
-##############################################################################
\ No newline at end of file
+    return sorted(scan(dir, extension = extension))
+
+###############################################################################
+def _hash_file(path: str):
+    """SHA-256 of a file's content, read in 1 MiB blocks."""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(2**20), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+###############################################################################
+class Changes(NamedTuple):
+    """
+    Difference between two scans of a corpus, as sorted path lists.
+
+    Attributes:
+        new -- Files not in the manifest before.
+        changed -- Files whose content hash differs.
+        deleted -- Files in the manifest that are gone.
+    """
+    new: list
+    changed: list
+    deleted: list
+
+###############################################################################
+class Manifest:
+    """
+    (size, mtime, content hash) of every file of one corpus, stored as
+    JSON so that a re-scan reports only what changed. Files whose size and
+    modification time are unchanged are not read again.
+
+    Attributes:
+        path -- JSON file the manifest is loaded from and saved to, or None.
+        files -- Path to (size, mtime_ns, sha256).
+    """
+    def __init__(self, path: str = None):
+        """
+        Keyword arguments:
+        path -- Manifest file; loaded if it exists.
+        """
+        self.path = path
+        self.files = {}
+        if path is not None and os.path.exists(path):
+            with open(path) as f:
+                data = json.load(f)
+            if data.get('version') == MANIFEST_VERSION:
+                self.files = {
+                    file: tuple(entry) for file, entry in data['files'].items()
+                }
+    ###########################################################################
+    def __len__(self):
+        return len(self.files)
+    ###########################################################################
+    def __repr__(self):
+        return f"Manifest({self.path!r}, {len(self)} files)"
+    ###########################################################################
+    def update(self, directory, extension: str = ".mid", workers: int = 8):
+        """
+        Scan directory, hash new and modified files and record them.
+
+        Keyword arguments:
+        directory -- Root of the corpus.
+        extension -- File extension to match (case-insensitive).
+        workers -- Directories listed, and files hashed, at the same time.
+
+        Returns:
+            Changes since the previous update. A file whose modification
+            time changed but whose content did not is not reported.
+        """
+        seen = {}
+        stale = []
+        for path, size, mtime in _walk(directory, extension, workers):
+            seen[path] = (size, mtime)
+            entry = self.files.get(path)
+            if entry is None or entry[:2] != (size, mtime):
+                stale.append(path)
+        with ThreadPoolExecutor(workers) as pool:
+            digests = dict(zip(stale, pool.map(_hash_file, stale)))
+        count('files_hashed', len(stale))
+        new, changed = [], []
+        for path, digest in digests.items():
+            entry = self.files.get(path)
+            if entry is None:
+                new.append(path)
+            elif entry[2] != digest:
+                changed.append(path)
+            self.files[path] = seen[path] + (digest,)
+        deleted = [path for path in self.files if path not in seen]
+        for path in deleted:
+            del self.files[path]
+        return Changes(sorted(new), sorted(changed), sorted(deleted))
+    ###########################################################################
+    def save(self, path: str = None):
+        """Write the manifest to path, by default the one it was loaded from."""
+        path = self.path if path is None else path
+        if path is None:
+            raise TypeError(
+                "Give a path to save the manifest to."
+            )
+        temporary = f"{path}.tmp"
+        with open(temporary, 'w') as f:
+            json.dump({
+                'version': MANIFEST_VERSION,
+                'files': {file: list(entry) for file, entry in sorted(self.files.items())}
+            }, f)
+        os.replace(temporary, path)
+        self.path = path
+
+###############################################################################
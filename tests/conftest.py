@@ -0,0 +1,109 @@
+"""
+Shared fixtures: tests/test.mid and small seeded multi-track files with
+tempo and time signature changes, overlapping notes of the same pitch,
+velocity 0 note-offs, controllers and sysex.
+"""
+###############################################################################
+# Standard Imports
+import os
+import random
+# Third Party Imports
+import pytest
+from mido import Message, MetaMessage, MidiFile, MidiTrack, bpm2tempo
+###############################################################################
+# Constants
+TEST_MID = os.path.join(os.path.dirname(__file__), "test.mid")
+SIGNATURES = [(4, 4), (3, 4), (6, 8), (5, 4), (2, 2)]
+###############################################################################
+def _track(events):
+    """MidiTrack from (tick, message) pairs, in a stable tick order."""
+    track = MidiTrack()
+    last = 0
+    for tick, msg in sorted(events, key = lambda event: event[0]):
+        track.append(msg.copy(time = tick - last))
+        last = tick
+    track.append(MetaMessage('end_of_track', time = 0))
+    return track
+
+###############################################################################
+def make_midi(seed: int, bars: int = 12, tracks: int = 2, ticks_per_beat: int = 96):
+    """Seeded type 1 MidiFile with a conductor track and note tracks."""
+    rng = random.Random(seed)
+    conductor = [(0, MetaMessage('set_tempo', tempo = bpm2tempo(120)))]
+    tick = 0
+    for bar in range(bars):
+        numerator, denominator = SIGNATURES[0] if bar == 0 \
+            else rng.choice(SIGNATURES)
+        if bar == 0 or rng.random() < 0.3:
+            conductor.append((tick, MetaMessage(
+                'time_signature', numerator = numerator, denominator = denominator
+            )))
+        else:
+            numerator, denominator = previous
+        if bar and rng.random() < 0.3:
+            conductor.append((tick, MetaMessage(
+                'set_tempo', tempo = bpm2tempo(rng.uniform(50, 200))
+            )))
+        previous = numerator, denominator
+        tick += ticks_per_beat * 4 * numerator // denominator
+    end = tick
+    midi = MidiFile(type = 1, ticks_per_beat = ticks_per_beat)
+    midi.tracks.append(_track(conductor))
+    for index in range(tracks):
+        channel = index
+        events = [
+            (0, Message('program_change', channel = channel, program = index)),
+            (0, Message('sysex', data = [0x7E, 0x7F, 0x09, 0x01]))
+        ]
+        for voice in range(3):
+            tick = rng.randrange(0, ticks_per_beat)
+            while tick < end:
+                length = rng.choice([24, 48, 96, 144, 192])
+                pitch = 40 + 12 * voice + rng.randrange(18)
+                events.append((tick, Message(
+                    'note_on', channel = channel, note = pitch,
+                    velocity = rng.randrange(30, 120)
+                )))
+                off = min(tick + length, end)
+                if rng.random() < 0.5:
+                    off_msg = Message('note_on', channel = channel, note = pitch, velocity = 0)
+                else:
+                    off_msg = Message('note_off', channel = channel, note = pitch, velocity = 64)
+                events.append((off, off_msg))
+                if rng.random() < 0.1:
+                    events.append((tick, Message(
+                        'control_change', channel = channel, control = 64, value = 127
+                    )))
+                tick += rng.choice([length, length // 2, length + 48])
+        midi.tracks.append(_track(events))
+    return midi
+
+###############################################################################
+@pytest.fixture(autouse = True, scope = "session")
+def table_directory(tmp_path_factory):
+    """Persist roughness dyad tables in a temporary directory, not $HOME."""
+    from pyramidi.models import roughness
+    previous = roughness.TABLE_DIRECTORY
+    roughness.TABLE_DIRECTORY = str(tmp_path_factory.mktemp("tables"))
+    roughness.dyad_table.cache_clear()
+    yield roughness.TABLE_DIRECTORY
+    roughness.TABLE_DIRECTORY = previous
+    roughness.dyad_table.cache_clear()
+
+###############################################################################
+@pytest.fixture(scope = "session")
+def midi_files(tmp_path_factory):
+    """Paths of test.mid and three synthetic files."""
+    directory = tmp_path_factory.mktemp("midi")
+    paths = [TEST_MID]
+    for seed, settings in enumerate([
+        {'bars': 6, 'tracks': 1},
+        {'bars': 12, 'tracks': 3},
+        {'bars': 16, 'tracks': 2, 'ticks_per_beat': 480}
+    ]):
+        path = str(directory / f"synthetic_{seed}.mid")
+        make_midi(seed, **settings).save(path)
+        paths.append(path)
+    return paths
+
+###############################################################################
@@ -0,0 +1,43 @@
+"""
+File-level analyses of test.mid against the original implementations.
+"""
+###############################################################################
+# Standard Imports
+import os
+# Third Party Imports
+import pytest
+# Local Imports
+from pyramidi.analysis import ambitus, salami, swierckj_pcd
+###############################################################################
+# Constants
+TEST_MID = os.path.join(os.path.dirname(__file__), "test.mid")
+# Original results for test.mid.
+PCD = [
+    0.328042328, 0.0, 0.19047619, 0.0, 0.164021164, 0.021164021,
+    0.010582011, 0.074074074, 0.0, 0.084656085, 0.0, 0.126984127
+]
+SALAMI_HEAD = [
+    [[60], 0.25], [[60, 64], 0.25], [[60, 64, 67], 0.25],
+    [[60, 64, 72], 0.25], [[60, 64, 76], 0.25], [[60, 64, 67], 0.25]
+]
+SALAMI_LENGTH = 144
+###############################################################################
+@pytest.mark.parametrize("timebase", ["seconds", "ticks"])
+def test_pcd(timebase):
+    pcd = swierckj_pcd(TEST_MID, timebase = timebase)
+    assert list(pcd) == list(range(12))
+    assert list(pcd.values()) == pytest.approx(PCD, abs = 1e-9)
+
+###############################################################################
+def test_salami():
+    slices = salami(TEST_MID)
+    assert len(slices) == SALAMI_LENGTH
+    assert [[sorted(chord), duration] for chord, duration in slices[:6]] == \
+        SALAMI_HEAD
+    assert sum(duration for _, duration in slices) == 36.0
+
+###############################################################################
+def test_ambitus():
+    assert tuple(ambitus(TEST_MID)) == (57, 81)
+
+###############################################################################
@@ -0,0 +1,88 @@
+"""
+The batch engine: input order, per-file errors and timeouts.
+"""
+###############################################################################
+# Standard Imports
+import shutil
+import signal
+import threading
+import time
+# Third Party Imports
+import pytest
+# Local Imports
+from pyramidi import batch
+from pyramidi.sdc import get_onset_rate, get_pitch_height
+from pyramidi.tools import parser
+###############################################################################
+def slow(midi_file):
+    time.sleep(5)
+
+###############################################################################
+@pytest.fixture
+def corpus(tmp_path, midi_files):
+    """Directory with the test files and one file that is not MIDI."""
+    for index, path in enumerate(midi_files):
+        shutil.copy(path, tmp_path / f"{index}.mid")
+    (tmp_path / "bad.mid").write_bytes(b"not midi")
+    return tmp_path
+
+###############################################################################
+@pytest.mark.parametrize("workers", [0, 2])
+def test_run_matches_extractors(corpus, workers):
+    results = list(batch.run(
+        str(corpus), extractors = ('pitch_height', 'onset_rate'),
+        workers = workers, chunksize = 2
+    ))
+    assert [result.path for result in results] == parser(str(corpus))
+    good = [result for result in results if not result.path.endswith("bad.mid")]
+    bad, = [result for result in results if result.path.endswith("bad.mid")]
+    for result in good:
+        assert result.errors == {}
+        assert result.features == {
+            'pitch_height': get_pitch_height(result.path),
+            'onset_rate': get_onset_rate(result.path)
+        }
+    assert set(bad.errors) == {'pitch_height', 'onset_rate'}
+    assert bad.features == {'pitch_height': None, 'onset_rate': None}
+
+###############################################################################
+def test_timeout_is_recorded(corpus):
+    path = str(corpus / "0.mid")
+    result, = batch.run(
+        [path], extractors = ('onset_rate', slow), workers = 0, timeout = 0.2
+    )
+    assert result.features['onset_rate'] == get_onset_rate(path)
+    assert result.errors == {'slow': "Timeout after 0.2 seconds."}
+    assert result.elapsed < 5
+
+###############################################################################
+def test_invalid_extractor():
+    with pytest.raises(TypeError):
+        list(batch.run([], extractors = ('nope',)))
+
+###############################################################################
+def test_timeout_restores_signal_handler(corpus):
+    path = str(corpus / "0.mid")
+    previous = signal.getsignal(signal.SIGALRM)
+    handler = lambda signum, frame: None
+    signal.signal(signal.SIGALRM, handler)
+    try:
+        batch._extract([path], batch._resolve(('onset_rate',)), timeout = 1)
+        assert signal.getsignal(signal.SIGALRM) is handler
+    finally:
+        signal.signal(signal.SIGALRM, previous)
+
+###############################################################################
+def test_timeout_outside_main_thread(corpus):
+    path = str(corpus / "0.mid")
+    results = []
+    thread = threading.Thread(target = lambda: results.extend(batch.run(
+        [path], extractors = ('onset_rate',), workers = 0, timeout = 1
+    )))
+    thread.start()
+    thread.join()
+    result, = results
+    assert result.errors == {}
+    assert result.features['onset_rate'] == get_onset_rate(path)
+
+###############################################################################
@@ -0,0 +1,46 @@
+"""
+The synthetic corpus and a small benchmark run.
+"""
+###############################################################################
+# Standard Imports
+from io import BytesIO
+# Third Party Imports
+import pytest
+# Local Imports
+from benchmarks import corpus
+from benchmarks.run import compare, run
+from pyramidi.notes import NoteTable
+###############################################################################
+def _bytes(midi):
+    buffer = BytesIO()
+    midi.save(file = buffer)
+    return buffer.getvalue()
+
+###############################################################################
+def test_generate_midi_is_seeded():
+    first = corpus.generate_midi(bars = 8, seed = 3)
+    assert _bytes(first) == _bytes(corpus.generate_midi(bars = 8, seed = 3))
+    assert _bytes(first) != _bytes(corpus.generate_midi(bars = 8, seed = 4))
+    midi = corpus.generate_midi(bars = 8, tracks = 3, polyphony = 2, seed = 1)
+    assert len(midi.tracks) == 4
+    table = NoteTable.from_midi(midi)
+    assert len(table) > 0
+    assert set(table.track.tolist()) == {1, 2, 3}
+
+###############################################################################
+def test_run_and_compare(tmp_path):
+    names = ['read_smf', 'mirmode']
+    result = run(
+        names, sizes = [2, 4], files = 1, repeat = 1,
+        directory = str(tmp_path), log = None, tracks = 1
+    )
+    assert [
+        (record['benchmark'], record['bars']) for record in result['results']
+    ] == [('read_smf', 2), ('mirmode', 2), ('read_smf', 4), ('mirmode', 4)]
+    assert set(result['scaling']) == set(names)
+    ratios = compare(result, result)
+    assert set(ratios.values()) <= {1.0}
+    with pytest.raises(TypeError):
+        run(['nope'], log = None)
+
+###############################################################################
@@ -0,0 +1,74 @@
+"""
+The content-addressed result cache.
+"""
+###############################################################################
+# Standard Imports
+import os
+import shutil
+# Third Party Imports
+import pytest
+# Local Imports
+from pyramidi import cache
+from pyramidi.analysis import swierckj_pcd
+from pyramidi.cache import Cache
+###############################################################################
+@pytest.fixture
+def no_cache():
+    cache.disable()
+    yield
+    cache.disable()
+
+###############################################################################
+def _transposed(source, target):
+    """Copy of a MIDI file with the first note of its second chunk moved up."""
+    with open(source, 'rb') as f:
+        data = bytearray(f.read())
+    index = data.index(b'\x90', data.index(b'MTrk', 20))
+    data[index + 1] += 1
+    with open(target, 'wb') as f:
+        f.write(data)
+
+###############################################################################
+def test_cache_keys_on_content(tmp_path, midi_files, no_cache):
+    path = tmp_path / "a.mid"
+    shutil.copy(midi_files[0], path)
+    active = cache.configure(str(tmp_path / "cache"))
+    first = swierckj_pcd(str(path))
+    assert swierckj_pcd(str(path)) == first
+    assert active.hits == 1
+    assert len(os.listdir(tmp_path / "cache")) > 0
+    # A different file at the same path is not served from the cache.
+    _transposed(midi_files[0], tmp_path / "b.mid")
+    os.replace(tmp_path / "b.mid", path)
+    assert swierckj_pcd(str(path)) != first
+    # The disk tier outlives the process' memory tier.
+    cache.configure(str(tmp_path / "cache"))
+    shutil.copy(midi_files[0], path)
+    assert swierckj_pcd(str(path)) == first
+    assert cache.get_cache().hits == 1
+
+###############################################################################
+def test_memory_tier_is_lru():
+    memory = Cache(memory_items = 2)
+    memory.set('a', 1)
+    memory.set('b', 2)
+    assert memory.get('a') == 1
+    memory.set('c', 3)
+    assert memory.get('b') is None
+    assert (memory.get('a'), memory.get('c')) == (1, 3)
+
+###############################################################################
+def test_disk_tier_is_bounded(tmp_path):
+    disk = Cache(str(tmp_path), memory_items = 1, disk_bytes = 5000)
+    for index in range(20):
+        disk.set(f"{index:064x}", bytes(1000))
+    assert sum(size for _, _, size in disk._disk_entries()) <= 5000
+    disk.clear()
+    assert disk._disk_entries() == []
+
+###############################################################################
+def test_disabled_cache_calls_through(midi_files, no_cache):
+    assert cache.get_cache() is None
+    assert swierckj_pcd(midi_files[0]) == swierckj_pcd(midi_files[0])
+
+###############################################################################
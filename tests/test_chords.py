@@ -0,0 +1,70 @@
+"""
+Chord recognition tables against the original interval-vector rules.
+"""
+###############################################################################
+# Third Party Imports
+import pytest
+# Local Imports
+from pyramidi.analysis import (
+    CHORD_BASSINT,
+    CHORD_IVS,
+    ChordDetect,
+    bass_intervals,
+    chord_quality,
+    interval_vector,
+    label_chords
+)
+###############################################################################
+def original_quality(chord):
+    """chord_quality as originally written: exact only in close position."""
+    try:
+        quality = CHORD_IVS[str(interval_vector(chord))]
+        if type(quality) is list:
+            return CHORD_BASSINT[bass_intervals(chord)]
+        return quality
+    except KeyError:
+        return None
+
+###############################################################################
+def test_close_position_matches_original():
+    recognized = 0
+    for mask in range(1, 4096):
+        pcs = [pc for pc in range(12) if (mask >> pc) & 1]
+        for bass in pcs:
+            chord = sorted(48 + bass + (pc - bass) % 12 for pc in pcs)
+            expected = original_quality(chord)
+            assert chord_quality(chord) == expected, chord
+            recognized += expected is not None
+    assert recognized > 0
+
+###############################################################################
+@pytest.mark.parametrize("chord, quality", [
+    ([57, 64, 72], 'min'),
+    ([57, 64, 83], 'sus'),
+    ([48, 67, 76, 72], 'maj'),
+    ([43, 59, 62, 65, 67], '7')
+])
+def test_open_voicings(chord, quality):
+    assert chord_quality(chord) == quality
+
+###############################################################################
+def test_chord_detect():
+    chord = ChordDetect([57, 60, 64, 67])
+    assert (chord.quality, chord.root, chord.root_pc) == ('min7', 57, 9)
+    assert chord.chord_symbol == 'Amin7'
+    inversion = ChordDetect([64, 67, 72])
+    assert (inversion.root, inversion.bass) == (72, 64)
+    assert inversion.chord_symbol == 'Cmaj/E'
+    assert ChordDetect([60, 62]).chord_symbol is None
+
+###############################################################################
+def test_label_chords():
+    labels, vocabulary = label_chords([
+        [[60, 64, 67], 0.5], [[64, 67, 72], 0.25], [[60, 61, 62], 0.25], [[], 1.0]
+    ])
+    assert [vocabulary[label] if label >= 0 else None for label in labels] == \
+        ['Cmaj', 'Cmaj/E', None, None]
+    same, _ = label_chords([[72, 76, 79], [76, 79, 84]])
+    assert list(same) == list(labels[:2])
+
+###############################################################################
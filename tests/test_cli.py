@@ -0,0 +1,104 @@
+"""
+Regression tests for the manipulateMIDI command line.
+"""
+###############################################################################
+# Standard Imports
+import os
+import shutil
+import sys
+# Third Party Imports
+import mido
+import pytest
+# Local Imports
+from pyramidi.cli import manipulateMIDI
+###############################################################################
+# Constants
+TEST_MID = os.path.join(os.path.dirname(__file__), "test.mid")
+###############################################################################
+def _run(monkeypatch, *arguments):
+    monkeypatch.setattr(sys, "argv", ["manipulateMIDI", *arguments])
+    manipulateMIDI.main()
+
+###############################################################################
+def _tempos(path):
+    return [
+        msg.tempo for track in mido.MidiFile(path).tracks
+        for msg in track if msg.type == "set_tempo"
+    ]
+
+###############################################################################
+def test_directory_batch(tmp_path, monkeypatch, capsys):
+    source = tmp_path / "in"
+    (source / "nested").mkdir(parents = True)
+    shutil.copy(TEST_MID, source / "a.mid")
+    shutil.copy(TEST_MID, source / "nested" / "b.mid")
+    (source / "notes.txt").write_text("not midi")
+    output = tmp_path / "out"
+    _run(
+        monkeypatch, "--input", str(source), "--output", str(output),
+        "--tempo", "90", "--jobs", "2"
+    )
+    assert "2 written, 0 failed" in capsys.readouterr().err
+    for name in ("a.mid", os.path.join("nested", "b.mid")):
+        assert set(_tempos(output / name)) == {mido.bpm2tempo(90)}
+
+###############################################################################
+def test_manifest_jobs(tmp_path, monkeypatch):
+    (tmp_path / "bad.mid").write_bytes(b"not midi")
+    manifest = tmp_path / "jobs.csv"
+    manifest.write_text(
+        "input,output,tempo\n"
+        f"{TEST_MID},{tmp_path / 'fast.mid'},150\n"
+        f"{TEST_MID},{tmp_path / 'default.mid'},\n"
+        f"{tmp_path / 'bad.mid'},{tmp_path / 'bad_out.mid'},\n"
+    )
+    with pytest.raises(SystemExit) as exit:
+        _run(monkeypatch, "--input", str(manifest), "--tempo", "60")
+    assert exit.value.code == 1
+    assert set(_tempos(tmp_path / "fast.mid")) == {mido.bpm2tempo(150)}
+    assert set(_tempos(tmp_path / "default.mid")) == {mido.bpm2tempo(60)}
+    assert not os.path.exists(tmp_path / "bad_out.mid")
+
+###############################################################################
+def test_single_file_is_always_written(tmp_path, monkeypatch):
+    output = str(tmp_path / "out.mid")
+    _run(monkeypatch, "--input", TEST_MID, "--output", output, "--tempo", "90")
+    _run(monkeypatch, "--input", TEST_MID, "--output", output, "--tempo", "60")
+    assert set(_tempos(output)) == {mido.bpm2tempo(60)}
+    assert not os.path.exists(output + manipulateMIDI.SIDECAR)
+
+###############################################################################
+def test_batch_skips_only_unchanged_jobs(tmp_path, monkeypatch, capsys):
+    source = tmp_path / "in"
+    source.mkdir()
+    shutil.copy(TEST_MID, source / "a.mid")
+    output = tmp_path / "out"
+    arguments = ["--input", str(source), "--output", str(output)]
+    _run(monkeypatch, *arguments, "--tempo", "90")
+    capsys.readouterr()
+    _run(monkeypatch, *arguments, "--tempo", "90")
+    assert "Skipping 1" in capsys.readouterr().err
+    _run(monkeypatch, *arguments, "--tempo", "60")
+    assert "Skipping" not in capsys.readouterr().err
+    assert set(_tempos(output / "a.mid")) == {mido.bpm2tempo(60)}
+    # Changed input content invalidates the output too.
+    with open(source / "a.mid", "ab") as f:
+        f.write(b"MTrk\x00\x00\x00\x04\x00\xff\x2f\x00")
+    assert not manipulateMIDI.up_to_date(
+        (str(source / "a.mid"), str(output / "a.mid"), {"tempo": 60.0})
+    )
+
+###############################################################################
+def test_missing_input_is_an_error(tmp_path, monkeypatch):
+    output = str(tmp_path / "out")
+    with pytest.raises(SystemExit, match = "does not exist"):
+        _run(monkeypatch, "--input", str(tmp_path / "missing.mid"),
+             "--output", output)
+    with pytest.raises(SystemExit, match = "No MIDI files match"):
+        _run(monkeypatch, "--input", str(tmp_path / "*.mid"), "--output", output)
+    (tmp_path / "empty").mkdir()
+    with pytest.raises(SystemExit, match = "No MIDI files match"):
+        _run(monkeypatch, "--input", str(tmp_path / "empty"), "--output", output)
+    assert not os.path.exists(output)
+
+###############################################################################
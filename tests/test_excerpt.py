@@ -0,0 +1,193 @@
+"""
+Excerpts by bars, beats, seconds and ticks against brute force, and the
+cut of the first bars of a file.
+"""
+###############################################################################
+# Third Party Imports
+import numpy
+import pytest
+from mido import Message, MetaMessage, MidiFile, MidiTrack, tick2second
+# Local Imports
+from pyramidi.core import cut
+from pyramidi.notes import NoteTable
+###############################################################################
+# Constants
+FIELDS = ('onset_ticks', 'offset_ticks', 'pitch', 'velocity', 'channel', 'track')
+###############################################################################
+def changes(path, kind):
+    """Absolute (tick, message) of every message of a type in a file."""
+    found = []
+    for track in MidiFile(path).tracks:
+        tick = 0
+        for msg in track:
+            tick += msg.time
+            if msg.type == kind:
+                found.append((tick, msg))
+    return sorted(found, key = lambda change: change[0])
+
+###############################################################################
+def bar2tick(path, ticks_per_beat, bars):
+    """Walk the time signatures bar by bar."""
+    tick, length, position = 0, ticks_per_beat * 4, 0.0
+    for change, msg in changes(path, 'time_signature'):
+        if position + (change - tick) / length >= bars:
+            break
+        position += (change - tick) / length
+        tick = change
+        length = ticks_per_beat * 4 * msg.numerator / msg.denominator
+    return tick + (bars - position) * length
+
+###############################################################################
+def second2tick(path, ticks_per_beat, seconds):
+    """Walk the tempo changes segment by segment."""
+    tick, tempo, elapsed = 0, 500000, 0.0
+    for change, msg in changes(path, 'set_tempo'):
+        span = tick2second(change - tick, ticks_per_beat, tempo)
+        if elapsed + span >= seconds:
+            break
+        elapsed += span
+        tick, tempo = change, msg.tempo
+    return tick + (seconds - elapsed) * 1e6 / tempo * ticks_per_beat
+
+###############################################################################
+def reference_excerpt(table, start, end):
+    """
+    Clip every note overlapping [start, end) ticks, rebased to start and
+    sorted by onset, then pitch.
+    """
+    keep = numpy.flatnonzero((table.onset_ticks < end) & (
+        (table.offset_ticks > start) | (table.onset_ticks >= start)
+    ))
+    onsets = numpy.maximum(table.onset_ticks[keep], start) - start
+    keep = keep[numpy.lexsort((table.pitch[keep], onsets))]
+    return {
+        'onset_ticks': numpy.maximum(table.onset_ticks[keep], start) - start,
+        'offset_ticks': numpy.minimum(table.offset_ticks[keep], end) - start,
+        'pitch': table.pitch[keep],
+        'velocity': table.velocity[keep],
+        'channel': table.channel[keep],
+        'track': table.track[keep]
+    }
+
+###############################################################################
+@pytest.mark.parametrize("unit, start, end", [
+    ("ticks", 500, 2900),
+    ("beats", 3, 17.5),
+    ("bars", 2, 5.5),
+    ("seconds", 1.3, 7.9)
+])
+def test_excerpt_matches_brute_force(midi_files, unit, start, end):
+    for path in midi_files[1:]:
+        table = NoteTable.from_file(path)
+        tpb = table.ticks_per_beat
+        convert = {
+            "ticks": lambda value: value,
+            "beats": lambda value: value * tpb,
+            "bars": lambda value: bar2tick(path, tpb, value),
+            "seconds": lambda value: second2tick(path, tpb, value)
+        }[unit]
+        first, last = (int(round(convert(value))) for value in (start, end))
+        excerpt = table.excerpt(start, end, unit = unit)
+        expected = reference_excerpt(table, first, last)
+        assert len(excerpt) > 0
+        for field in FIELDS:
+            numpy.testing.assert_array_equal(
+                getattr(excerpt, field), expected[field], err_msg = field
+            )
+        assert excerpt.end_tick == last - first
+        # The excerpt keeps the tempo and meter in effect at its start.
+        offset = table.tempo_map.tick2second(first)
+        numpy.testing.assert_allclose(
+            excerpt.onset_seconds,
+            table.tempo_map.tick2second(expected['onset_ticks'] + first) - offset,
+            atol = 1e-9
+        )
+
+###############################################################################
+def test_excerpts(midi_files):
+    table = NoteTable.from_file(midi_files[2])
+    whole = table.excerpt(0)
+    numpy.testing.assert_array_equal(whole.onset_ticks, table.onset_ticks)
+    parts = table.excerpts([(0, 2), (2, 4)])
+    assert [len(part) for part in parts] == \
+        [len(table.excerpt(0, 2)), len(table.excerpt(2, 4))]
+    with pytest.raises(TypeError):
+        table.excerpt(4, 2)
+    with pytest.raises(TypeError):
+        table.excerpt(0, 1, unit = "measures")
+
+###############################################################################
+def test_slices(midi_files):
+    table = NoteTable.from_file(midi_files[3])
+    ticks = numpy.arange(0, 6000, 11)
+    for start in (0, 777, 4000):
+        tempo_map = table.tempo_map.slice(start, start + 6000)
+        numpy.testing.assert_allclose(
+            tempo_map.tick2second(ticks),
+            table.tempo_map.tick2second(ticks + start) -
+            table.tempo_map.tick2second(start),
+            atol = 1e-9
+        )
+        assert tempo_map.tempo_at(0) == table.tempo_map.tempo_at(start)
+        bar_index = table.bar_index.slice(start, start + 6000)
+        numpy.testing.assert_allclose(
+            bar_index.tick2bar(ticks),
+            table.bar_index.tick2bar(ticks + start) -
+            table.bar_index.tick2bar(start),
+            atol = 1e-9
+        )
+
+###############################################################################
+def type0(events, ticks_per_beat = 480):
+    """Type 0 MidiFile from (tick, message) pairs."""
+    midi = MidiFile(type = 0, ticks_per_beat = ticks_per_beat)
+    track = MidiTrack()
+    last = 0
+    for tick, msg in sorted(events, key = lambda event: event[0]):
+        track.append(msg.copy(time = tick - last))
+        last = tick
+    midi.tracks.append(track)
+    return midi
+
+###############################################################################
+def note(pitch, on, off):
+    return [
+        (on, Message('note_on', note = pitch, velocity = 80)),
+        (off, Message('note_off', note = pitch, velocity = 0))
+    ]
+
+###############################################################################
+def test_cut_follows_meter_changes():
+    # One bar of 4/4, then 3/4: two bars end at 1920 + 1440 ticks.
+    midi = type0(
+        [(0, MetaMessage('time_signature', numerator = 4, denominator = 4)),
+         (1920, MetaMessage('time_signature', numerator = 3, denominator = 4))] +
+        note(60, 0, 480) + note(62, 3000, 3300) + note(64, 3360, 3500)
+    )
+    table = NoteTable.from_midi(cut(midi, 2))
+    assert table.pitch.tolist() == [60, 62]
+    # Without a time signature the file is in 4/4.
+    table = NoteTable.from_midi(cut(type0(note(60, 0, 480) + note(62, 1920, 2000)), 1))
+    assert table.pitch.tolist() == [60]
+
+###############################################################################
+@pytest.mark.parametrize("events", [
+    # A note starting on the end of the bar.
+    note(60, 0, 1800) + note(62, 1920, 2000),
+    # A note whose note-off is the first message past the end.
+    note(60, 0, 1800) + note(64, 1000, 1950),
+    # A note crossing the end.
+    note(60, 0, 1800) + note(65, 1700, 2500) + note(67, 2000, 2100)
+])
+def test_cut_closes_every_note_once(events):
+    signature = MetaMessage('time_signature', numerator = 4, denominator = 4)
+    track = cut(type0([(0, signature)] + events), 1).tracks[0]
+    ons = [msg.note for msg in track if msg.type == 'note_on' and msg.velocity > 0]
+    offs = [
+        msg.note for msg in track
+        if msg.type == 'note_off' or (msg.type == 'note_on' and msg.velocity == 0)
+    ]
+    assert sorted(ons) == sorted(offs)
+    assert max(ons) < 66
+
+###############################################################################
@@ -0,0 +1,52 @@
+"""
+AnalyzedMidi views against the same analyses run on the file path.
+"""
+###############################################################################
+# Third Party Imports
+import numpy
+import pytest
+from mido import MidiFile
+# Local Imports
+from pyramidi.analysis import ambitus, label_chords, salami, swierckj_pcd
+from pyramidi.core import AnalyzedMidi
+from pyramidi.models.Krumhansl_Schmuckler import keyfinding, mirmode
+from pyramidi.sdc import get_onset_rate, get_pitch_height
+###############################################################################
+def test_handle_matches_path(midi_files):
+    for path in midi_files:
+        handle = AnalyzedMidi(path)
+        assert handle.pcd == swierckj_pcd(path)
+        assert swierckj_pcd(handle) == swierckj_pcd(path)
+        assert salami(handle) == salami(path)
+        assert ambitus(handle) == ambitus(path)
+        assert handle.pitch_height == get_pitch_height(path)
+        assert handle.onset_rate == get_onset_rate(path)
+        assert get_pitch_height(handle) == get_pitch_height(path)
+        pcd = list(swierckj_pcd(path).values())
+        assert keyfinding(handle) == keyfinding(pcd)
+        assert mirmode(handle) == mirmode(pcd)
+        assert label_chords(handle)[0].tolist() == \
+            label_chords(salami(path))[0].tolist()
+
+###############################################################################
+def test_views_are_memoized(midi_files):
+    handle = AnalyzedMidi(midi_files[1])
+    assert handle.midi is handle.midi
+    assert handle.note_table is handle.note_table
+    assert handle.excerpt is handle.merged.cut(8)
+    assert handle.cut(4) is handle.cut(4)
+    assert handle.tempo_map is handle.note_table.tempo_map
+
+###############################################################################
+def test_midi_file_source(midi_files):
+    midi = MidiFile(midi_files[2])
+    handle = AnalyzedMidi(midi)
+    assert handle.path is None and handle.midi is midi
+    assert AnalyzedMidi(handle).midi is midi
+    numpy.testing.assert_array_equal(
+        handle.slices['sounding'], AnalyzedMidi(midi_files[2]).slices['sounding']
+    )
+    with pytest.raises(TypeError):
+        AnalyzedMidi(1)
+
+###############################################################################
@@ -0,0 +1,56 @@
+"""
+Lazy package imports and the NumPy similarity metrics that replace SciPy.
+"""
+###############################################################################
+# Standard Imports
+import os
+import subprocess
+import sys
+# Third Party Imports
+import pytest
+# Local Imports
+import pyramidi
+from pyramidi.models.Krumhansl_Schmuckler import SIMILARITY_METRICS
+###############################################################################
+# Constants
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+###############################################################################
+def _loaded(statement: str):
+    """Modules loaded by a fresh interpreter after running statement."""
+    output = subprocess.run(
+        [sys.executable, "-c", f"{statement}; import sys; print(' '.join(sys.modules))"],
+        capture_output = True, text = True, check = True, cwd = ROOT
+    ).stdout
+    return set(output.split())
+
+###############################################################################
+def test_import_is_lazy():
+    loaded = _loaded("import pyramidi")
+    assert "pyramidi" in loaded
+    assert not {"pyramidi.core", "pyramidi.analysis", "numpy", "mido"} & loaded
+    assert "scipy" not in _loaded("import pyramidi.models")
+
+###############################################################################
+def test_lazy_attributes():
+    assert pyramidi.core.cut is pyramidi.cut
+    assert pyramidi.analysis.__name__ == "pyramidi.analysis"
+    assert set(pyramidi.__all__) <= set(dir(pyramidi))
+    with pytest.raises(AttributeError):
+        pyramidi.nope
+
+###############################################################################
+def test_similarity_metrics_match_scipy():
+    stats = pytest.importorskip("scipy.stats")
+    distance = pytest.importorskip("scipy.spatial.distance")
+    reference = {
+        'pearsonr': lambda u, v: stats.pearsonr(u, v)[0],
+        'cosine': lambda u, v: 1 - distance.cosine(u, v),
+        'euclidean': lambda u, v: 1 - distance.euclidean(u, v),
+        'spearman': lambda u, v: stats.spearmanr(u, v)[0]
+    }
+    u = [5, 0, 2, 0, 3, 1, 0, 4, 0, 2, 0, 1]
+    v = [6.35, 2.23, 3.48, 2.33, 4.38, 4.09, 2.52, 5.19, 2.39, 3.66, 2.29, 2.88]
+    for name, metric in SIMILARITY_METRICS.items():
+        assert metric(u, v) == pytest.approx(reference[name](u, v), abs = 1e-14)
+
+###############################################################################
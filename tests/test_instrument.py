@@ -0,0 +1,104 @@
+"""
+Stage spans, counters and reports, alone and merged across batch workers.
+"""
+###############################################################################
+# Standard Imports
+import json
+import shutil
+# Third Party Imports
+import pytest
+# Local Imports
+from pyramidi import batch, instrument
+###############################################################################
+@pytest.fixture
+def recording():
+    instrument.reset()
+    instrument.enable()
+    yield
+    instrument.disable()
+    instrument.reset()
+
+###############################################################################
+def test_spans_and_counters(recording):
+    for _ in range(3):
+        with instrument.span("outer"):
+            with instrument.span("inner"):
+                instrument.count("notes", 2)
+    instrument.count("notes")
+    report = instrument.report()
+    assert report['stages']['outer']['calls'] == 3
+    assert report['stages']['inner']['calls'] == 3
+    # Stages nest, so outer time includes inner time.
+    assert report['stages']['outer']['seconds'] >= \
+        report['stages']['inner']['seconds']
+    assert report['stages']['outer']['max_seconds'] <= \
+        report['stages']['outer']['seconds']
+    assert report['counters'] == {'notes': 7}
+
+###############################################################################
+def test_timed(recording):
+    @instrument.timed("work")
+    def work(value):
+        return value * 2
+    assert work(3) == 6
+    assert instrument.report()['stages']['work']['calls'] == 1
+
+###############################################################################
+def test_file_span_keeps_slowest(recording):
+    instrument.enable(slowest = 2)
+    for path, spans in (("a.mid", 1), ("b.mid", 40), ("c.mid", 20)):
+        with instrument.file_span(path):
+            for _ in range(spans):
+                with instrument.span("parse"):
+                    sum(range(20000))
+    files = instrument.report()['files']
+    assert [entry['path'] for entry in files] == ["b.mid", "c.mid"]
+    assert files[0]['seconds'] >= files[1]['seconds']
+    assert set(files[0]['stages']) == {"parse"}
+    assert files[0]['stages']['parse'] <= files[0]['seconds']
+
+###############################################################################
+def test_merge_and_export(recording):
+    with instrument.file_span("a.mid"):
+        with instrument.span("parse"):
+            pass
+    instrument.count("events", 5)
+    other = instrument.report()
+    instrument.merge(other)
+    report = instrument.report()
+    assert report['stages']['parse']['calls'] == 2
+    assert report['counters'] == {'events': 10}
+    assert [entry['path'] for entry in report['files']] == ["a.mid", "a.mid"]
+    assert json.loads(instrument.to_json()) == report
+    text = instrument.to_prometheus()
+    assert 'pyramidi_stage_calls_total{stage="parse"} 2' in text
+    assert "# TYPE pyramidi_events_total counter\npyramidi_events_total 10" in text
+
+###############################################################################
+def test_disabled_is_a_no_op():
+    instrument.reset()
+    instrument.disable()
+    assert instrument.span("parse") is instrument.span("merge")
+    with instrument.file_span("a.mid"):
+        with instrument.span("parse"):
+            instrument.count("events")
+    assert instrument.report() == {'stages': {}, 'counters': {}, 'files': []}
+
+###############################################################################
+def test_batch_merges_worker_reports(tmp_path, midi_files, recording):
+    instrument.enable(slowest = None)
+    for index, path in enumerate(midi_files):
+        shutil.copy(path, tmp_path / f"{index}.mid")
+    results = list(batch.run(
+        str(tmp_path), extractors = ('pitch_height', 'swierckj_pcd'),
+        workers = 2, chunksize = 1
+    ))
+    report = instrument.report()
+    assert len(results) == len(midi_files)
+    for name in ('feature:pitch_height', 'feature:swierckj_pcd'):
+        assert report['stages'][name]['calls'] == len(midi_files)
+    assert sorted(entry['path'] for entry in report['files']) == \
+        sorted(result.path for result in results)
+    assert report['counters']['notes'] > 0
+
+###############################################################################
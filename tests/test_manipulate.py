@@ -0,0 +1,115 @@
+"""
+Manipulation pipeline: byte-identical to the original ManipulateMIDI on
+type 0 files, and per-note checks on multi-track files.
+"""
+###############################################################################
+# Standard Imports
+import csv
+import hashlib
+import os
+from io import BytesIO
+# Third Party Imports
+import numpy
+import pytest
+# Local Imports
+from pyramidi.core import pre_process
+from pyramidi.manipulate import ManipulateMIDI, Pipeline, generate_grid
+from pyramidi.notes import NoteTable
+###############################################################################
+# Constants
+TEST_MID = os.path.join(os.path.dirname(__file__), "test.mid")
+# SHA-256 of the original ManipulateMIDI.qwik output for the type 0
+# version of test.mid.
+ORIGINAL = [
+    ({'tempo': 90},
+     "f8de86fb18672b5829665638b0550ed81b4922c0242c788fb39ea432349dae06"),
+    ({'semitones': 3},
+     "a8e9073a2d89f19f04ea3281d33a67b058969c6550155c0b7b84dd7fa7b924e9"),
+    ({'tempo': 150, 'semitones': -2},
+     "590e7cce8ad7d437131a742260b393b3aac781bde04c281044ccc2d45dba4acf")
+]
+###############################################################################
+@pytest.mark.parametrize("parameters, digest", ORIGINAL)
+def test_qwik_matches_original(tmp_path, parameters, digest):
+    source = str(tmp_path / "type0.mid")
+    pre_process(TEST_MID).save(source)
+    output = str(tmp_path / "out.mid")
+    ManipulateMIDI(midi_file = source, output_file = output).qwik(**parameters)
+    with open(output, 'rb') as f:
+        assert hashlib.sha256(f.read()).hexdigest() == digest
+
+###############################################################################
+def test_pipeline_multitrack(midi_files):
+    source = midi_files[2]
+    before = NoteTable.from_file(source)
+    events = Pipeline().transpose(2).articulation(0.5).apply(source)
+    after = NoteTable.from_events(events)
+    assert len(events.track_ends) == 4
+    numpy.testing.assert_array_equal(after.onset_ticks, before.onset_ticks)
+    numpy.testing.assert_array_equal(after.track, before.track)
+    numpy.testing.assert_array_equal(after.pitch, before.pitch + 2)
+    numpy.testing.assert_allclose(
+        after.duration_ticks, before.duration_ticks * 0.5, atol = 1
+    )
+
+###############################################################################
+def test_pipeline_tempo_and_velocity(midi_files):
+    source = midi_files[1]
+    before = NoteTable.from_file(source)
+    events = Pipeline().tempo(scale = 2).velocity(scale = 0.5).apply(source)
+    after = NoteTable.from_midi(events.to_midi())
+    numpy.testing.assert_array_equal(after.onset_ticks, before.onset_ticks)
+    numpy.testing.assert_allclose(
+        after.onset_seconds, before.onset_seconds / 2, rtol = 1e-4, atol = 1e-6
+    )
+    numpy.testing.assert_array_equal(
+        after.velocity, numpy.clip(numpy.round(before.velocity * 0.5), 1, 127)
+    )
+
+###############################################################################
+def test_pipeline_is_immutable():
+    base = Pipeline().transpose(12, max_pitch = 96)
+    fast = base.tempo(scale = 1.5)
+    assert len(base.steps) == 1 and len(fast.steps) == 2
+    with pytest.raises(TypeError):
+        base.tempo()
+    with pytest.raises(TypeError):
+        base.articulation(0)
+
+###############################################################################
+def _bytes(midi):
+    buffer = BytesIO()
+    midi.save(file = buffer)
+    return buffer.getvalue()
+
+###############################################################################
+@pytest.mark.parametrize("workers", [0, 2])
+def test_generate_grid(tmp_path, midi_files, workers):
+    source = midi_files[1]
+    rows = generate_grid(
+        source, str(tmp_path), tempos = (None, 90), semitones = (0, 2, -3),
+        velocities = (None, 80), articulations = (0.8,), workers = workers,
+        chunksize = 5
+    )
+    names = sorted(os.path.basename(row['path']) for row in rows)
+    assert len(names) == 12
+    assert "synthetic_0_torig_s+0_vorig_a0.8.mid" in names
+    assert "synthetic_0_t90_s-3_v80_a0.8.mid" in names
+    assert sorted(os.listdir(tmp_path)) == sorted(names + ['manifest.csv'])
+    with open(tmp_path / "manifest.csv", newline = '') as f:
+        manifest = list(csv.DictReader(f))
+    assert [row['path'] for row in manifest] == [row['path'] for row in rows]
+    for row, written in zip(rows, manifest):
+        assert written == {
+            key: '' if value is None else str(value) for key, value in row.items()
+        }
+        pipeline = Pipeline().transpose(row['semitones'])
+        if row['tempo'] is not None:
+            pipeline = pipeline.tempo(bpm = row['tempo'])
+        if row['velocity'] is not None:
+            pipeline = pipeline.velocity(value = row['velocity'])
+        pipeline = pipeline.articulation(row['articulation'])
+        with open(row['path'], 'rb') as f:
+            assert f.read() == _bytes(pipeline.apply(source).to_midi())
+
+###############################################################################
@@ -0,0 +1,268 @@
+"""
+Chord and key models: batch functions against their single-chord
+counterparts, and both against values computed with the original
+implementations.
+"""
+###############################################################################
+# Standard Imports
+import os
+# Third Party Imports
+import numpy
+import pytest
+# Local Imports
+from pyramidi.models import Woolhouse, roughness
+from pyramidi.models.Krumhansl_Schmuckler import (
+    KEYS,
+    get_profiles,
+    get_similarity_metrics,
+    keyfinding,
+    keyfinding_all,
+    keyfinding_batch,
+    mirmode,
+    mirmode_batch
+)
+from pyramidi.models.PitchSalience import (
+    WEIGHTS88,
+    PitchSalience,
+    _salience,
+    pitch_salience,
+    salience_table
+)
+from pyramidi.models.roughness import (
+    dyad_table,
+    roughness_all,
+    roughnessChord,
+    roughnessChord2,
+    roughness_batch,
+    roughnessDyad
+)
+###############################################################################
+# Constants
+CHORDS = [
+    [60, 64, 67], [57, 60, 64], [59, 62, 65, 69], [48, 55, 64, 70], [60],
+    [60, 61], [62, 66, 69, 72], [55, 59, 62, 65]
+]
+# Values of the original per-chord implementations for CHORDS.
+ROUGHNESS = {
+    'rolloff': [0.119, 0.15, 0.248, 0.202, 0.0, 0.483, 0.201, 0.278],
+    'octave': [0.116, 0.138, 0.238, 0.203, 0.0, 0.425, 0.198, 0.268],
+    'all': [0.014, 0.015, 0.016, 0.013, 0.002, 0.023, 0.014, 0.017]
+}
+SINGLE = {
+    'rolloff': roughnessChord,
+    'octave': roughnessChord2,
+    'all': roughness_all
+}
+ROOTS = [60, 57, 62, 48, 60, None, 62, 55]
+SALIENCE = [
+    [0.534, 0.0, 0.089, 0.089, 0.297, 0.178, 0.059, 0.297, 0.089, 0.208, 0.03, 0.0],
+    [0.423, 0.0, 0.26, 0.0, 0.325, 0.26, 0.065, 0.033, 0.098, 0.488, 0.033, 0.065],
+    [0.028, 0.141, 0.423, 0.028, 0.197, 0.366, 0.0, 0.31, 0.0, 0.31, 0.225, 0.338],
+    [0.488, 0.0, 0.073, 0.195, 0.244, 0.146, 0.122, 0.244, 0.098, 0.171, 0.268, 0.0],
+    [0.69, 0.0, 0.138, 0.0, 0.0, 0.345, 0.0, 0.0, 0.207, 0.0, 0.069, 0.0],
+    [0.488, 0.488, 0.098, 0.098, 0.0, 0.244, 0.244, 0.0, 0.146, 0.146, 0.049, 0.049],
+    [0.268, 0.0, 0.488, 0.0, 0.073, 0.195, 0.244, 0.146, 0.122, 0.244, 0.098, 0.171],
+    [0.146, 0.122, 0.244, 0.098, 0.171, 0.268, 0.0, 0.488, 0.0, 0.073, 0.195, 0.244]
+]
+PROGRESSION = [
+    [60, 64, 67], [57, 60, 64], [59, 62, 65, 69], [48, 55, 64, 70], [60],
+    [60, 62], [62, 66, 69, 72], [55, 59, 62, 65], [60, 64, 67]
+]
+# Original event_attraction of consecutive chords of PROGRESSION, and of
+# PROGRESSION[7] to every chord.
+ATTRACTION = [0.428, 0.664, 0.635, 0.327, 0.408, 0.259, 0.799, 0.91]
+ATTRACTION_FROM_7 = [0.91, 0.634, 0.596, 0.799, 1.021, 0.706, 0.708, 0.332, 0.91]
+PCDS = [
+    [5, 0, 2, 0, 3, 1, 0, 4, 0, 2, 0, 1],
+    [3, 0, 1, 4, 0, 2, 0, 3, 1, 0, 2, 0]
+]
+# Original (SciPy pearsonr) results for PCDS with the default profile.
+MIRMODE = [0.3122302950381286, -0.004954433090278321]
+KEYFINDING_C_MAJOR = [0.9633540428500988, 0.3288176819228625]
+KEYFINDING_C_MINOR = [0.47012309355885984, 0.8742811804805031]
+###############################################################################
+@pytest.mark.parametrize("model", ["rolloff", "octave", "all"])
+def test_roughness(model):
+    batch = roughness_batch(CHORDS, model = model)
+    single = [SINGLE[model](chord) for chord in CHORDS]
+    numpy.testing.assert_array_equal(batch, single)
+    numpy.testing.assert_array_equal(single, ROUGHNESS[model])
+
+###############################################################################
+@pytest.mark.parametrize("model", ["rolloff", "octave", "all"])
+def test_roughness_batch_blocks(model):
+    rng = numpy.random.default_rng(0)
+    chords = [
+        sorted(rng.choice(numpy.arange(36, 96), size, replace = False).tolist())
+        for size in rng.integers(1, 6, 40)
+    ]
+    numpy.testing.assert_array_equal(
+        roughness_batch(chords, model = model, block = 16),
+        [SINGLE[model](chord) for chord in chords]
+    )
+
+###############################################################################
+def test_roughness_batch_empty_chord():
+    assert numpy.isnan(roughness_batch([[60, 64], []])[1])
+    assert len(roughness_batch([])) == 0
+    with pytest.raises(TypeError):
+        roughness_batch(CHORDS, model = "nope")
+
+###############################################################################
+@pytest.mark.parametrize("rolloff, partials", [(1, 11), (0.5, 6)])
+def test_dyad_table(rolloff, partials):
+    table = dyad_table(rolloff, partials)
+    assert table.shape == (128, 128)
+    for low, high in [(0, 0), (21, 108), (57, 60), (60, 61), (100, 127)]:
+        assert table[low, high] == pytest.approx(
+            roughnessDyad([low, high], rolloff, partials), rel = 1e-12
+        )
+
+###############################################################################
+def test_dyad_table_is_persisted(tmp_path, monkeypatch):
+    monkeypatch.setattr(roughness, "TABLE_DIRECTORY", str(tmp_path))
+    dyad_table.cache_clear()
+    fresh = dyad_table(1, 11)
+    assert os.listdir(tmp_path)
+    dyad_table.cache_clear()
+    reloaded = dyad_table(1, 11)
+    assert reloaded is not fresh
+    numpy.testing.assert_array_equal(reloaded, fresh)
+    dyad_table.cache_clear()
+
+###############################################################################
+def test_dyad_table_in_memory(monkeypatch):
+    monkeypatch.setattr(roughness, "TABLE_DIRECTORY", None)
+    dyad_table.cache_clear()
+    numpy.testing.assert_array_equal(
+        dyad_table(2, 5),
+        roughness._dyad_roughness(
+            numpy.arange(128)[:, None], numpy.arange(128)[None, :],
+            [num**-2 for num in range(1, 6)]
+        )
+    )
+    dyad_table.cache_clear()
+
+###############################################################################
+def test_table_directory_variable(tmp_path, monkeypatch):
+    monkeypatch.setenv("XDG_CACHE_HOME", str(tmp_path))
+    monkeypatch.delenv(roughness.TABLE_VARIABLE, raising = False)
+    assert roughness._table_directory() == str(tmp_path / "pyramidi")
+    monkeypatch.setenv(roughness.TABLE_VARIABLE, str(tmp_path / "tables"))
+    assert roughness._table_directory() == str(tmp_path / "tables")
+    monkeypatch.setenv(roughness.TABLE_VARIABLE, "")
+    assert roughness._table_directory() is None
+
+###############################################################################
+def test_pitch_salience():
+    ps, roots = pitch_salience(CHORDS)
+    for chord, row, root, salience, expected in zip(
+        CHORDS, ps, roots, SALIENCE, ROOTS
+    ):
+        single = PitchSalience(chord)
+        numpy.testing.assert_array_equal(row, single.ps)
+        numpy.testing.assert_allclose(single.ps, salience, atol = 5e-7)
+        assert single.root == expected
+        assert root == (-1 if expected is None else expected)
+
+###############################################################################
+def test_salience_table():
+    ps, ra, root_pc = salience_table(88)
+    for mask in range(1, 4096, 37):
+        pc_chord = [(mask >> pc) & 1 for pc in range(12)]
+        expected_ps, expected_ra, expected_root = _salience(pc_chord, WEIGHTS88)
+        assert ps[mask].tolist() == expected_ps
+        assert ra[mask] == expected_ra
+        assert root_pc[mask] == (-1 if expected_root is None else expected_root)
+    with pytest.raises(TypeError):
+        pitch_salience([[60], []])
+
+###############################################################################
+def test_woolhouse_attraction():
+    consecutive = Woolhouse.attraction(PROGRESSION)
+    single = [
+        Woolhouse.event_attraction(pre, suc)
+        for pre, suc in zip(PROGRESSION, PROGRESSION[1:])
+    ]
+    numpy.testing.assert_array_equal(consecutive, single)
+    numpy.testing.assert_array_equal(single, ATTRACTION)
+    every = Woolhouse.attraction(PROGRESSION, pairs = "all")
+    assert every.shape == (len(PROGRESSION),) * 2
+    numpy.testing.assert_array_equal(every[7], ATTRACTION_FROM_7)
+    numpy.testing.assert_array_equal(every[7], [
+        Woolhouse.event_attraction(PROGRESSION[7], chord)
+        for chord in PROGRESSION
+    ])
+
+###############################################################################
+def test_woolhouse_chroma_and_key_attraction():
+    chroma = Woolhouse.chroma_attraction_batch(PROGRESSION)
+    keys = Woolhouse.key_attraction_batch(PROGRESSION)
+    for chord, chroma_row, key_row in zip(PROGRESSION, chroma, keys):
+        numpy.testing.assert_array_equal(
+            chroma_row, Woolhouse.chroma_attraction(chord)
+        )
+        numpy.testing.assert_allclose(
+            key_row, list(Woolhouse.key_attraction(chord).values()),
+            rtol = 1e-12
+        )
+
+###############################################################################
+def test_keyfinding():
+    batch = keyfinding_batch(PCDS)
+    for pcd, row, major, minor in zip(
+        PCDS, batch, KEYFINDING_C_MAJOR, KEYFINDING_C_MINOR
+    ):
+        single = keyfinding(pcd)
+        assert list(single) == KEYS
+        numpy.testing.assert_allclose(row, list(single.values()), rtol = 1e-12)
+        assert single['0_major'] == pytest.approx(major, abs = 1e-12)
+        assert single['0_minor'] == pytest.approx(minor, abs = 1e-12)
+
+###############################################################################
+def test_keyfinding_all():
+    profiles, similarities, coefficients = keyfinding_all(PCDS)
+    assert profiles == sorted(get_profiles())
+    assert similarities == sorted(get_similarity_metrics())
+    for i, profile in enumerate(profiles):
+        for j, similarity in enumerate(similarities):
+            numpy.testing.assert_allclose(
+                coefficients[i, j],
+                keyfinding_batch(PCDS, profile, similarity),
+                rtol = 1e-12
+            )
+
+###############################################################################
+def test_mirmode():
+    batch = mirmode_batch(PCDS)
+    single = [mirmode(pcd) for pcd in PCDS]
+    numpy.testing.assert_allclose(batch, single, rtol = 1e-12)
+    numpy.testing.assert_allclose(single, MIRMODE, atol = 1e-12)
+
+###############################################################################
+@pytest.mark.parametrize("method", ["best", "sum"])
+def test_mirmode_batch_all(method):
+    modes = mirmode_batch(PCDS, weights = "all", similarity = "all", method = method)
+    assert len(modes) == len(get_profiles()) * len(get_similarity_metrics())
+    for (profile, similarity), values in modes.items():
+        numpy.testing.assert_allclose(
+            values,
+            mirmode_batch(PCDS, profile, method, similarity),
+            rtol = 1e-12
+        )
+    profile = mirmode_batch(PCDS, weights = "Simple", similarity = "all")
+    assert set(profile) == {("Simple", s) for s in get_similarity_metrics()}
+
+###############################################################################
+def test_mirmode_rejects_invalid_names():
+    for weights, similarity in [("unknown", "pearsonr"),
+                                ("all", "unknown"), ("unknown", "all")]:
+        with pytest.raises(TypeError):
+            mirmode_batch(PCDS, weights = weights, similarity = similarity)
+    for weights, similarity in [("all", "pearsonr"), ("Simple", "all")]:
+        with pytest.raises(TypeError, match = "mirmode_batch"):
+            mirmode(PCDS[0], weights = weights, similarity = similarity)
+    with pytest.raises(TypeError):
+        mirmode(PCDS[0], similarity = "unknown")
+
+###############################################################################
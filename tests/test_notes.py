@@ -0,0 +1,116 @@
+"""
+NoteTable against a message-by-message reference pairing.
+"""
+###############################################################################
+# Third Party Imports
+import numpy
+from mido import MidiFile, tick2second
+# Local Imports
+from pyramidi.notes import NoteTable, note_table
+###############################################################################
+def reference_notes(midi: MidiFile):
+    """
+    (onset, offset, pitch, velocity, channel, track) of every note, pairing
+    each note-off with the earliest sounding note of its key.
+    """
+    notes = []
+    for index, track in enumerate(midi.tracks):
+        tick = 0
+        sounding = {}
+        for msg in track:
+            tick += msg.time
+            if msg.type == 'note_on' and msg.velocity > 0:
+                sounding.setdefault((msg.channel, msg.note), []).append(
+                    (tick, msg.velocity)
+                )
+            elif msg.type in ('note_on', 'note_off'):
+                stack = sounding.get((msg.channel, msg.note))
+                if stack:
+                    onset, velocity = stack.pop(0)
+                    notes.append((onset, tick, msg.note, velocity, msg.channel, index))
+        for (channel, note), stack in sounding.items():
+            for onset, velocity in stack:
+                notes.append((onset, tick, note, velocity, channel, index))
+    return sorted(notes, key = lambda note: (note[0], note[2]))
+
+###############################################################################
+def reference_seconds(midi: MidiFile, ticks):
+    """Seconds of absolute ticks, walking the tempo changes of every track."""
+    changes = sorted(
+        (tick, msg.tempo)
+        for track in midi.tracks
+        for tick, msg in zip(
+            numpy.cumsum([msg.time for msg in track]).tolist(), track
+        )
+        if msg.type == 'set_tempo'
+    )
+    seconds = []
+    for tick in ticks:
+        total, last, tempo = 0.0, 0, 500000
+        for change, value in changes:
+            if change > tick:
+                break
+            total += tick2second(change - last, midi.ticks_per_beat, tempo)
+            last, tempo = change, value
+        seconds.append(total + tick2second(tick - last, midi.ticks_per_beat, tempo))
+    return seconds
+
+###############################################################################
+def test_pairing_matches_reference(midi_files):
+    for path in midi_files:
+        midi = MidiFile(path)
+        table = NoteTable.from_midi(midi)
+        expected = reference_notes(midi)
+        actual = sorted(zip(
+            table.onset_ticks.tolist(),
+            table.offset_ticks.tolist(),
+            table.pitch.tolist(),
+            table.velocity.tolist(),
+            table.channel.tolist(),
+            table.track.tolist()
+        ), key = lambda note: (note[0], note[2]))
+        assert actual == expected
+
+###############################################################################
+def test_seconds_follow_tempo_changes(midi_files):
+    for path in midi_files:
+        midi = MidiFile(path)
+        table = NoteTable.from_midi(midi)
+        numpy.testing.assert_allclose(
+            table.onset_seconds,
+            reference_seconds(midi, table.onset_ticks.tolist()),
+            rtol = 1e-9
+        )
+        numpy.testing.assert_allclose(
+            table.offset_seconds,
+            reference_seconds(midi, table.offset_ticks.tolist()),
+            rtol = 1e-9
+        )
+
+###############################################################################
+def test_sounding(midi_files):
+    table = NoteTable.from_midi(MidiFile(midi_files[2]))
+    boundaries = numpy.unique(numpy.concatenate(
+        (table.onset_ticks, table.offset_ticks)
+    ))
+    counts = table.sounding(boundaries)
+    for row, start in zip(counts, boundaries[:-1].tolist()):
+        expected = numpy.zeros(128, dtype = int)
+        for onset, offset, pitch in zip(
+            table.onset_ticks.tolist(), table.offset_ticks.tolist(),
+            table.pitch.tolist()
+        ):
+            if onset <= start < offset:
+                expected[pitch] += 1
+        numpy.testing.assert_array_equal(row, expected)
+
+###############################################################################
+def test_note_table_inputs(midi_files):
+    path = midi_files[1]
+    table = note_table(path)
+    assert note_table(table) is table
+    numpy.testing.assert_array_equal(
+        note_table(MidiFile(path)).pitch, table.pitch
+    )
+
+###############################################################################
@@ -0,0 +1,25 @@
+"""
+Score defined cues of test.mid against the original implementations.
+"""
+###############################################################################
+# Standard Imports
+import os
+# Third Party Imports
+import pytest
+# Local Imports
+from pyramidi.sdc import get_onset_rate, get_pitch_height
+###############################################################################
+# Constants
+TEST_MID = os.path.join(os.path.dirname(__file__), "test.mid")
+# Original results for the first 8 bars of test.mid.
+PITCH_HEIGHT = 44.095238095
+ONSET_RATE = 3.999869796
+###############################################################################
+def test_pitch_height():
+    assert get_pitch_height(TEST_MID) == pytest.approx(PITCH_HEIGHT, abs = 1e-9)
+
+###############################################################################
+def test_onset_rate():
+    assert get_onset_rate(TEST_MID) == pytest.approx(ONSET_RATE, abs = 1e-9)
+
+###############################################################################
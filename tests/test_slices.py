@@ -0,0 +1,59 @@
+"""
+Streaming and bulk salami slicing against brute force over a NoteTable.
+"""
+###############################################################################
+# Third Party Imports
+import numpy
+# Local Imports
+from pyramidi.analysis import iter_slices, label_chords, salami, slice_arrays
+from pyramidi.notes import NoteTable
+###############################################################################
+def reference_slices(table):
+    """[onset, duration, pitches] between every pair of note boundaries."""
+    boundaries = sorted(set(table.onset_ticks) | set(table.offset_ticks))
+    slices = []
+    for start, end in zip(boundaries, boundaries[1:]):
+        sounding = (table.onset_ticks <= start) & (table.offset_ticks > start)
+        if sounding.any():
+            slices.append([
+                start / table.ticks_per_beat,
+                (end - start) / table.ticks_per_beat,
+                sorted(set(table.pitch[sounding].tolist()))
+            ])
+    return slices
+
+###############################################################################
+def test_slices_match_brute_force(midi_files):
+    for path in midi_files:
+        expected = reference_slices(NoteTable.from_file(path))
+        streamed = [
+            [s.onset, s.duration, s.pitches.tolist()] for s in iter_slices(path)
+        ]
+        assert streamed == expected
+        arrays = slice_arrays(path)
+        assert arrays['onset'].tolist() == [s[0] for s in expected]
+        assert arrays['duration'].tolist() == [s[1] for s in expected]
+        assert [numpy.flatnonzero(row).tolist() for row in arrays['sounding']] == \
+            [s[2] for s in expected]
+        assert arrays['bass'].tolist() == [s[2][0] for s in expected]
+        assert arrays['mask'].tolist() == [
+            sum(1 << pc for pc in {p % 12 for p in s[2]}) for s in expected
+        ]
+        assert salami(path) == [[s[2], s[1]] for s in expected]
+
+###############################################################################
+def test_mask_slices(midi_files):
+    for path in midi_files:
+        for pitches, masked in zip(iter_slices(path), iter_slices(path, mask = True)):
+            assert masked.pitches == sum(1 << int(p) for p in pitches.pitches)
+
+###############################################################################
+def test_label_slices(midi_files):
+    path = midi_files[0]
+    expected, _ = label_chords(salami(path))
+    from_records, _ = label_chords(list(iter_slices(path)))
+    from_arrays, _ = label_chords(slice_arrays(path))
+    assert from_records.tolist() == expected.tolist()
+    assert from_arrays.tolist() == expected.tolist()
+
+###############################################################################
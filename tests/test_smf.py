@@ -0,0 +1,123 @@
+"""
+The native SMF reader against its Mido counterpart.
+"""
+###############################################################################
+# Standard Imports
+from io import BytesIO
+# Third Party Imports
+import numpy
+import pytest
+from mido import MidiFile
+# Local Imports
+from pyramidi.core import AnalyzedMidi, cut, pre_process, read_excerpt
+from pyramidi.notes import NoteTable
+from pyramidi.sdc import get_onset_rate, get_pitch_height, onset_rate, pitch_height
+from pyramidi.smf import SMFEvents, read_smf, read_smf_prefix, write_smf
+###############################################################################
+# Constants
+FIELDS = [
+    'ticks', 'delta', 'status', 'data1', 'data2', 'track', 'track_ends',
+    'tempo_ticks', 'tempos', 'time_signature_ticks', 'numerators',
+    'denominators'
+]
+###############################################################################
+def assert_same_events(actual: SMFEvents, expected: SMFEvents):
+    assert actual.type == expected.type
+    assert actual.ticks_per_beat == expected.ticks_per_beat
+    for field in FIELDS:
+        numpy.testing.assert_array_equal(
+            getattr(actual, field), getattr(expected, field), err_msg = field
+        )
+    if expected.payload is None:
+        assert actual.payload is None
+    else:
+        assert list(actual.payload) == list(expected.payload)
+
+###############################################################################
+@pytest.mark.parametrize("full", [False, True])
+def test_read_smf_matches_mido(midi_files, full):
+    for path in midi_files:
+        assert_same_events(
+            read_smf(path, full = full),
+            SMFEvents.from_midi(MidiFile(path), full = full)
+        )
+
+###############################################################################
+def test_read_smf_bytes(midi_files):
+    for path in midi_files:
+        with open(path, 'rb') as f:
+            data = f.read()
+        assert_same_events(read_smf(data), read_smf(path))
+
+###############################################################################
+def test_write_smf_round_trip(midi_files, tmp_path):
+    for path in midi_files:
+        events = read_smf(path, full = True)
+        data = write_smf(events)
+        assert_same_events(read_smf(data, full = True), events)
+        # Mido reads the written bytes back to the same events, and writes
+        # the same bytes itself.
+        midi = MidiFile(file = BytesIO(data))
+        assert_same_events(SMFEvents.from_midi(midi, full = True), events)
+        buffer = BytesIO()
+        MidiFile(path).save(file = buffer)
+        assert data == buffer.getvalue()
+        write_smf(events, str(tmp_path / "out.mid"))
+        assert (tmp_path / "out.mid").read_bytes() == data
+        assert events.to_bytes() == data
+    with pytest.raises(TypeError):
+        write_smf(read_smf(midi_files[0]))
+
+###############################################################################
+@pytest.mark.parametrize("measures", [1, 2.5, 4, 8, 100])
+def test_read_excerpt_matches_cut(midi_files, measures):
+    for path in midi_files:
+        assert_same_events(
+            read_excerpt(path, measures),
+            SMFEvents.from_midi(cut(pre_process(path), measures))
+        )
+
+###############################################################################
+def test_excerpt_features_match_cut(midi_files):
+    for path in midi_files:
+        excerpt = cut(pre_process(path))
+        assert get_pitch_height(path) == pitch_height(excerpt, direct = True)
+        assert get_onset_rate(path) == onset_rate(excerpt, direct = True)
+        assert get_pitch_height(AnalyzedMidi(path)) == get_pitch_height(path)
+
+###############################################################################
+def test_read_smf_prefix_by_ticks(midi_files):
+    path = midi_files[2]
+    merged = SMFEvents.from_midi(pre_process(path))
+    prefix = read_smf_prefix(path, end = 2000)
+    keep = merged.ticks < 2000
+    numpy.testing.assert_array_equal(prefix.ticks[:keep.sum()], merged.ticks[keep])
+    numpy.testing.assert_array_equal(prefix.status[:keep.sum()], merged.status[keep])
+    assert prefix.ticks.max() <= 2000
+    with pytest.raises(TypeError):
+        read_smf_prefix(path)
+    with pytest.raises(TypeError):
+        read_smf_prefix(path, end = 10, measures = 1)
+
+###############################################################################
+def test_note_table_matches_mido(midi_files):
+    for path in midi_files:
+        native = NoteTable.from_file(path)
+        reference = NoteTable.from_midi(MidiFile(path))
+        for field in (
+            'onset_ticks', 'offset_ticks', 'pitch', 'velocity', 'channel',
+            'track', 'onset_seconds', 'offset_seconds'
+        ):
+            numpy.testing.assert_array_equal(
+                getattr(native, field), getattr(reference, field),
+                err_msg = field
+            )
+
+###############################################################################
+def test_truncated_header_is_rejected():
+    with pytest.raises(EOFError):
+        read_smf(b"MThd\x00\x00")
+    with pytest.raises(ValueError):
+        read_smf_prefix(b"MThd\x00\x00", measures = 8)
+
+###############################################################################
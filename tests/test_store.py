@@ -0,0 +1,106 @@
+"""
+Tests for the SQLite feature store.
+"""
+###############################################################################
+# Standard Imports
+import os
+import random
+import shutil
+# Third Party Imports
+import pytest
+# Local Imports
+from pyramidi.batch import Result
+from pyramidi.store import FeatureStore
+###############################################################################
+# Constants
+TEST_MID = os.path.join(os.path.dirname(__file__), "test.mid")
+###############################################################################
+def test_put_get_query():
+    with FeatureStore() as store:
+        store.put(TEST_MID, {
+            'onset_rate': 5.0,
+            'mirmode': -0.2,
+            'ambitus': [40, 80],
+            'swierckj_pcd': {0: 0.5, 7: 0.5}
+        })
+        features = store.get(TEST_MID)
+        assert features['ambitus_range'] == 40
+        assert features['swierckj_pcd'] == {0: 0.5, 7: 0.5}
+        assert store.query(mirmode = ('<', 0), onset_rate = ('>', 4),
+                           ambitus_range = ('>', 36)) == [TEST_MID]
+        assert store.query(onset_rate = ('between', 6, 7)) == []
+        assert store.query(unknown = 1) == []
+
+###############################################################################
+def test_versions():
+    with FeatureStore() as store:
+        store.put(TEST_MID, {'onset_rate': 5.0, 'mirmode': 0.1})
+        store.register('mirmode', 2)
+        assert 'mirmode' not in store.get(TEST_MID)
+        assert store.missing([TEST_MID], ['mirmode']) == [TEST_MID]
+        assert store.missing([TEST_MID], ['onset_rate']) == []
+        assert store.prune() == 1
+
+def test_query_matches_brute_force(tmp_path):
+    rng = random.Random(0)
+    rows = {}
+    for index in range(60):
+        path = tmp_path / f"{index}.mid"
+        path.write_bytes(str(index).encode())
+        rows[str(path)] = {
+            'onset_rate': rng.uniform(0, 8),
+            'mirmode': rng.uniform(-1, 1),
+            'pitch_height': float(rng.randrange(30, 60))
+        }
+    database = str(tmp_path / "features.db")
+    with FeatureStore(database) as store:
+        assert store.ingest(
+            (Result(path, features, {}, 0.0) for path, features in rows.items()),
+            batch_size = 7
+        ) == len(rows)
+    with FeatureStore(database) as store:
+        assert len(store) == len(rows)
+        for conditions, test in [
+            ({'onset_rate': ('>', 4)}, lambda row: row['onset_rate'] > 4),
+            ({'onset_rate': ('<=', 6), 'mirmode': ('between', -0.5, 0.2)},
+             lambda row: row['onset_rate'] <= 6 and -0.5 <= row['mirmode'] <= 0.2),
+            ({'pitch_height': 40, 'mirmode': ('!=', 0)},
+             lambda row: row['pitch_height'] == 40)
+        ]:
+            assert store.query(conditions) == sorted(
+                path for path, row in rows.items() if test(row)
+            )
+
+###############################################################################
+def test_paths_follow_content(tmp_path):
+    path = tmp_path / "a.mid"
+    shutil.copy(TEST_MID, path)
+    copy = tmp_path / "b.mid"
+    shutil.copy(TEST_MID, copy)
+    with FeatureStore() as store:
+        store.put(path, {'onset_rate': 5.0})
+        # A byte-identical copy shares the stored features.
+        assert store.get(copy) == {'onset_rate': 5.0}
+        assert store.missing([path, copy], ['onset_rate']) == []
+        # Editing the file invalidates them.
+        with open(path, 'ab') as f:
+            f.write(b"\x00")
+        assert store.get(path) == {}
+        assert store.missing([path], ['onset_rate']) == [path]
+        # Paths that do not exist have nothing to re-extract.
+        assert store.missing([tmp_path / "gone.mid"], ['onset_rate']) == []
+
+###############################################################################
+def test_rollback_forgets_new_names(tmp_path):
+    with FeatureStore() as store:
+        with pytest.raises(OSError):
+            store.put_many([
+                (TEST_MID, {'first': 1.0}),
+                (tmp_path / "missing.mid", {'first': 1.0})
+            ])
+        assert store.get(TEST_MID) == {}
+        store.put(TEST_MID, {'second': 2.0})
+        store.put(TEST_MID, {'first': 3.0})
+        assert store.get(TEST_MID) == {'first': 3.0, 'second': 2.0}
+
+###############################################################################
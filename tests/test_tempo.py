@@ -0,0 +1,60 @@
+"""
+TempoMap against Mido's per-segment conversion.
+"""
+###############################################################################
+# Third Party Imports
+import numpy
+from mido import MidiFile, tick2second
+# Local Imports
+from pyramidi.tempo import TempoMap
+###############################################################################
+def reference_seconds(changes, ticks_per_beat, ticks):
+    """Seconds of absolute ticks, walking sorted (tick, tempo) changes."""
+    seconds = []
+    for tick in ticks:
+        total, last, tempo = 0.0, 0, 500000
+        for change, value in changes:
+            if change > tick:
+                break
+            total += tick2second(change - last, ticks_per_beat, tempo)
+            last, tempo = change, value
+        seconds.append(total + tick2second(tick - last, ticks_per_beat, tempo))
+    return seconds
+
+###############################################################################
+def test_tick2second_matches_mido(midi_files):
+    for path in midi_files:
+        midi = MidiFile(path)
+        tempo_map = TempoMap.from_midi(midi)
+        changes = []
+        for track in midi.tracks:
+            tick = 0
+            for msg in track:
+                tick += msg.time
+                if msg.type == 'set_tempo':
+                    changes.append((tick, msg.tempo))
+        ticks = numpy.arange(0, 20000, 37)
+        numpy.testing.assert_allclose(
+            tempo_map.tick2second(ticks),
+            reference_seconds(sorted(changes), midi.ticks_per_beat, ticks.tolist()),
+            rtol = 1e-12
+        )
+
+###############################################################################
+def test_second2tick_inverts_tick2second():
+    tempo_map = TempoMap([0, 480, 960, 2000], [400000, 600000, 250000, 900000], 480)
+    ticks = numpy.arange(0, 5000)
+    numpy.testing.assert_array_equal(
+        numpy.round(tempo_map.second2tick(tempo_map.tick2second(ticks))), ticks
+    )
+
+###############################################################################
+def test_defaults_and_duplicate_ticks():
+    # No tempo at tick 0 means 120 bpm until the first change.
+    tempo_map = TempoMap([960, 960], [250000, 1000000], 480)
+    assert tempo_map.tick2second(960) == 1.0
+    # The last of several tempos on one tick wins.
+    assert tempo_map.tempo_at(961) == 1000000
+    assert tempo_map.tick2second(1440) == 2.0
+
+###############################################################################
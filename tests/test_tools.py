@@ -0,0 +1,83 @@
+"""
+Corpus scanning, the change manifest and the deprecated timer.
+"""
+###############################################################################
+# Standard Imports
+import os
+# Third Party Imports
+import pytest
+# Local Imports
+from pyramidi import instrument
+from pyramidi.tools import Changes, Manifest, parser, scan, timer
+###############################################################################
+def _tree(root):
+    """Small corpus with nested directories and other file types."""
+    for name in ("a.mid", "B.MID", "notes.txt", "x/c.mid", "x/y/d.mid",
+                 "x/y/e.wav", "z/f.mid"):
+        path = root / name
+        path.parent.mkdir(parents = True, exist_ok = True)
+        path.write_bytes(name.encode())
+    return sorted(
+        str(root / name)
+        for name in ("a.mid", "B.MID", "x/c.mid", "x/y/d.mid", "z/f.mid")
+    )
+
+###############################################################################
+def test_scan(tmp_path):
+    expected = _tree(tmp_path)
+    assert sorted(scan(tmp_path)) == expected
+    assert sorted(scan(str(tmp_path), extension = ".wav", workers = 1)) == \
+        [str(tmp_path / "x" / "y" / "e.wav")]
+    assert parser(str(tmp_path)) == expected
+
+###############################################################################
+def test_manifest_update(tmp_path):
+    corpus = tmp_path / "corpus"
+    corpus.mkdir()
+    paths = _tree(corpus)
+    manifest = Manifest()
+    assert manifest.update(corpus) == Changes(paths, [], [])
+    assert manifest.update(corpus) == Changes([], [], [])
+    # Touched only: re-hashed but not reported.
+    stat = os.stat(paths[0])
+    os.utime(paths[0], ns = (stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+    assert manifest.update(corpus) == Changes([], [], [])
+    assert manifest.files[paths[0]][1] == stat.st_mtime_ns + 10**9
+    with open(paths[1], 'ab') as f:
+        f.write(b"more")
+    os.remove(paths[2])
+    (corpus / "g.mid").write_bytes(b"g")
+    assert manifest.update(corpus) == \
+        Changes([str(corpus / "g.mid")], [paths[1]], [paths[2]])
+
+###############################################################################
+def test_manifest_save_load(tmp_path):
+    corpus = tmp_path / "corpus"
+    corpus.mkdir()
+    paths = _tree(corpus)
+    path = str(tmp_path / "manifest.json")
+    manifest = Manifest(path)
+    manifest.update(corpus)
+    manifest.save()
+    assert sorted(os.listdir(tmp_path)) == ["corpus", "manifest.json"]
+    loaded = Manifest(path)
+    assert loaded.files == manifest.files
+    assert len(loaded) == len(paths)
+    assert loaded.update(corpus) == Changes([], [], [])
+
+###############################################################################
+def test_timer_prints_and_is_deprecated(capsys):
+    with pytest.warns(DeprecationWarning, match = "instrument.timed"):
+        double = timer(lambda x: 2 * x)
+    instrument.reset()
+    instrument.enable()
+    try:
+        assert double(3) == 6
+        stages = instrument.report()['stages']
+    finally:
+        instrument.disable()
+        instrument.reset()
+    assert "Elapsed Time" in capsys.readouterr().out
+    assert stages['<lambda>']['calls'] == 1
+
+###############################################################################
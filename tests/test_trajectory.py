@@ -0,0 +1,144 @@
+"""
+Sliding-window key trajectories against per-window brute force.
+"""
+###############################################################################
+# Third Party Imports
+import numpy
+import pytest
+from mido import Message, MidiFile, MidiTrack
+# Local Imports
+from pyramidi.analysis import key_trajectory, swierckj_pcd
+from pyramidi.models.Krumhansl_Schmuckler import (
+    KEYS,
+    keyfinding,
+    keyfinding_batch,
+    mirmode
+)
+from pyramidi.notes import NoteTable
+from pyramidi.tempo import BarIndex
+###############################################################################
+def positions(table, ticks, unit):
+    if unit == "seconds":
+        return table.tempo_map.tick2second(ticks)
+    if unit == "beats":
+        return ticks / table.ticks_per_beat
+    return table.bar_index.tick2bar(ticks)
+
+###############################################################################
+def reference_pcds(table, starts, ends, unit):
+    """Window PCDs from the overlap of every note with every window."""
+    onsets = positions(table, table.onset_ticks, unit)
+    offsets = positions(table, table.offset_ticks, unit)
+    pcds = []
+    for start, end in zip(starts, ends):
+        overlap = numpy.clip(
+            numpy.minimum(offsets, end) - numpy.maximum(onsets, start), 0, None
+        )
+        pcds.append(numpy.bincount(table.pitch_class, overlap, minlength = 12))
+    pcds = numpy.array(pcds)
+    length = pcds.sum(axis = 1, keepdims = True)
+    return numpy.divide(pcds, length, out = numpy.zeros_like(pcds), where = length > 0)
+
+###############################################################################
+@pytest.mark.parametrize("unit, window, hop", [
+    ("seconds", 4.0, 1.5), ("beats", 8, 3), ("bars", 2, 1)
+])
+def test_windows_match_brute_force(midi_files, unit, window, hop):
+    for path in midi_files:
+        table = NoteTable.from_file(path)
+        trajectory = key_trajectory(table, window, hop, unit = unit)
+        starts = trajectory["start"]
+        numpy.testing.assert_allclose(starts[1:] - starts[:-1], hop)
+        pcds = reference_pcds(table, starts, trajectory["end"], unit)
+        numpy.testing.assert_allclose(trajectory["pcd"], pcds, atol = 1e-9)
+        coefficients = keyfinding_batch(pcds)
+        sounding = pcds.sum(axis = 1) > 0
+        numpy.testing.assert_allclose(
+            trajectory["coefficients"][sounding], coefficients[sounding],
+            atol = 1e-6
+        )
+        best = numpy.array(KEYS)[numpy.argmax(coefficients, axis = 1)]
+        assert list(trajectory["key"][sounding]) == list(best[sounding])
+        assert all(key is None for key in trajectory["key"][~sounding])
+
+###############################################################################
+@pytest.mark.parametrize("unit, window, hop, timebase, atol", [
+    # Excerpts round their bounds to ticks, so seconds only nearly match.
+    ("seconds", 4.0, 1.5, "seconds", 1e-2),
+    ("beats", 8, 3, "ticks", 1e-9),
+    # Single bars have one time signature, so ticks weigh like bars.
+    ("bars", 1, 1, "ticks", 1e-9)
+])
+def test_windows_match_excerpts(midi_files, unit, window, hop, timebase, atol):
+    for path in midi_files:
+        table = NoteTable.from_file(path)
+        trajectory = key_trajectory(table, window, hop, unit = unit)
+        for start, end, pcd, coefficients, key, mode in zip(
+            trajectory["start"], trajectory["end"], trajectory["pcd"],
+            trajectory["coefficients"], trajectory["key"], trajectory["mode"]
+        ):
+            excerpt = table.excerpt(start, end, unit = unit)
+            if not excerpt.duration_ticks.sum():
+                assert key is None and numpy.isnan(mode)
+                continue
+            reference = list(swierckj_pcd(excerpt, timebase = timebase).values())
+            numpy.testing.assert_allclose(pcd, reference, atol = atol)
+            numpy.testing.assert_allclose(
+                coefficients, list(keyfinding(reference).values()),
+                atol = 10 * atol
+            )
+            assert mode == pytest.approx(mirmode(reference), abs = 10 * atol)
+            if unit != "seconds":
+                assert key == max(keyfinding(reference).items(),
+                                  key = lambda item: item[1])[0]
+
+###############################################################################
+def test_silent_windows_have_no_key():
+    track = MidiTrack([
+        Message('note_on', note = 60, velocity = 80, time = 0),
+        Message('note_off', note = 60, time = 480),
+        Message('note_on', note = 67, velocity = 80, time = 4 * 480),
+        Message('note_off', note = 67, time = 480)
+    ])
+    midi = MidiFile(ticks_per_beat = 480)
+    midi.tracks.append(track)
+    trajectory = key_trajectory(NoteTable.from_midi(midi), 1, unit = "beats")
+    silent = [False, True, True, True, True, False]
+    assert [key is None for key in trajectory["key"]] == silent
+    assert list(numpy.isnan(trajectory["mode"])) == silent
+    assert numpy.isnan(trajectory["coefficients"][silent]).all()
+    assert not trajectory["pcd"][silent].any()
+
+###############################################################################
+def test_single_window_is_file_pcd(midi_files):
+    for path in midi_files:
+        table = NoteTable.from_file(path)
+        end = table.tempo_map.tick2second(table.end_tick)
+        trajectory = key_trajectory(table, end + 1)
+        assert len(trajectory["start"]) == 1
+        numpy.testing.assert_allclose(
+            trajectory["pcd"][0], list(swierckj_pcd(table).values()),
+            atol = 1e-9
+        )
+
+###############################################################################
+def test_bar_index():
+    # 4/4 for two bars, 3/4 for one, then 6/8; the last signature on a
+    # tick wins.
+    index = BarIndex([960, 1320, 1320], [3, 2, 6], [4, 4, 8], 120)
+    numpy.testing.assert_array_equal(index.ticks, [0, 960, 1320])
+    numpy.testing.assert_allclose(
+        index.tick2bar([0, 480, 960, 1320, 1680]),
+        [0, 1, 2, 3, 4]
+    )
+    ticks = numpy.arange(0, 3000, 7)
+    numpy.testing.assert_allclose(index.bar2tick(index.tick2bar(ticks)), ticks)
+
+###############################################################################
+def test_invalid_window(midi_files):
+    with pytest.raises(TypeError):
+        key_trajectory(midi_files[0], 0)
+    with pytest.raises(TypeError):
+        key_trajectory(midi_files[0], 1, unit = "ticks")
+
+###############################################################################